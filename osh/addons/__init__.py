@@ -4,8 +4,10 @@ from osh.addons.add import main as add
 from osh.addons.diff import main as diff
 from osh.addons.download import main as download
 from osh.addons.gen_table import main as gen_table
+from osh.addons.graph import main as graph
 from osh.addons.list import main as list
 from osh.addons.materialize import main as materialize
+from osh.addons.test_plan import main as test_plan
 
 
 @click.group()
@@ -17,5 +19,7 @@ addons.add_command(add)
 addons.add_command(diff)
 addons.add_command(download)
 addons.add_command(gen_table)
+addons.add_command(graph)
 addons.add_command(list)
 addons.add_command(materialize)
+addons.add_command(test_plan)
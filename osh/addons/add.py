@@ -4,7 +4,13 @@ import os
 
 import click
 
-from osh.gitutils import commit, git_add, git_top, list_available_addons
+from osh.gitutils import (
+    commit,
+    git_add,
+    git_top,
+    list_available_addons,
+    update_sparse_checkouts,
+)
 from osh.helpers import find_addons_extended, relpath
 from osh.messages import GIT_ADDONS_NEW
 from osh.utils import str_to_list
@@ -49,5 +55,9 @@ def main(addons_list: str, no_commit: bool):
         # Stage symlink
         git_add([name])
 
+    if created_links:
+        # sparse submodules must check out the newly linked addons
+        update_sparse_checkouts(repo)
+
     if created_links and not no_commit:
         commit(GIT_ADDONS_NEW, description="\n".join(created_links), skip_hook=True)
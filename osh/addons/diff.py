@@ -1,55 +1,240 @@
 #!/usr/bin/env python3
 #!/usr/bin/env python3
+import json
 import logging
+import os
 import subprocess
 from pathlib import Path
 
 import click
 
+from osh.compat import Dict, Iterable, List, Optional, Tuple
+from osh.gitindex import MODE_GITLINK, tracked_addon_paths, tracked_symlinks
 from osh.gitutils import git_top
+from osh.helpers import PathTrie
+from osh.settings import MANIFEST_NAMES
 
 logging.basicConfig(level=logging.INFO)
 
 
-def run(cmd):
-    return subprocess.check_output(cmd, text=True).strip()
+def run(cmd, cwd: Optional[str] = None):
+    return subprocess.check_output(cmd, text=True, cwd=cwd).strip()
 
 
-def get_changed_files(mode: str):
+def get_diff_range(mode: str, cwd: Optional[str] = None) -> str:
     """
     mode = "branch" → compare HEAD to origin/main
     mode = "tag"    → compare HEAD to the latest tag
     """
     if mode == "branch":
         base = "origin/main"
-        diff_range = f"{base}...HEAD"
-    elif mode == "tag":
-        last_tag = run(["git", "describe", "--tags", "--abbrev=0"])
-        diff_range = f"{last_tag}..HEAD"
+        return f"{base}...HEAD"
+    if mode == "tag":
+        last_tag = run(["git", "describe", "--tags", "--abbrev=0"], cwd=cwd)
+        return f"{last_tag}..HEAD"
+    raise ValueError("mode must be 'branch' or 'tag'")
+
+
+def get_raw_diff(
+    diff_range: str, cwd: Optional[str] = None
+) -> List[Tuple[str, str, str, str, str]]:
+    """Return (old_mode, new_mode, old_sha, new_sha, path) for each entry of `git diff --raw`."""
+
+    cmd = ["git", "diff", "--raw", "-z", "--no-abbrev", "--no-renames", diff_range]
+    tokens = subprocess.check_output(cmd, text=True, cwd=cwd).split("\0")
+
+    entries = []
+    for meta, path in zip(tokens[::2], tokens[1::2]):
+        old_mode, new_mode, old_sha, new_sha, _ = meta.lstrip(":").split(" ", 4)
+        entries.append((old_mode, new_mode, old_sha, new_sha, path))
+    return entries
+
+
+def get_submodule_changes(root: Path, path: str, old_sha: str, new_sha: str) -> Optional[List[str]]:
+    """
+    Return the files changed inside the submodule at `path` between two commits,
+    prefixed with the submodule path, or None if the submodule cannot tell
+    (not initialized, or a commit is missing locally).
+    """
+
+    sub = root / path
+    if not (sub / ".git").exists():
+        return None
+
+    if set(old_sha) == {"0"}:
+        # newly added submodule: every file is new
+        cmd = ["git", "-C", str(sub), "ls-tree", "-r", "--name-only", "-z", new_sha]
     else:
-        raise ValueError("mode must be 'branch' or 'tag'")
+        cmd = ["git", "-C", str(sub), "diff", "--name-only", "-z", old_sha, new_sha]
+
+    try:
+        output = subprocess.check_output(cmd, text=True, stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+        return None
+    return [f"{path}/{name}" for name in output.split("\0") if name]
+
+
+def get_changed_files(
+    mode: str, root: Optional[Path] = None, recurse_submodules: bool = True
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Return (files, submodules, unresolved) for the diff range of `mode`.
+
+    Files are relative to the repo root. With `recurse_submodules`, every submodule
+    pointer bump (gitlink change) is expanded into the files changed inside the submodule
+    between the old and the new commit. `submodules` lists the bumped submodules and
+    `unresolved` those that could not be diffed locally.
+    """
+
+    root = root or git_top()
+    files, submodules, unresolved = [], [], []
+    for old_mode, new_mode, old_sha, new_sha, path in get_raw_diff(
+        get_diff_range(mode, cwd=str(root)), cwd=str(root)
+    ):
+        if not recurse_submodules or MODE_GITLINK not in (old_mode, new_mode):
+            files.append(path)
+            continue
+        if new_mode != MODE_GITLINK:
+            # submodule removed (or replaced): only the path itself changed
+            files.append(path)
+            continue
+
+        submodules.append(path)
+        changes = get_submodule_changes(root, path, old_sha, new_sha)
+        if changes is None:
+            logging.warning(f"Cannot diff submodule {path} ({old_sha[:8]}..{new_sha[:8]})")
+            unresolved.append(path)
+        else:
+            files.extend(changes)
+
+    return files, submodules, unresolved
+
+
+def build_addon_trie(addon_dirs: Iterable[str], links: Optional[Dict[str, str]] = None) -> PathTrie:
+    """
+    Return a trie mapping each addon root to the addon path to report.
+
+    Addons reached through a top-level symlink (`links`, link -> target) are reported
+    under the link name, which is what gets installed.
+    """
+
+    trie = PathTrie()
+    for addon_dir in addon_dirs:
+        trie.insert(addon_dir, addon_dir)
+    for link, target in (links or {}).items():
+        match = trie.longest_prefix(target)
+        if match and match[0] == target:
+            trie.insert(target, link)
+    return trie
 
-    return run(["git", "diff", "--name-only", diff_range]).splitlines()
 
+def find_modified_addons(
+    files: list,
+    trie: Optional[PathTrie] = None,
+    root: Optional[Path] = None,
+    links: Optional[Dict[str, str]] = None,
+) -> list:
+    """Return the addons containing the given files.
 
-def find_modified_addons(files: list) -> list:
+    With a `trie` of addon roots (see `build_addon_trie`), each file is mapped in a
+    single lookup. Otherwise parents are checked on disk (relative to `root`) for a manifest,
+    and addons reached through a top-level symlink (`links`, link -> target) are reported
+    under the link name, as the trie does.
+    """
+
+    targets = {target: link for link, target in (links or {}).items()}
     addons = set()
     for f in files:
+        if trie is not None:
+            match = trie.longest_prefix(f)
+            if match:
+                addons.add(match[1])
+            continue
+
         p = Path(f)
         # Remonter l’arbo jusqu’à trouver un manifeste
         for parent in [p] + list(p.parents):
-            if (parent / "__manifest__.py").exists() or (parent / "__openerp__.py").exists():
-                addons.add(str(parent))
+            base = root / parent if root else parent
+            if any((base / name).exists() for name in MANIFEST_NAMES):
+                addons.add(targets.get(str(parent), str(parent)))
                 break
     return sorted(addons)
 
 
+def filter_submodule_addons(
+    addons: List[str], submodules: List[str], unresolved: List[str], links: Dict[str, str]
+) -> List[str]:
+    """
+    Keep only the installed addons among the changes coming from submodules.
+
+    Addons inside a bumped submodule that no top-level symlink points to are not part
+    of the project and are dropped. For submodules that could not be diffed, every
+    linked addon they provide is considered changed.
+    """
+
+    subs = PathTrie()
+    for path in submodules:
+        subs.insert(path, path)
+
+    targets = {target: link for link, target in links.items()}
+    result = set()
+    for addon in addons:
+        if addon in targets:
+            result.add(targets[addon])
+        elif subs.longest_prefix(addon) is None:
+            result.add(addon)
+
+    for link, target in links.items():
+        match = subs.longest_prefix(target)
+        if match and match[1] in unresolved:
+            result.add(link)
+    return sorted(result)
+
+
+def get_changed_addons(root: Path, mode: str, backend: str = "git") -> List[str]:
+    """Return the paths of the addons changed in the diff range of `mode`."""
+
+    changed, submodules, unresolved = get_changed_files(mode=mode, root=root)
+    links = tracked_symlinks(root)
+
+    trie = None
+    if backend == "git":
+        addon_dirs = [addon_dir for addon_dir, _ in tracked_addon_paths(root)]
+        trie = build_addon_trie(addon_dirs, links=links)
+    addons = find_modified_addons(changed, trie=trie, root=root, links=links)
+
+    if submodules:
+        addons = filter_submodule_addons(addons, submodules, unresolved, links)
+    return addons
+
+
 @click.command(name="diff")
 @click.argument("mode", type=click.Choice(["branch", "tag"], case_sensitive=False))
-def main(
-    mode: str,
-):
+@click.option(
+    "--backend",
+    type=click.Choice(["git", "walk"]),
+    default="git",
+    show_default=True,
+    help="Locate addons from the git index or by checking the file system",
+)
+@click.option(
+    "--format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Output format",
+)
+def main(mode: str, backend: str, format: str):
+    """List the addons changed in the current branch or since the last tag."""
+
     local_repo = git_top()
-    changed = get_changed_files(mode=mode)
-    addons = find_modified_addons(changed)
-    print("Changed addons:", addons)
+    addons = get_changed_addons(local_repo, mode=mode, backend=backend)
+
+    if format == "json":
+        click.echo(
+            json.dumps(
+                [{"name": os.path.basename(path), "path": path} for path in addons], indent=2
+            )
+        )
+    else:
+        print("Changed addons:", addons)
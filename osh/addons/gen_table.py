@@ -16,13 +16,14 @@ does not matter, will be replaced by the script
 <!-- prettier-ignore-end -->
 """
 
-import ast
 import logging
 import os
 import re
+from pathlib import Path
 
 import click
 
+from osh.cache import AddonIndex
 from osh.gitutils import commit_if_needed
 
 _logger = logging.getLogger(__name__)
@@ -132,6 +133,7 @@ def main(commit, readme_path, addons_dir):  # noqa: C901
     header = ("addon", "version", "maintainers", "summary")
     rows_available = []
     rows_unported = []
+    index = AddonIndex.from_root(Path(addons_dir))
     for addon_path, unported in addon_paths:
         for manifest_file in MANIFESTS:
             manifest_path = os.path.join(addon_path, manifest_file)
@@ -139,8 +141,7 @@ def main(commit, readme_path, addons_dir):  # noqa: C901
             if has_manifest:
                 break
         if has_manifest:
-            with open(manifest_path) as f:
-                manifest = ast.literal_eval(f.read())
+            manifest = index.manifest(manifest_path)
             addon_name = os.path.basename(addon_path)
             link = f"[{addon_name}]({addon_path}/)"
             version = manifest.get("version") or ""
@@ -161,6 +162,7 @@ def main(commit, readme_path, addons_dir):  # noqa: C901
                         summary,
                     )
                 )
+    index.save()
     # replace table in README.md
     replace_in_readme(readme_path, header, rows_available, rows_unported)
     if commit:
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import json
+import sys
+
+import click
+
+from osh.exceptions import DependencyCycle
+from osh.gitutils import load_repo
+from osh.graph import core_addons, load_graph
+from osh.settings import ODOO_ADDONS_PATH_ENV
+from osh.utils import human_readable
+
+
+@click.command(name="graph")
+@click.argument(
+    "action", type=click.Choice(["deps", "rdeps", "missing", "core", "cycles", "order"])
+)
+@click.argument("names", nargs=-1)
+@click.option(
+    "--format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Output format",
+)
+@click.option(
+    "--all",
+    "show_all",
+    is_flag=True,
+    help="Include every addon of the submodules, not only the ones in the root of the repo",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["walk", "git"]),
+    default="walk",
+    show_default=True,
+    help="Discover addons by walking the tree or from the git index",
+)
+@click.option(
+    "--core-addons",
+    "addons_path",
+    multiple=True,
+    type=click.Path(exists=True, file_okay=False),
+    envvar=ODOO_ADDONS_PATH_ENV,
+    help="Directory of Odoo core addons (repeatable, e.g. odoo/addons and addons of the sources "
+    f"or of an image), defaults to ${ODOO_ADDONS_PATH_ENV} then to a built-in, partial list",
+)
+def main(  # noqa: C901, PLR0912, PLR0913, PLR0917
+    action: str, names: tuple, format: str, show_all: bool, backend: str, addons_path: tuple
+):
+    """Query the addon dependency graph.
+
+    \b
+    deps NAMES...   transitive dependencies of NAMES
+    rdeps NAMES...  addons depending (transitively) on NAMES
+    missing         dependencies not found in the project (Odoo core addons aside)
+    core            Odoo core addons required by the project
+    cycles          addons depending on each other (members of each dependency cycle)
+    order [NAMES]   installation order (of NAMES and their dependencies)
+    """
+
+    repo, _ = load_repo()
+    graph = load_graph(repo, shallow=not show_all, backend=backend)
+
+    if action in ("deps", "rdeps") and not names:
+        raise click.UsageError(f"'{action}' needs at least one addon name.")
+
+    if action == "deps":
+        result = sorted(graph.dependencies(names))
+    elif action == "rdeps":
+        result = sorted(graph.dependents(names))
+    elif action == "missing":
+        result = graph.missing(core_addons(addons_path))
+    elif action == "core":
+        result = graph.core(core_addons(addons_path))
+    elif action == "cycles":
+        result = graph.cycles()
+    else:
+        try:
+            result = graph.install_order(names or None)
+        except DependencyCycle as error:
+            click.echo(error.message, err=True)
+            sys.exit(1)
+
+    if format == "json":
+        click.echo(json.dumps(result, indent=2))
+    elif action in ("missing", "core"):
+        for dep, parents in result.items():
+            click.echo(f"{dep}: required by {human_readable(parents)}")
+    elif action == "cycles":
+        for cycle in result:
+            click.echo(", ".join(cycle))
+    else:
+        for name in result:
+            click.echo(name)
+
+    return 0
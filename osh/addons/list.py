@@ -1,11 +1,89 @@
 #!/usr/bin/env python3
+import csv
+import json
+import sys
 
 import click
 
+from osh.compat import Dict, Iterable, Iterator, Optional, TextIO
 from osh.gitutils import load_repo, parse_gitmodules
 from osh.helpers import find_addons
+from osh.models import AddonInfo
 from osh.utils import human_readable, parse_repository_url, render_boolean, render_table
 
+FIELDS = [
+    "name",
+    "path",
+    "symlink",
+    "submodule",
+    "branch",
+    "url",
+    "pr",
+    "version",
+    "author",
+]
+
+
+def iter_rows(addons: Iterable[AddonInfo], subs: Dict[str, dict]) -> Iterator[dict]:
+    """Yield one row per addon, skipping addons already seen under the same real path."""
+
+    seen = set()
+    for addon in addons:
+        # an addon can be found twice: in its submodule and through its root symlink
+        if addon.path in seen:
+            continue
+        seen.add(addon.path)
+
+        sub = subs.get(addon.rel_path, {})
+        yield {
+            "name": addon.technical_name,
+            "path": addon.path,
+            "symlink": addon.symlink,
+            "submodule": sub.get("name", ""),
+            "branch": sub.get("branch", ""),
+            "url": sub.get("url", ""),
+            "pr": bool(sub.get("pr", False)),
+            "version": addon.version,
+            "author": addon.author,
+        }
+
+
+def write_ndjson(rows: Iterable[dict], stream: TextIO) -> None:
+    """Write rows as JSON lines, flushing each one so consumers can read as we go."""
+
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        stream.flush()
+
+
+def write_csv(rows: Iterable[dict], stream: TextIO) -> None:
+    """Write rows as CSV with a header line, flushing each one."""
+
+    writer = csv.DictWriter(stream, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        stream.flush()
+
+
+def render_rows(rows: Iterable[dict]) -> str:
+    return render_table(
+        [
+            [
+                row["name"],
+                render_boolean(row["symlink"]),
+                human_readable(row["submodule"], width=30),
+                human_readable(row["branch"]),
+                render_boolean(row["pr"]),
+                row["version"],
+                human_readable(row["author"], width=30),
+            ]
+            for row in rows
+        ],
+        headers=["Addon", "S", "Submodule", "Upstream", "PR", "Version", "Author"],
+        index=True,
+    )
+
 
 @click.command(name="list")
 @click.option(
@@ -13,7 +91,7 @@ from osh.utils import human_readable, parse_repository_url, render_boolean, rend
     type=click.Choice(["text", "json", "csv"]),
     default="text",
     show_default=True,
-    help="Output format (default: text)",
+    help="Output format: text table, JSON lines (one object per addon) or CSV",
 )
 @click.option(
     "--init/--no-init",
@@ -38,14 +116,40 @@ from osh.utils import human_readable, parse_repository_url, render_boolean, rend
     is_flag=True,
     help="List all addons, including those not in submodules (i.e. in the root of the repo)",
 )
-def main(format: str, init: bool, submodules: tuple, symlinks_only: bool, show_all: bool):  # noqa: C901, PLR0912
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Parse manifests in parallel with N processes (0: one per CPU)",
+)
+@click.option(
+    "--sort/--no-sort",
+    default=None,
+    help="Sort addons by name (default: only for text, json and csv are streamed as found)",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["walk", "git"]),
+    default="walk",
+    show_default=True,
+    help="Discover addons by walking the tree or from the git index (untracked ones included)",
+)
+def main(  # noqa: PLR0913, PLR0917
+    format: str,
+    init: bool,
+    submodules: tuple,
+    symlinks_only: bool,
+    show_all: bool,
+    jobs: int,
+    sort: Optional[bool],
+    backend: str,
+):
     """List all addons found in git submodules."""
 
     repo, gitmodules = load_repo()
 
-    rows = []
-    paths = []
-
     # gather submodules info
     subs = {}
     if gitmodules:
@@ -59,60 +163,18 @@ def main(format: str, init: bool, submodules: tuple, symlinks_only: bool, show_a
                 "pr": pull_request,
             }
 
-    for addon in find_addons(repo, shallow=not show_all):
-        # FIXME: this is a bit of a hack, should be improved
-        # skip duplicates (can happen if an addon is in a submodule and in the root)
-        if addon.path in paths:
-            continue
-
-        paths.append(addon.path)
-
-        sub = subs.get(addon.rel_path, {})
-
-        rows.append(
-            [
-                addon.technical_name,
-                render_boolean(addon.symlink),
-                # human_readable(addon.rel_path, width=40),
-                human_readable(sub.get("name", ""), width=30),
-                human_readable(sub.get("branch", "")),
-                render_boolean(sub.get("pr", False)),
-                addon.version,
-                human_readable(addon.author, width=30),
-            ]
-        )
+    addons = find_addons(repo, shallow=not show_all, jobs=jobs, backend=backend)
+    rows = iter_rows(addons, subs)
 
-    # sort by addon name
-    rows.sort(key=lambda r: r[0])
+    if sort or (sort is None and format == "text"):
+        # sort by addon name
+        rows = iter(sorted(rows, key=lambda r: r["name"]))
 
-    click.echo(
-        render_table(
-            rows,
-            headers=["Addon", "S", "Submodule", "Upstream", "PR", "Version", "Author"],
-            index=True,
-        )
-    )
+    if format == "json":
+        write_ndjson(rows, sys.stdout)
+    elif format == "csv":
+        write_csv(rows, sys.stdout)
+    else:
+        click.echo(render_rows(rows))
 
     return 0
-
-    # # Output
-    # if format == "json":
-    #     print(json.dumps(results, indent=2, ensure_ascii=False))
-    # elif format == "csv":
-    #     fields = ["addon", "submodule", "path", "submodule_path", "url", "branch"]
-    #     w = csv.DictWriter(sys.stdout, fieldnames=fields)
-    #     w.writeheader()
-    #     for row in results:
-    #         w.writerow(row)
-    # else:
-    #     if not results:
-    #         click.echo("No addons found in local submodules.")
-    #         return 0
-    #     # compact text table
-    #     click.echo(f"Found {len(results)} addon(s):")
-    #     for r in results:
-    #         click.echo(
-    #             f"- {r['addon']:30}  [{r['submodule']}]  {r['path']}  (branch={r['branch'] or '-'})"
-    #         )
-
-    # return 0
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import statistics
+from pathlib import Path
+
+import click
+
+from osh.addons.diff import get_changed_addons
+from osh.cache import AddonIndex
+from osh.compat import Dict, Iterable, List, Optional
+from osh.gitutils import git_top
+from osh.graph import AddonGraph, load_graph
+from osh.helpers import find_addons
+from osh.models import AddonInfo
+
+
+def select_addons(
+    changed: Iterable[str], graph: AddonGraph, installable: Iterable[str]
+) -> List[str]:
+    """
+    Return the installed addons to test for a set of changed addon names.
+
+    The selection is the changed addons plus every addon depending on them in `graph`,
+    transitively, restricted to the `installable` addon names.
+    """
+
+    changed = set(changed)
+    return sorted((changed | graph.dependents(changed)) & set(installable))
+
+
+def load_timings(path: Optional[str]) -> Dict[str, float]:
+    """Load a {addon: seconds} JSON file produced by earlier runs."""
+
+    if not path:
+        return {}
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {str(name): float(seconds) for name, seconds in data.items()}
+
+
+def shard_addons(
+    names: Iterable[str], shards: int, timings: Optional[Dict[str, float]] = None
+) -> List[List[str]]:
+    """
+    Split addons into `shards` groups of balanced total duration.
+
+    Longest-processing-time-first greedy: addons sorted by decreasing duration are
+    assigned to the least loaded shard. Addons without timing weigh the median of the
+    known ones (1 when there is none). The result only depends on its inputs.
+    """
+
+    timings = timings or {}
+    default = statistics.median(timings.values()) if timings else 1.0
+    weights = {name: timings.get(name, default) for name in names}
+
+    loads = [(0.0, i) for i in range(shards)]
+    result: List[List[str]] = [[] for _ in range(shards)]
+    for name in sorted(weights, key=lambda n: (-weights[n], n)):
+        load, i = heapq.heappop(loads)
+        result[i].append(name)
+        heapq.heappush(loads, (load + weights[name], i))
+
+    return [sorted(shard) for shard in result]
+
+
+@click.command(name="test-plan")
+@click.argument("mode", type=click.Choice(["branch", "tag"], case_sensitive=False))
+@click.option(
+    "--shards",
+    "-n",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of parallel CI jobs to split the addons into",
+)
+@click.option(
+    "--shard",
+    type=click.IntRange(min=1),
+    help="Only print the addons of this shard (1-based), comma separated (a JSON list with "
+    "--format json)",
+)
+@click.option(
+    "--timings",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file mapping addon names to test durations in seconds",
+)
+@click.option(
+    "--format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Output format",
+)
+def main(mode: str, shards: int, shard: Optional[int], timings: Optional[str], format: str):
+    """Select the addons to test for the current changes and split them into shards."""
+
+    if shard and shard > shards:
+        raise click.BadParameter(f"must be between 1 and {shards}", param_hint="--shard")
+
+    repo = git_top()
+    changed = [
+        AddonInfo(repo / path, repo).technical_name for path in get_changed_addons(repo, mode=mode)
+    ]
+    index = AddonIndex.from_root(repo)
+    graph = load_graph(repo, shallow=True, index=index)
+    installable = [
+        a.technical_name for a in find_addons(repo, shallow=True, index=index) if a.installable
+    ]
+    index.save()
+    selected = select_addons(changed, graph, installable)
+    plan = shard_addons(selected, shards, load_timings(timings))
+
+    if shard and format == "json":
+        click.echo(json.dumps(plan[shard - 1], indent=2))
+    elif shard:
+        click.echo(",".join(plan[shard - 1]))
+    elif format == "json":
+        click.echo(
+            json.dumps({"changed": sorted(changed), "addons": selected, "shards": plan}, indent=2)
+        )
+    else:
+        for i, names in enumerate(plan, start=1):
+            click.echo(f"shard {i}: {','.join(names)}")
+
+    return 0
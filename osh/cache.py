@@ -0,0 +1,260 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from osh.compat import Any, Dict, List, Optional, Sequence, Tuple, Union
+from osh.settings import ADDONS_INDEX_FILE, ADDONS_INDEX_VERSION, CACHE_DIR
+from osh.utils import file_stamp, find_git_dir, parse_manifest, write_atomic
+
+
+def _encode(value: Any) -> Any:  # noqa: PLR0911
+    """Return `value` as JSON data, tagging the literals JSON does not know about.
+
+    Tuples, sets, dicts with non-string keys and other literals (bytes...) come back
+    with their type through `_decode`, so cached manifests equal freshly parsed ones.
+    """
+
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {"__items__": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [_encode(item) for item in sorted(value, key=repr)]}
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return {"__literal__": repr(value)}
+
+
+_DECODERS = {
+    "__tuple__": tuple,
+    "__set__": set,
+    "__items__": lambda items: {key: item for key, item in items},
+    "__literal__": ast.literal_eval,
+}
+
+
+def _decode(obj: dict) -> Any:
+    """`json.loads` object hook reverting `_encode` tags."""
+
+    if len(obj) != 1:
+        return obj
+    ((tag, value),) = obj.items()
+    decoder = _DECODERS.get(tag)
+    return decoder(value) if decoder else obj
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(_encode(data))
+
+
+def _loads(text: str) -> Any:
+    return json.loads(text, object_hook=_decode)
+
+
+def cache_path(root: Path, filename: str) -> Optional[Path]:
+    """Return the path of an osh cache file for the repository at `root`, or None."""
+
+    git_dir = find_git_dir(root)
+    if not git_dir:
+        return None
+    return git_dir / CACHE_DIR / filename
+
+
+class AddonIndex:
+    """
+    Persistent cache of parsed manifests, stored under the git directory (.git/osh/).
+
+    Entries are keyed by the absolute manifest path and invalidated per file
+    as soon as its (mtime, size, inode) stamp changes, so a warm scan only
+    stats manifests instead of re-parsing them.
+    """
+
+    def __init__(self, filepath: Optional[Path] = None):
+        self.filepath = filepath
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+
+    @classmethod
+    def from_root(cls, root: Path) -> "AddonIndex":
+        """Return the index of the repository at `root` (in-memory only outside of git)."""
+
+        return cls(cache_path(root, ADDONS_INDEX_FILE))
+
+    @property
+    def entries(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.filepath:
+            return {}
+        try:
+            data = _loads(self.filepath.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != ADDONS_INDEX_VERSION:
+            return {}
+        return data.get("entries") or {}
+
+    def lookup(self, manifest_path: str) -> Tuple[Optional[List[int]], Optional[dict]]:
+        """Return (stamp, manifest) for this manifest, manifest is None on a cache miss."""
+
+        key = os.path.abspath(manifest_path)
+        try:
+            stamp = file_stamp(key)
+        except OSError:
+            self.discard(key)
+            return None, None
+
+        entry = self.entries.get(key)
+        if entry and entry.get("stamp") == stamp:
+            return stamp, entry.get("manifest")
+        return stamp, None
+
+    def store(self, manifest_path: str, stamp: List[int], manifest: dict) -> None:
+        self.entries[os.path.abspath(manifest_path)] = {"stamp": stamp, "manifest": manifest}
+        self._dirty = True
+
+    def discard(self, manifest_path: str) -> None:
+        if self.entries.pop(os.path.abspath(manifest_path), None) is not None:
+            self._dirty = True
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._dirty = True
+
+    def manifest(self, manifest_path: str) -> dict:
+        """Return the parsed manifest, from the cache when it is still fresh."""
+
+        stamp, manifest = self.lookup(manifest_path)
+        if manifest is None:
+            manifest = parse_manifest(Path(manifest_path))
+            if stamp is not None:
+                self.store(manifest_path, stamp, manifest)
+        return manifest
+
+    def manifests(self, manifest_paths: Sequence[str], jobs: Optional[int] = None) -> List[dict]:
+        """Return the parsed manifests in the same order as `manifest_paths`.
+
+        Cache misses are parsed in a process pool of `jobs` workers (0 means one per CPU).
+        """
+
+        results: List[Optional[dict]] = []
+        misses = []
+        for i, manifest_path in enumerate(manifest_paths):
+            stamp, manifest = self.lookup(manifest_path)
+            results.append(manifest)
+            if manifest is None:
+                misses.append((i, manifest_path, stamp))
+
+        workers = jobs or os.cpu_count() or 1
+        if workers > 1 and len(misses) > 1:
+            workers = min(workers, len(misses))
+            chunksize = max(1, len(misses) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(
+                    pool.map(parse_manifest, [Path(p) for _, p, _ in misses], chunksize=chunksize)
+                )
+        else:
+            parsed = [parse_manifest(Path(p)) for _, p, _ in misses]
+
+        for (i, manifest_path, stamp), manifest in zip(misses, parsed):
+            results[i] = manifest
+            if stamp is not None:
+                self.store(manifest_path, stamp, manifest)
+
+        return results  # type: ignore[return-value]
+
+    def save(self) -> None:
+        """Write the index back to disk if it changed."""
+
+        if not self._dirty or not self.filepath:
+            return
+
+        data = {"version": ADDONS_INDEX_VERSION, "entries": self.entries}
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.filepath, _dumps(data))
+        except OSError as error:
+            logging.warning(f"Could not save addon index {self.filepath}: {error}")
+            return
+        self._dirty = False
+
+
+class ContentCache:
+    """
+    Persistent cache of results keyed by the hash of a file content, under .git/osh/.
+
+    `salt` identifies what produced the results (tool versions, rule set...): entries
+    written with another salt are dropped on load.
+    """
+
+    def __init__(self, filepath: Optional[Path] = None, salt: str = ""):
+        self.filepath = filepath
+        self.salt = salt
+        self._entries: Optional[Dict[str, Any]] = None
+        self._dirty = False
+
+    @classmethod
+    def from_root(cls, root: Path, filename: str, salt: str = "") -> "ContentCache":
+        """Return the cache `filename` of the repository at `root` (in-memory outside of git)."""
+
+        return cls(cache_path(root, filename), salt=salt)
+
+    @staticmethod
+    def key(content: Union[str, bytes]) -> str:
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha1(content).hexdigest()
+
+    @property
+    def entries(self) -> Dict[str, Any]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.filepath:
+            return {}
+        try:
+            data = _loads(self.filepath.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("salt") != self.salt:
+            return {}
+        return data.get("entries") or {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.entries.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        if self.entries.get(key) != value:
+            self.entries[key] = value
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache back to disk if it changed."""
+
+        if not self._dirty or not self.filepath:
+            return
+
+        data = {"salt": self.salt, "entries": self.entries}
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.filepath, _dumps(data))
+        except OSError as error:
+            logging.warning(f"Could not save cache {self.filepath}: {error}")
+            return
+        self._dirty = False
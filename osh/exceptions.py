@@ -50,3 +50,12 @@ def warn_unusual_registry(name):
         UnusualRegistryWarning,
         stacklevel=3,
     )
+
+
+class DependencyCycle(Exception):
+    message = "Dependency cycle between addons: {names}"
+
+    def __init__(self, names):
+        self.names = names
+        self.message = self.message.format(names=", ".join(names))
+        super().__init__(self.message)
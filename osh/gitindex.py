@@ -0,0 +1,233 @@
+"""
+Read-only queries on the git index (`git ls-files`).
+
+Listing tracked files from the index costs a few sequential reads, whereas walking
+the working tree costs one or more stat calls per directory.
+"""
+
+import contextlib
+import os
+import subprocess
+from collections.abc import Generator
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from osh.compat import Dict, Iterable, List, Optional, Tuple
+from osh.settings import ADDONS_PRUNE_PATTERNS, MANIFEST_NAMES
+from osh.utils import run
+
+MODE_SYMLINK = "120000"
+MODE_GITLINK = "160000"
+
+
+def _split_z(output: Optional[str]) -> List[str]:
+    return [item for item in (output or "").split("\0") if item]
+
+
+def list_index(
+    root: Path, pathspecs: Iterable[str] = (), recurse_submodules: bool = False
+) -> List[Tuple[str, str, str]]:
+    """Return (mode, object, path) for each index entry of the repository at `root`.
+
+    With `recurse_submodules`, entries of every initialized submodule are included,
+    their paths being prefixed with the submodule path.
+    """
+
+    cmd = ["git", "ls-files", "-s", "-z"]
+    if recurse_submodules:
+        cmd.append("--recurse-submodules")
+    cmd += ["--", *pathspecs]
+
+    entries = []
+    for item in _split_z(run(cmd, capture=True, cwd=str(root), name="ls-files")):
+        info, path = item.split("\t", 1)
+        mode, obj, _ = info.split(" ", 2)
+        entries.append((mode, obj, path))
+    return entries
+
+
+def list_untracked(root: Path, pathspecs: Iterable[str] = ()) -> List[str]:
+    """Return untracked, non-ignored files of the repository at `root`."""
+
+    cmd = ["git", "ls-files", "-z", "--others", "--exclude-standard", "--", *pathspecs]
+    return _split_z(run(cmd, capture=True, cwd=str(root), name="ls-files"))
+
+
+def list_changed(
+    root: Path, ref: str, pathspecs: Iterable[str] = (), recurse_submodules: bool = False
+) -> List[str]:
+    """Return files of the working tree changed since `ref`, untracked ones included.
+
+    With `recurse_submodules`, files changed inside each initialized submodule since the
+    commit it was at in `ref` are included, prefixed with the submodule path. Every file
+    of a submodule counts as changed when that commit is unknown (added since `ref`, or
+    not fetched).
+    """
+
+    pathspecs = list(pathspecs)
+    cmd = ["git", "diff", "--name-only", "-z", "--diff-filter=d", ref, "--", *pathspecs]
+    changed = set(_split_z(run(cmd, capture=True, cwd=str(root), name="diff")))
+    changed.update(list_untracked(root, pathspecs))
+    if not recurse_submodules:
+        return sorted(changed)
+
+    for mode, _, path in list_index(root):
+        if mode != MODE_GITLINK or not (root / path / ".git").exists():
+            continue
+        cmd = ["git", "rev-parse", "--verify", "--quiet", f"{ref}:{path}"]
+        old = run(cmd, check=False, capture=True, cwd=str(root), name="rev-parse").strip()
+        files = None
+        if old:
+            with contextlib.suppress(subprocess.CalledProcessError):
+                files = list_changed(root / path, old, pathspecs, recurse_submodules=True)
+        if files is None:
+            files = [p for _, _, p in list_index(root / path, pathspecs, recurse_submodules=True)]
+            files += list_untracked(root / path, pathspecs)
+        changed.update(f"{path}/{name}" for name in files)
+    return sorted(changed)
+
+
+def read_blobs(root: Path, objects: Iterable[str]) -> Dict[str, str]:
+    """Return the content of the given blobs of the repository at `root`, read in one call."""
+
+    objects = list(dict.fromkeys(objects))
+    if not objects:
+        return {}
+    output = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        input=("\n".join(objects) + "\n").encode(),
+        cwd=str(root),
+        check=True,
+        capture_output=True,
+    ).stdout
+
+    blobs, offset = {}, 0
+    for obj in objects:
+        end = output.index(b"\n", offset)
+        header = output[offset:end].split()
+        offset = end + 1
+        if header[-1] == b"missing":
+            continue
+        size = int(header[2])
+        blobs[obj] = output[offset : offset + size].decode("utf-8", errors="replace")
+        offset += size + 1
+    return blobs
+
+
+def manifest_pathspecs(shallow: bool = False) -> List[str]:
+    """Return pathspecs matching manifests (at most one level deep with `shallow`)."""
+
+    if shallow:
+        return [f":(glob){name}" for name in MANIFEST_NAMES] + [
+            f":(glob)*/{name}" for name in MANIFEST_NAMES
+        ]
+    return [f":(glob)**/{name}" for name in MANIFEST_NAMES]
+
+
+def tracked_symlinks(root: Path, top_level: bool = True) -> Dict[str, str]:
+    """Map each symlink of the index to its target, normalized relative to `root`.
+
+    Only top-level links (where osh creates addon links) are listed unless `top_level`
+    is False. Links are read with readlink, targets are not resolved on disk; absolute
+    targets are made relative to `root`, like `helpers.top_level_symlinks` does.
+    """
+
+    links = {}
+    pathspecs = [":(glob)*"] if top_level else []
+    for mode, _, path in list_index(root, pathspecs):
+        if mode != MODE_SYMLINK:
+            continue
+        try:
+            target = os.readlink(root / path)
+        except OSError:
+            continue
+        if os.path.isabs(target):
+            target = os.path.relpath(target, root)
+        else:
+            target = os.path.join(os.path.dirname(path), target)
+        links[path] = os.path.normpath(target)
+    return links
+
+
+def _is_pruned(path: str, prune: Tuple[str, ...]) -> bool:
+    return any(fnmatchcase(part, pattern) for part in path.split("/") for pattern in prune)
+
+
+def tracked_addon_paths(  # noqa: C901, PLR0912
+    root: Path,
+    shallow: bool = False,
+    prune: Iterable[str] = ADDONS_PRUNE_PATTERNS,
+    submodules: bool = True,
+) -> List[Tuple[str, str]]:
+    """
+    Return (addon_dir, manifest_path), relative to `root`, for each addon listed in the index.
+
+    Manifests come from the superproject index and, unless `shallow` or not `submodules`,
+    from the index of each initialized submodule. Top-level symlinks pointing to an addon
+    are reported under their link name, like the directory walk does. Untracked addons are
+    picked up from `git ls-files --others`. Paths are sorted and nested manifests are ignored.
+    """
+
+    prune = tuple(prune)
+    manifests = {}
+    symlinks = []
+
+    pathspecs = [*manifest_pathspecs(shallow), ":(glob)*"]
+    recurse = submodules and not shallow
+    for mode, _, path in list_index(root, pathspecs, recurse_submodules=recurse):
+        if mode == MODE_SYMLINK and "/" not in path:
+            symlinks.append(path)
+        elif os.path.basename(path) in MANIFEST_NAMES:
+            manifests.setdefault(os.path.dirname(path), []).append(path)
+
+    for path in list_untracked(root, manifest_pathspecs(shallow)):
+        manifests.setdefault(os.path.dirname(path), []).append(path)
+
+    found = {}
+    for addon_dir in sorted(manifests):
+        if _is_pruned(addon_dir, prune):
+            continue
+        names = [os.path.basename(p) for p in manifests[addon_dir]]
+        manifest_name = next(n for n in MANIFEST_NAMES if n in names)
+        found[addon_dir] = os.path.join(addon_dir, manifest_name)
+
+    # addons never nest: drop manifests living under another addon
+    for addon_dir in list(found):
+        parent = os.path.dirname(addon_dir)
+        while parent:
+            if parent in found:
+                del found[addon_dir]
+                break
+            parent = os.path.dirname(parent)
+
+    for link in symlinks:
+        if _is_pruned(link, prune) or link in found:
+            continue
+        try:
+            target = os.path.normpath(os.path.join(os.path.dirname(link), os.readlink(root / link)))
+        except OSError:
+            continue
+        if target in found:
+            found[link] = os.path.join(link, os.path.basename(found[target]))
+            continue
+        # target outside of the listed manifests (e.g. shallow scan): check on disk
+        for name in MANIFEST_NAMES:
+            if os.path.isfile(root / link / name):
+                found[link] = os.path.join(link, name)
+                break
+
+    return sorted(found.items())
+
+
+def iter_tracked_addon_dirs(
+    root: Path,
+    shallow: bool = False,
+    prune: Iterable[str] = ADDONS_PRUNE_PATTERNS,
+    submodules: bool = True,
+) -> Generator[Tuple[str, str], None, None]:
+    """Same as `osh.helpers.iter_addon_dirs`, backed by the git index instead of a walk."""
+
+    for addon_dir, manifest_path in tracked_addon_paths(
+        root, shallow=shallow, prune=prune, submodules=submodules
+    ):
+        yield os.path.join(str(root), addon_dir), os.path.join(str(root), manifest_path)
@@ -0,0 +1,205 @@
+"""
+In-process model of a .gitmodules file.
+
+Reading and editing .gitmodules through `git config -f` costs one process per key;
+this model parses the file once, applies edits in memory and writes it back atomically,
+keeping comments, indentation and the order of sections and keys.
+"""
+
+import re
+from pathlib import Path
+
+from osh.compat import Dict, Iterator, List, Optional, Tuple
+from osh.utils import write_atomic
+
+_SECTION = re.compile(r'^\s*\[\s*submodule\s+"((?:[^"\\]|\\.)*)"\s*\]\s*(?:[#;].*)?$')
+_OTHER_SECTION = re.compile(r"^\s*\[")
+_KEY = re.compile(r"^(\s*)([A-Za-z][A-Za-z0-9-]*)\s*=\s*(.*?)\s*$")
+
+
+def _unescape(raw: str) -> str:
+    return re.sub(r"\\(.)", r"\1", raw)
+
+
+def _escape(name: str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _parse_value(raw: str) -> str:
+    """Return a config value without quotes, escapes and trailing comment."""
+
+    value, quoted, i = [], False, 0
+    while i < len(raw):
+        char = raw[i]
+        if char == "\\" and i + 1 < len(raw):
+            value.append({"n": "\n", "t": "\t"}.get(raw[i + 1], raw[i + 1]))
+            i += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif char in "#;" and not quoted:
+            break
+        else:
+            value.append(char)
+        i += 1
+    return "".join(value).strip()
+
+
+def _format_value(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    if escaped != value.strip() or any(c in value for c in "#;"):
+        return f'"{escaped}"'
+    return escaped
+
+
+class GitModules:
+    """
+    Submodule sections of a .gitmodules file, edited in memory.
+
+    `save()` writes the file once, and only when something changed. Callers are
+    expected to run a single `git submodule sync` afterwards if paths or urls changed.
+    """
+
+    def __init__(self, filepath: Path, text: str = ""):
+        self.filepath = Path(filepath)
+        self._lines: List[str] = text.splitlines(keepends=True)
+        self._dirty = False
+
+    @classmethod
+    def load(cls, filepath: Path) -> "GitModules":
+        filepath = Path(filepath)
+        text = filepath.read_text(encoding="utf-8") if filepath.exists() else ""
+        return cls(filepath, text)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._lines)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def _sections(self) -> Dict[str, Tuple[int, int]]:
+        """Return {name: (header line, end line)} for each submodule section."""
+
+        sections: Dict[str, Tuple[int, int]] = {}
+        current, start = None, 0
+        for i, line in enumerate(self._lines):
+            match = _SECTION.match(line)
+            if match or _OTHER_SECTION.match(line):
+                if current is not None:
+                    sections.setdefault(current, (start, i))
+                current, start = (_unescape(match.group(1)), i) if match else (None, i)
+        if current is not None:
+            sections.setdefault(current, (start, len(self._lines)))
+        return sections
+
+    def _keys(self, start: int, end: int) -> Iterator[Tuple[int, str, str, str]]:
+        """Yield (line index, indent, key, raw value) for the keys of a section."""
+
+        for i in range(start + 1, end):
+            match = _KEY.match(self._lines[i])
+            if match:
+                yield i, match.group(1), match.group(2).lower(), match.group(3)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections())
+
+    def names(self) -> List[str]:
+        return list(self._sections())
+
+    def get(self, name: str, key: str, default: Optional[str] = None) -> Optional[str]:
+        section = self._sections().get(name)
+        if section is None:
+            return default
+        value = default
+        for _, _, k, raw in self._keys(*section):
+            if k == key.lower():
+                value = _parse_value(raw)  # the last one wins, like git config
+        return value
+
+    def to_dict(self) -> Dict[str, Dict[str, str]]:
+        """Return {name: {key: value}} for every submodule."""
+
+        return {
+            name: {k: _parse_value(raw) for _, _, k, raw in self._keys(*section)}
+            for name, section in self._sections().items()
+        }
+
+    def set(self, name: str, key: str, value: str) -> None:
+        """Set a key of a submodule, creating the section if needed."""
+
+        section = self._sections().get(name)
+        if section is None:
+            self.add(name, **{key: value})
+            return
+
+        keys = list(self._keys(*section))
+        for i, indent, k, raw in reversed(keys):
+            if k == key.lower():
+                if _parse_value(raw) != value:
+                    newline = "\n" if self._lines[i].endswith("\n") else ""
+                    self._lines[i] = f"{indent}{key} = {_format_value(value)}{newline}"
+                    self._dirty = True
+                return
+
+        indent = keys[-1][1] if keys else "\t"
+        at = keys[-1][0] + 1 if keys else section[0] + 1
+        self._ensure_newline(at - 1)
+        self._lines.insert(at, f"{indent}{key} = {_format_value(value)}\n")
+        self._dirty = True
+
+    def unset(self, name: str, key: str) -> None:
+        section = self._sections().get(name)
+        if section is None:
+            return
+        for i, _, k, _ in reversed(list(self._keys(*section))):
+            if k == key.lower():
+                del self._lines[i]
+                self._dirty = True
+
+    def add(self, name: str, **values: str) -> None:
+        """Append a submodule section (path, url, branch... in the given order)."""
+
+        if name in self:
+            for key, value in values.items():
+                self.set(name, key, value)
+            return
+
+        self._ensure_newline(len(self._lines) - 1)
+        self._lines.append(f'[submodule "{_escape(name)}"]\n')
+        self._lines += [f"\t{key} = {_format_value(value)}\n" for key, value in values.items()]
+        self._dirty = True
+
+    def remove(self, name: str) -> None:
+        section = self._sections().get(name)
+        if section is not None:
+            del self._lines[section[0] : section[1]]
+            self._dirty = True
+
+    def rename(self, name: str, new_name: str) -> None:
+        """Rename a submodule section in place, keeping its keys and position."""
+
+        if new_name in self:
+            raise ValueError(f"A submodule named '{new_name}' already exists in .gitmodules.")
+        section = self._sections().get(name)
+        if section is None:
+            raise KeyError(name)
+        self._lines[section[0]] = f'[submodule "{_escape(new_name)}"]\n'
+        self._dirty = True
+
+    def _ensure_newline(self, i: int) -> None:
+        if 0 <= i < len(self._lines) and not self._lines[i].endswith("\n"):
+            self._lines[i] += "\n"
+
+    def save(self) -> bool:
+        """Write the file atomically if it changed, return True if it was written."""
+
+        if not self._dirty:
+            return False
+        write_atomic(self.filepath, self.text)
+        self._dirty = False
+        return True
@@ -3,18 +3,32 @@ import logging
 import os
 import re
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
+from itertools import zip_longest
 from pathlib import Path
 from warnings import warn
 
-from osh.compat import Optional, Union
+from osh.cache import AddonIndex
+from osh.compat import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from osh.exceptions import NoGitRepository
-from osh.helpers import ensure_parent, find_addons_extended
+from osh.gitindex import list_index, manifest_pathspecs, read_blobs
+from osh.gitmodules import GitModules
+from osh.helpers import (
+    ensure_parent,
+    find_addons_extended,
+    parse_manifest,
+    sparse_dirs,
+    top_level_symlinks,
+)
 from osh.models import CommitInfo
+from osh.settings import FETCH_JOBS, FETCH_JOBS_PER_HOST
 from osh.utils import (
     human_readable,
     is_pull_request_path,
     parse_repository_url,
+    repository_host,
     run,
 )
 
@@ -36,6 +50,13 @@ def commit_if_needed(paths, message, add=True):
         return False
 
 
+def has_staged_changes(paths: Optional[list] = None) -> bool:
+    """Return True if the index differs from HEAD (for the given paths only if any)."""
+
+    cmd = ["git", "diff", "--cached", "--quiet", "--exit-code", "--"] + (paths or [])
+    return subprocess.call(cmd) != 0
+
+
 def git_add(paths: list):
     cmd = ["git", "add"] + paths
     subprocess.check_call(cmd)
@@ -76,27 +97,80 @@ def commit(message: str, description: Optional[str] = None, skip_hook: bool = Fa
     run(cmd, name="commit")
 
 
-def add_submodule(url: str, name: str, path: str, branch: Optional[str] = None) -> None:
-    cmd = [
-        "git",
-        "submodule",
-        "add",
-        "--name",
-        name,
-    ]
-    if branch:
-        cmd.extend(["-b", branch])
-    cmd.extend([url, path])
+def clone_options(
+    depth: Optional[int] = None, filter: Optional[str] = None, single_branch: bool = False
+) -> List[str]:
+    """Return the git clone options for a shallow (`depth`) and/or partial (`filter`) clone."""
+
+    options = []
+    if depth:
+        options.append(f"--depth={depth}")
+    if filter:
+        options.append(f"--filter={filter}")
+    if single_branch:
+        options.append("--single-branch")
+    return options
+
+
+def add_submodule(  # noqa: PLR0913
+    url: str,
+    name: str,
+    path: str,
+    branch: Optional[str] = None,
+    *,
+    depth: Optional[int] = None,
+    filter: Optional[str] = None,
+    single_branch: bool = False,
+    reference: Optional[str] = None,
+) -> None:
+    """
+    Add the repository at url as submodule `name` in path.
+
+    `git submodule add` cannot make a partial clone, so with clone options the repository
+    is cloned first, then added as an existing repository and its git dir absorbed in the
+    superproject like for a regular submodule. With a `reference` repository (a local
+    mirror), the clone is made from it and shares its objects, without network access;
+    clone options are then pointless and ignored.
+    """
+
+    options = clone_options(depth, filter, single_branch)
+    branch_args = ["-b", branch] if branch else []
+    if reference:
+        cmd = ["git", "clone", "--quiet", "--shared", *branch_args, "--", reference, path]
+        run(cmd, name="clone")
+        run(["git", "-C", path, "remote", "set-url", "origin", url], name="remote")
+    elif options:
+        cmd = ["git", "clone", "--quiet", *options, *branch_args, "--", url, path]
+        run(cmd, name="clone")
+
+    cmd = ["git", "submodule", "add", "--name", name, *branch_args, url, path]
     run(cmd, name="add submodule")
 
+    if reference or options:
+        run(["git", "submodule", "absorbgitdirs", "--", path], name="absorbgitdirs")
+
 
 def submodule_sync() -> None:
     cmd = ["git", "submodule", "sync", "--recursive"]
     run(cmd, name="sync")
 
 
-def submodule_update(path: Optional[str] = None) -> None:
+def submodule_update(
+    path: Optional[str] = None,
+    *,
+    depth: Optional[int] = None,
+    filter: Optional[str] = None,
+    single_branch: bool = False,
+) -> None:
+    """
+    Initialize and checkout submodules (all of them, recursively, unless path is given).
+
+    Submodules recorded with `shallow = true` in .gitmodules are cloned with a depth of 1
+    by git itself, the clone options apply to the submodules cloned by this call.
+    """
+
     cmd = ["git", "submodule", "update", "--init"]
+    cmd.extend(clone_options(depth, filter, single_branch))
 
     if path:
         cmd.extend(["--", path])
@@ -106,12 +180,44 @@ def submodule_update(path: Optional[str] = None) -> None:
     run(cmd, name="update")
 
 
+def submodule_restore(paths: List[str], jobs: Optional[int] = None) -> None:
+    """
+    Checkout the recorded commit of the given submodules, discarding local changes.
+
+    Missing submodules are checked out again from .git/modules, or cloned if they never
+    were; git clones up to `jobs` of them at once.
+    """
+
+    cmd = ["git", "submodule", "update", "--init", "--force", "--recursive"]
+    if jobs:
+        cmd.append(f"--jobs={jobs}")
+    run([*cmd, "--", *paths], name="update")
+
+
+def submodule_update_from(name: str, path: str, reference: str) -> None:
+    """
+    Initialize and checkout the submodule `name` from a local mirror of its repository.
+
+    The submodule is cloned from `reference` and shares its objects, without network
+    access, then its URL is restored from .gitmodules (even when the update fails).
+    """
+
+    run(["git", "submodule", "init", "--", path], name="init")
+    run(["git", "config", f"submodule.{name}.url", reference], name="config")
+    try:
+        # the mirror is a local repository, which submodule commands refuse by default
+        cmd = ["git", "-c", "protocol.file.allow=always", "submodule", "update"]
+        run([*cmd, "--reference", reference, "--", path], name="update")
+    finally:
+        run(["git", "submodule", "sync", "--quiet", "--", path], name="sync")
+
+
 def git_reset_hard() -> None:
     run(["git", "reset", "--hard"])
 
 
-def git_top() -> Path:
-    out = run(["git", "rev-parse", "--show-toplevel"], capture=True, name="top")
+def git_top(cwd: Optional[str] = None) -> Path:
+    out = run(["git", "rev-parse", "--show-toplevel"], capture=True, cwd=cwd, name="top")
     if not out:
         raise NoGitRepository()
 
@@ -142,7 +248,7 @@ def git_get_regexp(gitmodules: Path, pattern: str):
 
 
 def parse_submodules(gitmodules: Path):
-    """Parse .gitmodules with regexp (deprecated)."""
+    """Return {name: {url, path, branch}} from .gitmodules (deprecated)."""
 
     warn(
         "`parse_submodules` is deprecated, use `parse_gitmodules` instead.",
@@ -150,24 +256,14 @@ def parse_submodules(gitmodules: Path):
         stacklevel=0,
     )
 
-    urls = git_get_regexp(gitmodules, r"^submodule\..*\.url$")
-    paths = git_get_regexp(gitmodules, r"^submodule\..*\.path$")
-    branches = git_get_regexp(gitmodules, r"^submodule\..*\.branch$")
-    info = {}
-    for k, v in urls:
-        name = k.split(".")[1]
-        info.setdefault(name, {})["url"] = v
-    for k, v in paths:
-        name = k.split(".")[1]
-        info.setdefault(name, {})["path"] = v
-    for k, v in branches:
-        name = k.split(".")[1]
-        info.setdefault(name, {})["branch"] = v
-    return info
+    return {
+        name: {key: values[key] for key in ("url", "path", "branch") if key in values}
+        for name, values in GitModules.load(gitmodules).to_dict().items()
+    }
 
 
 def parse_submodules_extended(gitmodules: Path):
-    """Parse .gitmodules with regexp (deprecated)."""
+    """Return {name: {path, url, branch}} from .gitmodules, missing keys being None (deprecated)."""
 
     warn(
         "`parse_submodules_extended` is deprecated, use `parse_gitmodules` instead.",
@@ -175,19 +271,10 @@ def parse_submodules_extended(gitmodules: Path):
         stacklevel=0,
     )
 
-    paths = {k.split(".")[1]: v for k, v in git_get_regexp(gitmodules, r"^submodule\..*\.path$")}
-    urls = {k.split(".")[1]: v for k, v in git_get_regexp(gitmodules, r"^submodule\..*\.url$")}
-    branches = {
-        k.split(".")[1]: v for k, v in git_get_regexp(gitmodules, r"^submodule\..*\.branch$")
-    }  # noqa: E501
-    out = {}
-    for name in set(paths) | set(urls) | set(branches):
-        out[name] = {
-            "path": paths.get(name),
-            "url": urls.get(name),
-            "branch": branches.get(name),
-        }
-    return out
+    return {
+        name: {key: values.get(key) for key in ("path", "url", "branch")}
+        for name, values in GitModules.load(gitmodules).to_dict().items()
+    }
 
 
 def move_with_git(src: Path, dst: Path):
@@ -268,27 +355,120 @@ def update_gitignore(  # noqa: C901
     return True
 
 
+def index_addons(path: Path):
+    """Yield (name, path, manifest) for each addon of the git index of the repository at path.
+
+    Unlike `find_addons_extended`, addons outside of a sparse checkout are listed too.
+    """
+
+    entries = [
+        (entry_path, obj)
+        for _, obj, entry_path in list_index(path, manifest_pathspecs(shallow=True))
+        if "/" in entry_path
+    ]
+    blobs = read_blobs(path, [obj for _, obj in entries])
+    seen = set()
+    for entry_path, obj in entries:
+        name = os.path.dirname(entry_path)
+        if name in seen or obj not in blobs:
+            continue
+        seen.add(name)
+        try:
+            manifest = parse_manifest(blobs[obj])
+        except (SyntaxError, ValueError):
+            continue
+        yield name, str(path / name), manifest
+
+
 def list_available_addons(root: Path):
     gitmodules = root / ".gitmodules"
 
     if not gitmodules.exists():
         raise FileNotFoundError()
 
-    subs = parse_submodules_extended(gitmodules)
-
-    for _, info in subs.items():
-        sub_path = info.get("path")
-        if not sub_path:
-            continue
-        abs_path = root / sub_path
-        if not abs_path.exists():
-            with contextlib.suppress(subprocess.CalledProcessError):
-                submodule_update(sub_path)
+    index = AddonIndex.from_root(root)
 
-            # re-check
-            if not abs_path.exists():
+    try:
+        for _, sub_path, _, _, _ in parse_gitmodules(gitmodules):
+            if not sub_path:
                 continue
-        yield from find_addons_extended(abs_path)
+            abs_path = root / sub_path
+            if not abs_path.exists():
+                with contextlib.suppress(subprocess.CalledProcessError):
+                    submodule_update(sub_path)
+
+                # re-check
+                if not abs_path.exists():
+                    continue
+            if sparse_checkout_list(str(abs_path)) is not None:
+                # addons outside of the sparse checkout are not on disk
+                yield from index_addons(abs_path)
+            else:
+                yield from find_addons_extended(abs_path, index=index)
+    finally:
+        index.save()
+
+
+def sparse_checkout_list(path: str) -> Optional[List[str]]:
+    """Return the directories checked out in a sparse repository, None if not sparse."""
+
+    result = subprocess.run(
+        ["git", "-C", path, "config", "--bool", "core.sparseCheckout"],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    if result.stdout.strip() != "true":
+        return None
+    output = run(["git", "-C", path, "sparse-checkout", "list"], capture=True, name="sparse")
+    return sorted(line for line in (output or "").splitlines() if line)
+
+
+def sparse_checkout_set(path: str, dirs: List[str]) -> None:
+    """Limit the checkout of the repository at path to `dirs` (cone mode) and top-level files."""
+
+    run(
+        ["git", "-C", path, "sparse-checkout", "set", "--cone", "--", *dirs], name="sparse-checkout"
+    )
+
+
+def sparse_checkout_disable(path: str) -> None:
+    run(["git", "-C", path, "sparse-checkout", "disable"], name="sparse")
+
+
+def update_sparse_checkouts(
+    root: Path, paths: Optional[Iterable[str]] = None, enable: bool = False
+) -> Dict[str, Optional[List[str]]]:
+    """
+    Limit the checkout of submodules to the addon directories the root symlinks point to.
+
+    Only the submodules already sparse are updated, unless `enable`. A submodule with a
+    link to its root, or without any link, is fully checked out (never narrowed to
+    nothing). Return {path: dirs} for the submodules
+    changed, dirs being None when the sparse checkout was disabled.
+    """
+
+    subs = [path for _, path, _, _, _ in parse_gitmodules(root / ".gitmodules") if path]
+    if paths is not None:
+        wanted = set(paths)
+        subs = [path for path in subs if path in wanted]
+
+    changed = {}
+    for path, dirs in sparse_dirs(top_level_symlinks(root), subs).items():
+        sub = str(root / path)
+        if not os.path.exists(os.path.join(sub, ".git")):
+            continue
+        current = sparse_checkout_list(sub)
+        if current is None and (dirs is None or not enable):
+            continue
+        if dirs is None:
+            sparse_checkout_disable(sub)
+        elif current != dirs:
+            sparse_checkout_set(sub, dirs)
+        else:
+            continue
+        changed[path] = dirs
+    return changed
 
 
 def guess_submodule_name(url: str, pull_request: bool = False) -> str:
@@ -317,47 +497,27 @@ def get_submodule_config(filepath: str, name: str, key: str) -> Optional[str]:
     return None
 
 
-def rename_submodule(  # noqa: PLR0913
-    gitmodules_file: str,
-    name: str,
-    new_name: str,
-    values: dict,
-    dry_run: bool = False,
-):
-    """Rename a git submodule from `name` to `new_name`, keeping the same path/url/branch."""
+def rename_submodule(gitmodules: GitModules, name: str, new_name: str, dry_run: bool = False):
+    """
+    Rename a git submodule from `name` to `new_name`, keeping the same path/url/branch.
 
-    # Guard if new_name already exists
-    existing_new_path = get_submodule_config(gitmodules_file, new_name, "path")
+    Only the in-memory `gitmodules` is edited: save it and run `submodule_sync` once
+    all submodules are renamed.
+    """
 
-    if existing_new_path:
+    # Guard if new_name already exists
+    if new_name in gitmodules:
         raise ValueError(f"A submodule named '{new_name}' already exists in .gitmodules.")
 
-    path = values.get("path")
-    url = values.get("url")
-    branch = values.get("branch")
-
-    logging.debug(f"Renaming submodule identifier '{name}' -> '{new_name}' (path stays '{path}')")
+    logging.debug(
+        f"Renaming submodule identifier '{name}' -> '{new_name}' "
+        f"(path stays '{gitmodules.get(name, 'path')}')"
+    )
     if dry_run:
-        logging.info("[dry-run] Would write .gitmodules: submodule.{name} -> submodule.{new_name}")
-        logging.info("[dry-run] Would remove old sections from .gitmodules and .git/config")
-        logging.info("[dry-run] Would run: git submodule sync --recursive")
+        logging.info(f"[dry-run] Would write .gitmodules: submodule.{name} -> submodule.{new_name}")
         return
 
-    # Write new section in .gitmodules
-    run(["git", "config", "-f", gitmodules_file, f"submodule.{new_name}.path", path])
-    run(["git", "config", "-f", gitmodules_file, f"submodule.{new_name}.url", url])
-    if branch:
-        run(["git", "config", "-f", gitmodules_file, f"submodule.{new_name}.branch", branch])
-
-    # Remove old section from .gitmodules and local .git/config
-    run(
-        ["git", "config", "-f", gitmodules_file, "--remove-section", f"submodule.{name}"],
-        check=False,
-    )
-    # run(["git", "config", "--remove-section", f"submodule.{name}"], check=False)
-
-    # Sync .git/config from .gitmodules
-    run(["git", "submodule", "sync", "--recursive"])
+    gitmodules.rename(name, new_name)
 
 
 def get_last_tag() -> Optional[str]:
@@ -428,6 +588,22 @@ def get_last_commit(path: Optional[str] = None) -> Optional[CommitInfo]:
         return None
 
 
+def get_last_commits(
+    paths: Iterable[Optional[str]], jobs: Optional[int] = None
+) -> List[Optional[CommitInfo]]:
+    """
+    Return the last commit of each repository in `paths`, in the same order.
+
+    Repositories are queried concurrently by `jobs` threads (0 or None: the pool default).
+    """
+
+    if jobs == 1:
+        return [get_last_commit(path) for path in paths]
+
+    with ThreadPoolExecutor(max_workers=jobs or None) as pool:
+        return list(pool.map(get_last_commit, paths))
+
+
 def get_remote_url(path=".", origin="origin") -> tuple:
     """Return (url, owner, repo) for the given git repository path and remote name."""
 
@@ -468,21 +644,146 @@ def parse_gitmodules(filepath: Path):
         yield name, path, branch, url, pr
 
 
-def update_from(path: str, branch: str) -> None:
-    """Fetch, checkout and pull the given branch for the git repository at path."""
+def fetch_branch(path: str, branch: str, remote: str = "origin") -> None:
+    """Fetch `branch` from `remote` (origin or a mirror) into origin/<branch> at path."""
 
+    refspec = f"+refs/heads/{branch}:refs/remotes/origin/{branch}"
     subprocess.run(
-        ["git", "-C", path, "fetch", "origin", branch],
+        ["git", "-C", path, "fetch", "--quiet", remote, refspec],
         check=True,
+        capture_output=True,
+        text=True,
     )
-    subprocess.run(
-        ["git", "-C", path, "checkout", branch],
+
+
+def fast_forward(path: str, branch: str) -> None:
+    """Checkout `branch` and fast-forward it to origin/<branch>, without network access."""
+
+    for cmd in (
+        ["checkout", "--quiet", branch],
+        ["merge", "--quiet", "--ff-only", f"origin/{branch}"],
+    ):
+        subprocess.run(["git", "-C", path, *cmd], check=True, capture_output=True, text=True)
+
+
+def update_from(path: str, branch: str) -> None:
+    """Fetch, checkout and fast-forward the given branch for the git repository at path."""
+
+    fetch_branch(path, branch)
+    fast_forward(path, branch)
+
+
+def git_error(error: subprocess.CalledProcessError) -> str:
+    """Return the last line git printed on stderr for a failed command."""
+
+    stderr = (error.stderr or "").strip()
+    return stderr.splitlines()[-1] if stderr else str(error)
+
+
+def remote_head(path: str, branch: str) -> str:
+    """Return the commit `branch` points to on origin, with a single ls-remote (no fetch)."""
+
+    result = subprocess.run(
+        ["git", "-C", path, "ls-remote", "--exit-code", "origin", f"refs/heads/{branch}"],
         check=True,
+        capture_output=True,
+        text=True,
     )
-    subprocess.run(
-        ["git", "-C", path, "pull", "origin", branch],
+    return result.stdout.split("\t", 1)[0]
+
+
+def mirror_head(mirror: str, branch: str) -> str:
+    """Return the commit `branch` points to in a local mirror, without network access."""
+
+    result = subprocess.run(
+        ["git", "-C", mirror, "rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"],
         check=True,
+        capture_output=True,
+        text=True,
     )
+    return result.stdout.strip()
+
+
+def local_head(path: str) -> Optional[str]:
+    """Return the commit checked out in the git repository at path, None if there is none."""
+
+    result = subprocess.run(
+        ["git", "-C", path, "rev-parse", "--verify", "--quiet", "HEAD"],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def map_per_host(
+    func: Callable[[str, str], Any],
+    items: List[Tuple[str, str, str]],
+    jobs: int = FETCH_JOBS,
+    per_host: int = FETCH_JOBS_PER_HOST,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Call func(path, branch) concurrently for (path, branch, url) items.
+
+    Return ({path: result}, {path: error}) where errors are the git messages of the
+    calls that failed. At most `jobs` calls run at once, and at most `per_host` against
+    the same git host to stay clear of rate limits. Items are submitted round-robin
+    across hosts so that workers rarely wait on a busy host.
+    """
+
+    by_host: Dict[str, list] = {}
+    for path, branch, url in items:
+        by_host.setdefault(repository_host(url or ""), []).append((path, branch))
+    limits = {host: threading.BoundedSemaphore(per_host) for host in by_host}
+    queue = [
+        (host, item)
+        for batch in zip_longest(*by_host.values())
+        for host, item in zip(by_host, batch)
+        if item is not None
+    ]
+
+    def call(host: str, path: str, branch: str) -> Tuple[Any, Optional[str]]:
+        with limits[host]:
+            try:
+                return func(path, branch), None
+            except subprocess.CalledProcessError as error:
+                return None, git_error(error)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {path: pool.submit(call, host, path, branch) for host, (path, branch) in queue}
+
+    results, errors = {}, {}
+    for path, future in futures.items():
+        result, error = future.result()
+        if error:
+            errors[path] = error
+        else:
+            results[path] = result
+    return results, errors
+
+
+def resolve_remote_heads(
+    items: List[Tuple[str, str, str]],
+    jobs: int = FETCH_JOBS,
+    per_host: int = FETCH_JOBS_PER_HOST,
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Resolve the upstream head of (path, branch, url) submodules with parallel ls-remote.
+
+    Return ({path: sha}, {path: error}).
+    """
+
+    return map_per_host(remote_head, items, jobs=jobs, per_host=per_host)
+
+
+def fetch_submodules(
+    fetches: List[Tuple[str, str, str]],
+    jobs: int = FETCH_JOBS,
+    per_host: int = FETCH_JOBS_PER_HOST,
+) -> Dict[str, str]:
+    """Fetch (path, branch, url) submodules concurrently, return {path: error} for failures."""
+
+    _, errors = map_per_host(fetch_branch, fetches, jobs=jobs, per_host=per_host)
+    return errors
 
 
 def load_repo(change_dir: bool = True):
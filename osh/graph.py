@@ -0,0 +1,291 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+from collections import deque
+from pathlib import Path
+
+from osh.cache import AddonIndex, cache_path
+from osh.compat import Dict, Iterable, List, Optional, Set
+from osh.exceptions import DependencyCycle
+from osh.helpers import discover_addon_dirs, get_manifest_path
+from osh.models import AddonInfo
+from osh.settings import ADDONS_GRAPH_FILE, ADDONS_INDEX_VERSION, ODOO_CORE_ADDONS
+from osh.utils import write_atomic
+
+
+class AddonGraph:
+    """
+    Dependency graph of addons, built from the `depends` key of their manifests.
+
+    Dependencies that are not part of the graph are kept as edges and reported by
+    `missing`, except Odoo core addons (see `core_addons`) which are reported by `core`.
+    Every query is linear in the size of the visited part of the graph.
+    """
+
+    def __init__(self, depends: Dict[str, Iterable[str]]):
+        self.depends: Dict[str, List[str]] = {
+            name: sorted(set(deps)) for name, deps in depends.items()
+        }
+        self._reverse: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def from_addons(cls, addons: Iterable) -> "AddonGraph":
+        """Build the graph from AddonInfo objects, the first addon found for a name wins."""
+
+        depends = {}
+        for addon in addons:
+            depends.setdefault(addon.technical_name, addon.depends)
+        return cls(depends)
+
+    @property
+    def reverse(self) -> Dict[str, List[str]]:
+        """Map each addon (known or missing) to the addons depending directly on it."""
+
+        if self._reverse is None:
+            reverse: Dict[str, List[str]] = {}
+            for name in sorted(self.depends):
+                for dep in self.depends[name]:
+                    reverse.setdefault(dep, []).append(name)
+            self._reverse = reverse
+        return self._reverse
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.depends
+
+    def __len__(self) -> int:
+        return len(self.depends)
+
+    @staticmethod
+    def _closure(edges: Dict[str, List[str]], names: Iterable[str]) -> Set[str]:
+        start = set(names)
+        seen: Set[str] = set()
+        queue = deque(start)
+        while queue:
+            for nxt in edges.get(queue.popleft(), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(nxt)
+        return seen - start
+
+    def dependencies(self, names: Iterable[str]) -> Set[str]:
+        """Return the transitive dependencies of `names` (missing ones included)."""
+
+        return self._closure(self.depends, names)
+
+    def dependents(self, names: Iterable[str]) -> Set[str]:
+        """Return every addon depending, directly or not, on one of `names`."""
+
+        return self._closure(self.reverse, names)
+
+    def _absent(self, core_addons: Iterable[str], core: bool) -> Dict[str, List[str]]:
+        core_addons = set(core_addons)
+        return {
+            dep: parents
+            for dep, parents in sorted(self.reverse.items())
+            if dep not in self.depends and (dep in core_addons) == core
+        }
+
+    def missing(self, core_addons: Iterable[str] = ODOO_CORE_ADDONS) -> Dict[str, List[str]]:
+        """Map each dependency absent from the graph (core addons aside) to its dependents."""
+
+        return self._absent(core_addons, core=False)
+
+    def core(self, core_addons: Iterable[str] = ODOO_CORE_ADDONS) -> Dict[str, List[str]]:
+        """Map each Odoo core addon absent from the graph to the addons requiring it."""
+
+        return self._absent(core_addons, core=True)
+
+    def cycles(self) -> List[List[str]]:  # noqa: C901, PLR0912
+        """Return the dependency cycles (strongly connected components), sorted."""
+
+        # iterative Tarjan, to stay clear of the recursion limit on large inventories
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        result = []
+        counter = 0
+
+        for start in sorted(self.depends):
+            if start in index:
+                continue
+            work = [(start, iter(self.depends[start]))]
+            index[start] = lowlink[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in self.depends:
+                        continue
+                    if child not in index:
+                        index[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.depends[child])))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.depends[node]:
+                            result.append(sorted(component))
+
+        return sorted(result)
+
+    def install_order(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Return addons in a valid installation order (dependencies first).
+
+        Limited to `names` and their dependencies when given. Ties are broken
+        alphabetically so the order is stable. Raises DependencyCycle if some
+        addons cannot be ordered.
+        """
+
+        if names is None:
+            nodes = set(self.depends)
+        else:
+            names = set(names)
+            nodes = {n for n in names | self.dependencies(names) if n in self.depends}
+
+        indegree = {n: sum(1 for d in self.depends[n] if d in nodes) for n in nodes}
+        heap = [n for n, degree in indegree.items() if degree == 0]
+        heapq.heapify(heap)
+
+        order = []
+        while heap:
+            name = heapq.heappop(heap)
+            order.append(name)
+            for child in self.reverse.get(name, ()):
+                if child in indegree:
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        heapq.heappush(heap, child)
+
+        if len(order) < len(nodes):
+            members = {n for cycle in self.cycles() for n in cycle if n in nodes}
+            raise DependencyCycle(sorted(members))
+        return order
+
+    def to_dict(self) -> dict:
+        return {"depends": self.depends}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AddonGraph":
+        return cls(data["depends"])
+
+
+def core_addons(addons_path: Iterable[str] = ()) -> Set[str]:
+    """
+    Return the names of the addons found in the directories of an Odoo addons path.
+
+    Without directories, return the built-in (fallback) list ODOO_CORE_ADDONS.
+    """
+
+    addons_path = list(addons_path)
+    if not addons_path:
+        return set(ODOO_CORE_ADDONS)
+
+    names = set()
+    for path in addons_path:
+        for entry in os.scandir(path):
+            if entry.is_dir() and get_manifest_path(entry.path):
+                names.add(entry.name)
+    return names
+
+
+def _read_graph(filepath: Path, fingerprint: str) -> Optional[AddonGraph]:
+    try:
+        data = json.loads(filepath.read_text(encoding="utf-8"))
+        if data.get("version") != ADDONS_INDEX_VERSION or data.get("fingerprint") != fingerprint:
+            return None
+        return AddonGraph.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_graph(filepath: Path, fingerprint: str, graph: AddonGraph) -> None:
+    data = {"version": ADDONS_INDEX_VERSION, "fingerprint": fingerprint, **graph.to_dict()}
+    try:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(filepath, json.dumps(data))
+    except OSError as error:
+        logging.warning(f"Could not save addon graph {filepath}: {error}")
+
+
+def load_graph(  # noqa: C901
+    root: Path,
+    shallow: bool = True,
+    backend: str = "walk",
+    index: Optional[AddonIndex] = None,
+    jobs: Optional[int] = None,
+) -> AddonGraph:
+    """
+    Return the dependency graph of the addons found under `root`.
+
+    The graph is stored next to the addon index (.git/osh/graph.json) together with
+    a fingerprint of the manifests it was built from, so it is only rebuilt when
+    an addon is added, removed or has its manifest changed.
+    """
+
+    own_index = index is None
+    if own_index:
+        index = AddonIndex.from_root(root)
+
+    found = []
+    names = set()
+    for addon_dir, manifest_path in discover_addon_dirs(root, shallow=shallow, backend=backend):
+        name = AddonInfo(Path(addon_dir), root).technical_name
+        if name in names:
+            continue
+        names.add(name)
+        found.append((name, manifest_path))
+
+    stamps = []
+    misses = []
+    depends = {}
+    for name, manifest_path in found:
+        stamp, manifest = index.lookup(manifest_path)
+        stamps.append([name, manifest_path, stamp])
+        if manifest is None:
+            misses.append((name, manifest_path))
+        else:
+            depends[name] = manifest.get("depends") or []
+
+    fingerprint = hashlib.sha1(json.dumps(stamps).encode("utf-8")).hexdigest()
+    filepath = cache_path(root, ADDONS_GRAPH_FILE)
+
+    if filepath and not misses:
+        graph = _read_graph(filepath, fingerprint)
+        if graph is not None:
+            return graph
+
+    manifests = index.manifests([p for _, p in misses], jobs=jobs)
+    for (name, _), manifest in zip(misses, manifests):
+        depends[name] = manifest.get("depends") or []
+    if own_index:
+        index.save()
+
+    # keep discovery order, so that the stored graph is stable
+    graph = AddonGraph({name: depends[name] for name, _ in found})
+
+    if filepath:
+        _write_graph(filepath, fingerprint, graph)
+
+    return graph
@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 import ast
 import contextlib
+import functools
+import logging
 import os
+import subprocess
+import weakref
 from collections.abc import Generator
+from fnmatch import fnmatchcase
 from pathlib import Path
 
 import libcst as cst
 
-from osh.compat import Optional, Union
+from osh.cache import AddonIndex
+from osh.compat import Any, Dict, Iterable, List, Optional, Tuple, Union
 from osh.exceptions import NoManifestFound
+from osh.gitindex import iter_tracked_addon_dirs, tracked_symlinks
 from osh.models import AddonInfo
-from osh.settings import MANIFEST_NAMES
+from osh.settings import ADDONS_PRUNE_PATTERNS, MANIFEST_NAMES
 from osh.utils import parse_repository_url
 
 
@@ -39,19 +46,36 @@ def is_dir_empty(p: Path) -> bool:
         return False
 
 
-def rewrite_symlink(link: Path, old_prefix: str, new_prefix: str):
-    """Rewrite a symlink if its target starts with old prefix."""
+def retarget_symlinks(root: Path, links: Dict[str, str], renames: Dict[str, str]) -> List[str]:
+    """
+    Point the links whose target moved to the new location, return the rewritten links.
 
-    try:
-        target = os.readlink(link)
-    except OSError:
-        return False
-    if old_prefix in target:
-        new_target = target.replace(old_prefix, new_prefix)
-        link.unlink()
-        os.symlink(new_target, link)
-        return True
-    return False
+    `links` maps links to their target, relative to `root` (see `symlink_index`),
+    `renames` maps old paths to new ones. Targets are matched on whole path components
+    against the deepest renamed path containing them, and rewritten relative to the link
+    (absolute links stay absolute).
+    """
+
+    trie = PathTrie()
+    for old, new in renames.items():
+        trie.insert(old, new)
+
+    rewritten = []
+    for link, target in sorted(links.items()):
+        match = trie.longest_prefix(target)
+        if not match:
+            continue
+        prefix, new = match
+        moved = os.path.normpath(os.path.join(new, os.path.relpath(target, prefix)))
+        path = root / link
+        if os.path.isabs(os.readlink(path)):
+            moved = os.path.join(os.path.abspath(root), moved)
+        else:
+            moved = os.path.relpath(moved, os.path.dirname(link) or ".")
+        path.unlink()
+        os.symlink(moved, path)
+        rewritten.append(link)
+    return rewritten
 
 
 def desired_path(url: str, base_dir: str, pull_request: bool = False) -> str:
@@ -67,50 +91,298 @@ def desired_path(url: str, base_dir: str, pull_request: bool = False) -> str:
     return f"{base_dir.rstrip('/')}/{owner}/{repo}"
 
 
+def scan_tree(  # noqa: C901
+    root: Union[str, Path],
+    prune: Iterable[str] = (".git",),
+    max_depth: Optional[int] = None,
+    followlinks: bool = False,
+) -> Generator[Tuple[str, int, List[os.DirEntry], List[os.DirEntry]], None, None]:
+    """
+    Walk `root` top-down with os.scandir, yielding (dirpath, depth, dirs, files).
+
+    Like os.walk, but entries are `os.DirEntry` objects so file types come from
+    `d_type` without extra stat calls (only symlinks are stat'ed when followed).
+    Directories matching a `prune` pattern are left out of `dirs`; callers may
+    also empty `dirs` in place to stop descending. Symlinked directories are
+    entered only with `followlinks`, each real directory at most once.
+    """
+
+    prune = tuple(prune)
+    seen = set()
+    stack = [(str(root), 0)]
+
+    with contextlib.suppress(OSError):
+        st = os.stat(root)
+        seen.add((st.st_dev, st.st_ino))
+
+    while stack:
+        dirpath, depth = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        dirs, files = [], []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if not is_dir:
+                files.append(entry)
+            elif not any(fnmatchcase(entry.name, pattern) for pattern in prune):
+                dirs.append(entry)
+
+        yield dirpath, depth, dirs, files
+
+        if max_depth is not None and depth >= max_depth:
+            continue
+
+        for entry in reversed(dirs):
+            if entry.is_symlink():
+                if not followlinks:
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+            stack.append((entry.path, depth + 1))
+
+
 def symlink_targets(repo: Path):
     targets = []
-    for root, dirs, files in os.walk(repo):
-        if ".git" in dirs:
-            dirs.remove(".git")
-        for n in dirs + files:
-            p = Path(root) / n
-            if p.is_symlink():
+    for _, _, dirs, files in scan_tree(repo):
+        for entry in dirs + files:
+            if entry.is_symlink():
                 with contextlib.suppress(OSError):
-                    targets.append(os.readlink(p))
+                    targets.append(os.readlink(entry.path))
 
     return targets
 
 
+def top_level_symlinks(root: Path) -> Dict[str, str]:
+    """Map each symlink at the top of `root`, where addon links live, to its target.
+
+    Targets are normalized relative to `root`, like `gitindex.tracked_symlinks` does,
+    and untracked links are included. Only one directory is read.
+    """
+
+    links = {}
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.is_symlink():
+                continue
+            try:
+                target = os.readlink(entry.path)
+            except OSError:
+                continue
+            if os.path.isabs(target):
+                target = os.path.relpath(target, root)
+            links[entry.name] = os.path.normpath(target)
+    return links
+
+
+def symlink_index(root: Path, backend: str = "fs") -> Dict[str, str]:
+    """
+    Map symlinks of the project to their target, relative to `root`.
+
+    The "fs" backend reads the top-level links, the "git" backend every symlink of the
+    superproject index (mode 120000), wherever it lives.
+    """
+
+    if backend == "git":
+        return tracked_symlinks(root, top_level=False)
+    return top_level_symlinks(root)
+
+
+def links_by_submodule(
+    links: Dict[str, str], submodule_paths: Iterable[str]
+) -> Dict[str, List[str]]:
+    """
+    Group links (link -> target) by the submodule containing their target.
+
+    Targets are matched by path components in a trie of the submodule paths, so that
+    `.third-party/OCA/web-extra` never counts as a use of `.third-party/OCA/web`.
+    Every submodule is in the result, unused ones with no link.
+    """
+
+    trie = PathTrie()
+    used: Dict[str, List[str]] = {}
+    for path in submodule_paths:
+        trie.insert(path, path)
+        used[path] = []
+
+    for link, target in sorted(links.items()):
+        match = trie.longest_prefix(target)
+        if match:
+            used[match[1]].append(link)
+    return used
+
+
+def sparse_dirs(
+    links: Dict[str, str], submodule_paths: Iterable[str]
+) -> Dict[str, Optional[List[str]]]:
+    """
+    Return the directories of each submodule that `links` (link -> target) point into.
+
+    Directories are relative to the submodule, None means the whole submodule is needed
+    (a link targets its root) or that there is nothing to narrow it to (no link at all).
+    """
+
+    result: Dict[str, Optional[List[str]]] = {}
+    for path, names in links_by_submodule(links, submodule_paths).items():
+        dirs = {os.path.relpath(links[name], path).replace(os.sep, "/") for name in names}
+        result[path] = None if not dirs or "." in dirs else sorted(dirs)
+    return result
+
+
+class PathTrie:
+    """Prefix tree over path components, mapping path prefixes to values."""
+
+    _VALUE = "\0"  # cannot be a path component
+
+    def __init__(self):
+        self._root: dict = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, path: str, value: Any) -> None:
+        node = self._root
+        for part in _path_parts(path):
+            node = node.setdefault(part, {})
+        if self._VALUE not in node:
+            self._size += 1
+        node[self._VALUE] = value
+
+    def longest_prefix(self, path: str) -> Optional[Tuple[str, Any]]:
+        """Return (prefix, value) for the deepest inserted path containing `path`, or None."""
+
+        node = self._root
+        match = (".", node[self._VALUE]) if self._VALUE in node else None
+        parts = _path_parts(path)
+        for i, part in enumerate(parts):
+            node = node.get(part)
+            if node is None:
+                break
+            if self._VALUE in node:
+                match = ("/".join(parts[: i + 1]), node[self._VALUE])
+        return match
+
+
+def _path_parts(path: str) -> List[str]:
+    return [part for part in path.replace(os.sep, "/").split("/") if part and part != "."]
+
+
 def relpath(from_path: Path, to_path: Path) -> str:
     """Return a relative path from `from_path` to `to_path`."""
 
     return os.path.relpath(to_path, start=from_path)
 
 
-def find_addons(root: Path, shallow: bool = False) -> Generator[AddonInfo, None, None]:
-    """Yield all odoo addons under `root`."""
+def iter_addon_dirs(
+    root: Path, shallow: bool = False, prune: Iterable[str] = ADDONS_PRUNE_PATTERNS
+) -> Generator[Tuple[str, str], None, None]:
+    """Yield (addon_dir, manifest_path) for each odoo addon under `root`, without parsing.
 
-    root_parts = root.resolve().parts
+    Addons never nest, so the walk does not descend into a directory holding a manifest.
+    With `shallow`, only `root` and its first-level (possibly symlinked) subdirectories
+    are scanned.
+    """
 
     # followlinks=True lets us enter first-level *symlinked* directories
-    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
-        # skip VCS noise
-        if ".git" in dirnames:
-            dirnames.remove(".git")
+    for dirpath, _, dirs, files in scan_tree(
+        root, prune=prune, max_depth=1 if shallow else None, followlinks=True
+    ):
+        names = {entry.name for entry in files}
+        manifest_name = next((n for n in MANIFEST_NAMES if n in names), None)
+        if manifest_name:
+            yield dirpath, os.path.join(dirpath, manifest_name)
+            dirs[:] = []
+
+
+def discover_addon_dirs(
+    root: Path, shallow: bool = False, backend: str = "walk", submodules: bool = True
+) -> Iterable[Tuple[str, str]]:
+    """Return (addon_dir, manifest_path) pairs found under `root` with the given backend.
+
+    The "git" backend lists manifests from the git index of the superproject and, with
+    `submodules`, of its submodules (see `osh.gitindex`); it falls back to the directory
+    walk outside of git.
+    """
+
+    if backend == "git":
+        try:
+            return list(iter_tracked_addon_dirs(root, shallow=shallow, submodules=submodules))
+        except (subprocess.CalledProcessError, OSError) as error:
+            logging.debug(f"git index unavailable in {root} ({error}), walking the tree")
+    elif backend != "walk":
+        raise ValueError(f"Unknown discovery backend: {backend}")
+
+    return iter_addon_dirs(root, shallow=shallow)
 
-        if "setup" in dirnames:
-            dirnames.remove("setup")  # don't enter setup/ subdir
 
-        # found an addon here?
-        if "__manifest__.py" in filenames or "__openerp__.py" in filenames:
-            # print(dirpath)
-            yield AddonInfo.from_path(Path(dirpath), root_path=root)
+class _ScanLoader:
+    """Read the manifests of one `find_addons` scan through the addon index.
+
+    An owned index is saved again when the loader is released, i.e. with the last addon
+    of the scan (or at exit), so manifests first read after the iteration are cached too.
+    """
 
-        if shallow:
-            depth = len(Path(dirpath).resolve().parts) - len(root_parts)
-            if depth >= 1:
-                # we're already in a first-level subdir (real or symlink) → don't go deeper
-                dirnames[:] = []
+    def __init__(self, index: AddonIndex, owned: bool):
+        self.index = index
+        if owned:
+            weakref.finalize(self, index.save)
+
+    def manifest(self, manifest_path: str) -> dict:
+        return self.index.manifest(manifest_path)
+
+
+def find_addons(
+    root: Path,
+    shallow: bool = False,
+    index: Optional[AddonIndex] = None,
+    jobs: Optional[int] = None,
+    backend: str = "walk",
+) -> Generator[AddonInfo, None, None]:
+    """Yield all odoo addons under `root`.
+
+    Manifests are read through the persistent addon index of the repository
+    (see `osh.cache.AddonIndex`) unless an explicit `index` is given, and only when a
+    manifest field of the addon is first accessed: name-only scans do not parse anything.
+    The repository index is saved when the iteration ends, and again once the yielded
+    addons are released for manifests read later; an explicit `index` is saved by the caller.
+    With `jobs` other than 1 (0 means one per CPU), directories are discovered first
+    and the manifests missing from the index are parsed in a process pool;
+    addons are still yielded in discovery order.
+    `backend` selects how addon directories are discovered, see `discover_addon_dirs`.
+    """
+
+    own_index = index is None
+    if own_index:
+        index = AddonIndex.from_root(root)
+    scan = _ScanLoader(index, owned=own_index)
+
+    try:
+        found = discover_addon_dirs(root, shallow=shallow, backend=backend)
+        if jobs is None or jobs == 1:
+            for dirpath, manifest_path in found:
+                loader = functools.partial(scan.manifest, manifest_path)
+                yield AddonInfo.from_path(Path(dirpath), root_path=root, loader=loader)
+        else:
+            found = list(found)
+            manifests = index.manifests([m for _, m in found], jobs=jobs)
+            for (dirpath, _), manifest in zip(found, manifests):
+                yield AddonInfo.from_path(Path(dirpath), root_path=root, manifest=manifest)
+    finally:
+        if own_index:
+            index.save()
 
 
 def get_manifest_path(addon_dir: str) -> Optional[str]:
@@ -152,23 +424,35 @@ def load_manifest(path: Path) -> dict:
 
 
 def find_addons_extended(
-    addons_dir: Union[str, Path], installable_only: bool = False, names: Optional[list] = None
+    addons_dir: Union[str, Path],
+    installable_only: bool = False,
+    names: Optional[list] = None,
+    index: Optional[AddonIndex] = None,
 ):
     """Yield (name, path, manifest) for each addon in the given directory."""
 
-    for name in os.listdir(addons_dir):
-        path = os.path.join(addons_dir, name)
-        try:
-            manifest = parse_manifest(path)
-        except NoManifestFound:
-            continue
-        if installable_only and not manifest.get("installable", True):
-            continue
+    own_index = index is None
+    if own_index:
+        index = AddonIndex.from_root(Path(addons_dir))
 
-        if names and name not in names:
-            continue
+    try:
+        for name in os.listdir(addons_dir):
+            if names and name not in names:
+                continue
+
+            path = os.path.join(addons_dir, name)
+            manifest_path = get_manifest_path(path)
+            if not manifest_path:
+                continue
 
-        yield name, path, manifest
+            manifest = index.manifest(manifest_path)
+            if installable_only and not manifest.get("installable", True):
+                continue
+
+            yield name, path, manifest
+    finally:
+        if own_index:
+            index.save()
 
 
 def find_manifests(path: str, names: Optional[list] = None):
@@ -176,9 +460,8 @@ def find_manifests(path: str, names: Optional[list] = None):
 
     for name in os.listdir(path):
         addon_path = os.path.join(path, name)
-        try:
-            manifest_path = get_manifest_path(addon_path)
-        except NoManifestFound:
+        manifest_path = get_manifest_path(addon_path)
+        if not manifest_path:
             continue
 
         if names and name not in names:
@@ -1,92 +1,144 @@
 #!/usr/bin/env python3
-
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
 
 import click
-import libcst as cst
-
-from osh.compat import Optional
-from osh.helpers import find_addons_extended, find_manifests
-from osh.parser import TypingCollector
-from osh.rules.__main__ import run_rules
-from osh.utils import human_readable, str_to_list
-
-to_read = """
-# -*- coding: utf-8 -*-
-{
-    "name": "APIK DATA",
-    "description": "APIK DATA",
-    "version": "2.0",
-    "author": "Apik",
-    "website": "https://www.apik.cloud",
-    "category": "Vertical",
-    "depends": ["base", "base_setup"],
-    "data": [
-        "data/ir_module_category.xml",
-        "data/res_groups.xml",
-        "security/ir.model.access.csv",
-        "views/apik_data.xml",
-        "views/apik_data_history.xml",
-    ],
-    "assets": {
-        "web.assets_backend": [
-            "/apik_data/static/src/lib/tabulator/dist/js/tabulator.min.js",
-            "/apik_data/static/src/lib/tabulator/dist/css/tabulator_simple.min.css",
-            "/apik_data/static/src/lib/xlsx.mini.min.js",  # for the XLSX export
-            "apik_data/static/src/js/field_tabulator.js",
-        ],
-        "web.assets_qweb": ["apik_data/static/src/xml/**/*"],
-    },
-    "installable": True,
-    "application": True,
-    "sequence": "0",
-}
-var=1
-
-"""
+
+from osh.cache import ContentCache
+from osh.compat import List, Optional
+from osh.exceptions import NoGitRepository
+from osh.gitindex import list_changed, manifest_pathspecs
+from osh.gitutils import git_top
+from osh.helpers import discover_addon_dirs, find_manifests
+from osh.rules.__main__ import rules_version, run_rules
+from osh.rules.report import flatten, to_json, to_sarif
+from osh.settings import MANIFEST_CHECK_CACHE_FILE
+from osh.utils import str_to_list
+
+
+def collect_manifests(
+    path: str,
+    shallow: bool = False,
+    names: Optional[List[str]] = None,
+    submodules: bool = False,
+) -> List[str]:
+    """
+    Return the manifests to check under `path`, sorted and without duplicates.
+
+    Unless `shallow`, manifests of the project are listed from the git index (walking the
+    tree outside of git). Addons of submodules, including the ones symlinked in the
+    project, are only listed with `submodules`, under their real path.
+    """
+
+    if shallow:
+        return sorted(find_manifests(path, names=names))
+
+    manifests = set()
+    found = discover_addon_dirs(Path(path), backend="git", submodules=submodules)
+    for addon_dir, manifest_path in found:
+        if names and os.path.basename(addon_dir) not in names:
+            continue
+        if not submodules and os.path.islink(addon_dir):
+            continue
+        manifests.add(os.path.realpath(manifest_path))
+    return sorted(manifests)
 
 
 @click.command(name="check")
 @click.argument("path", default=".")
-@click.option("--addons")
-def main(path: str, addons: Optional[str] = None):
+@click.option("--addons", help="Comma separated addon names to check")
+@click.option(
+    "--shallow",
+    is_flag=True,
+    help="Only check the addons directly under PATH",
+)
+@click.option(
+    "--submodules",
+    is_flag=True,
+    help="Also check the addons of initialized submodules",
+)
+@click.option(
+    "--changed-since",
+    metavar="REF",
+    help="Only check manifests changed since this git ref (untracked ones included, and the "
+    "ones changed in submodules with --submodules)",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Lint manifests in parallel with N processes (0: one per CPU)",
+)
+@click.option(
+    "--format",
+    type=click.Choice(["text", "json", "sarif"]),
+    default="text",
+    show_default=True,
+    help="Output format",
+)
+@click.option("--no-cache", is_flag=True, help="Lint every manifest, even unchanged ones")
+def main(  # noqa: PLR0913, PLR0917
+    path: str,
+    addons: Optional[str],
+    shallow: bool,
+    submodules: bool,
+    changed_since: Optional[str],
+    jobs: int,
+    format: str,
+    no_cache: bool,
+):
     """Check manifests by running rules on them."""
 
-    # path = "/home/aroy/dev/repo/odoo-gaiago/third-party/apik-accounting/apik_import_fec/__manifest__.py" # noqa: E501
-    # path = "/home/aroy/dev/packages/osh"
-
-    name = "Paul"
-    print(f"hello {name}!")
-
-    options = {}
-    if addons:
-        options["names"] = str_to_list(addons)
-
-    paths = []
-    for manifest_path in find_manifests(path, **options):
-        paths.append(manifest_path)
-
-    click.echo(f"Searching manifests in {path}")
-    click.echo(f"Paths: {human_readable(paths)}")
-    run_rules(paths)
-
-    return
-
-    options = {}
-    if addons:
-        options["names"] = str_to_list(addons)
-    for name, _, manifest in find_addons_extended(path, **options):  # noqa: B007
-        click.echo(name)
-        print("--------------")
-        # print(dump(manifest))
-
-        # visitor = TypingCollector()
-        # manifest.visit(visitor)
-
-    return
-
-    manifest = cst.parse_module(to_read)
-    visitor = TypingCollector()
-    manifest.visit(visitor)
-
-    print(visitor.errors)
-    print(visitor.manifest)
+    paths = collect_manifests(
+        path, shallow=shallow, names=str_to_list(addons), submodules=submodules
+    )
+
+    try:
+        root = git_top(cwd=path)
+    except (subprocess.CalledProcessError, NoGitRepository):
+        if changed_since:
+            raise click.UsageError("--changed-since needs a git repository") from None
+        root = Path(path)
+
+    if changed_since:
+        changed = {
+            os.path.realpath(root / name)
+            for name in list_changed(
+                root, changed_since, manifest_pathspecs(), recurse_submodules=submodules
+            )
+        }
+        paths = [p for p in paths if os.path.realpath(p) in changed]
+
+    salt = rules_version()
+    if no_cache:
+        cache = ContentCache(salt=salt)
+    else:
+        cache = ContentCache.from_root(root, MANIFEST_CHECK_CACHE_FILE, salt=salt)
+
+    try:
+        results = run_rules(paths, cache=cache, jobs=jobs)
+    finally:
+        cache.save()
+
+    base = os.path.realpath(root)
+    issues = flatten(results, base)
+    if format == "sarif":
+        click.echo(json.dumps(to_sarif(results, base), indent=2))
+    elif format == "json":
+        click.echo(json.dumps(to_json(results, base), indent=2))
+    else:
+        for issue in issues:
+            click.echo(
+                f"{issue['path']}:{issue['line']}:{issue['column']}: "
+                f"{issue['rule']}: {issue['message']}"
+            )
+
+    click.echo(f"Checked {len(results)} manifest(s), {len(issues)} issue(s) found.", err=True)
+    if issues:
+        sys.exit(1)
+    return 0
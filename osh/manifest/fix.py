@@ -1,108 +1,148 @@
 #!/usr/bin/env python3
-
+import hashlib
+import json
+import logging
 import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-import black
 import click
-from libcst.display import dump
-
-from osh.helpers import find_addons_extended, get_manifest_path
-from osh.settings import (
-    BLACK_MODE,
-    DEFAULT_VALUES,
-    FORCED_KEYS,
-    HEADERS,
-    REPLACEMENTS,
-)
-from osh.utils import clean_string
-
-
-def format_manifest(data: dict) -> str:
-    raw = "\n".join(HEADERS) + "\n" + repr(data)
-    return black.format_str(raw, mode=BLACK_MODE)
-
-
-def process_manifest(manifest: dict, force_default: bool = True):  # noqa: C901, PLR0912
-    changed = False
-
-    for key in ["mainteners", "maintener", "maintainer"]:
-        if key in manifest:
-            manifest["maintainers"] = manifest.pop(key)
-            changed = True
+import libcst as cst
+
+from osh import parser
+from osh.cache import ContentCache
+from osh.compat import List, Optional, Tuple
+from osh.exceptions import NoGitRepository
+from osh.gitutils import git_top
+from osh.helpers import find_manifests, parse_manifest_cst
+from osh.parser import ManifestTransformer
+from osh.settings import MANIFEST_FIX_CACHE_FILE, MANIFEST_NAMES
+from osh.utils import write_atomic
+
+
+def fix_version() -> str:
+    """Return a version of the normalization, changing with the parser source or settings."""
+
+    digest = hashlib.sha1(Path(parser.__file__).read_bytes())
+    settings = [parser.REPLACEMENTS, parser.DEFAULT_VALUES, parser.FORCED_KEYS, parser.HEADERS]
+    digest.update(json.dumps(settings, sort_keys=True, default=repr).encode())
+    return digest.hexdigest()
+
+
+def normalize_manifest(source: str, force_default: bool = True) -> str:
+    """Return the normalized content of a manifest (see `osh.parser.ManifestTransformer`)."""
+
+    transformer = ManifestTransformer(force_default=force_default)
+    module = parse_manifest_cst(source).visit(transformer)
+    if not transformer.found:
+        raise ValueError("manifest is not a dict")
+    return module.code
+
+
+def _normalize(source: str) -> Tuple[Optional[str], Optional[str]]:
+    """Process pool worker: return (output, error)."""
+
+    try:
+        return normalize_manifest(source), None
+    except (cst.ParserSyntaxError, ValueError) as error:
+        return None, str(error)
+
+
+def _cache_root(addons_dir: str) -> Path:
+    try:
+        return git_top(cwd=addons_dir)
+    except (subprocess.CalledProcessError, NoGitRepository):
+        return Path(addons_dir)
+
+
+def fix_manifests(  # noqa: C901
+    paths: List[str], cache: ContentCache, check: bool = False, jobs: Optional[int] = None
+) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Normalize manifests, return (changed, errors).
+
+    Manifests whose content is known to be normalized already (see `ContentCache`) are
+    skipped, the others are normalized in a pool of `jobs` processes (0 means one per CPU).
+    Files are written atomically, only when their content changes and not in `check` mode.
+    """
+
+    sources = {}
+    for path in paths:
+        source = Path(path).read_text(encoding="utf-8")
+        if ContentCache.key(source) not in cache:
+            sources[path] = source
+
+    todo = list(sources)
+    workers = min(jobs or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_normalize, [sources[p] for p in todo]))
+    else:
+        results = [_normalize(sources[p]) for p in todo]
+
+    changed, errors = [], []
+    for path, (output, error) in zip(todo, results):
+        if error is not None:
+            errors.append((path, error))
             continue
+        if output != sources[path]:
+            changed.append(path)
+            if check:
+                continue
+            write_atomic(Path(path), output)
+        cache.set(ContentCache.key(output), True)
 
-    for key in ["maintainers"]:
-        if key in manifest:
-            val = manifest[key]
-
-            if isinstance(val, str) and val in REPLACEMENTS:
-                manifest[key] = [REPLACEMENTS[val]]
-                changed = True
-            elif isinstance(val, (list, tuple)):
-                new_val = [REPLACEMENTS.get(v, v) for v in val]
-                if new_val != val:
-                    manifest[key] = new_val
-                    changed = True
-        elif "michel" in manifest["author"].lower():
-            manifest[key] = [REPLACEMENTS["Michel GUIHENEUF"]]
-            changed = True
-
-    for key in FORCED_KEYS:
-        if manifest.get(key) != DEFAULT_VALUES[key]:
-            manifest[key] = DEFAULT_VALUES[key]
-            changed = True
-
-    # Cleaning up summary
-    if manifest.get("summary"):
-        manifest["summary"] = clean_string(manifest.get("summary"))
-        changed = True
-
-    # Remove description
-    if manifest.get("description"):
-        manifest.pop("description")
-        changed = True
-        if "summary" not in manifest:
-            manifest["summary"] = clean_string(manifest.get("description"))
-            changed = True
-
-    manifest["depends"].sort()
-    if "base" in manifest["depends"]:
-        manifest["depends"].pop(manifest["depends"].index("base"))
-        manifest["depends"].insert(0, "base")
-
-    if force_default:
-        res = {
-            key: manifest.pop(key) if key in manifest and manifest.get(key) else value
-            for key, value in DEFAULT_VALUES.items()
-        }
-        return True, res
-
-    return changed, manifest
-
-
-def save_mannifest(content: str, filepath: str) -> None:
-    with open(filepath, "w", encoding="utf-8") as f:
-        output = format_manifest(content)
-        f.write(output)
+    return changed, errors
 
 
 @click.command(name="fix")
-@click.option("--addons-dir", default=".")
-def main(addons_dir):
-    """Fix and standardize manifests in the given directory."""
-
-    for name, _, manifest in find_addons_extended(addons_dir):
-        click.echo(name)
-        if name == "apik_data":
-            click.echo(dump(manifest))
-            click.echo(manifest.code)
-            return
-
-        continue
-
-        changed, manifest = process_manifest(manifest)  # noqa: PLW2901
-
-        if changed:
-            filepath = os.path.join(addons_dir, get_manifest_path(name))
-            save_mannifest(manifest, filepath)
-            click.echo(f"✅ Edited {name} : {filepath}")
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--addons-dir",
+    default=".",
+    show_default=True,
+    help="Directory holding the addons, used when no FILES are given",
+)
+@click.option("--check", is_flag=True, help="Do not write, exit with 1 if a manifest would change")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Format manifests in parallel with N processes (0: one per CPU)",
+)
+@click.option("--no-cache", is_flag=True, help="Process every manifest, even unchanged ones")
+def main(files: tuple, addons_dir: str, check: bool, jobs: int, no_cache: bool):
+    """Fix and standardize manifests in the given directory (or the given FILES)."""
+
+    if files:
+        paths = [f for f in files if os.path.basename(f) in MANIFEST_NAMES]
+    else:
+        paths = list(find_manifests(addons_dir))
+
+    salt = fix_version()
+    if no_cache:
+        cache = ContentCache(salt=salt)
+    else:
+        cache = ContentCache.from_root(_cache_root(addons_dir), MANIFEST_FIX_CACHE_FILE, salt=salt)
+
+    try:
+        changed, errors = fix_manifests(paths, cache, check=check, jobs=jobs)
+    finally:
+        cache.save()
+
+    for path, error in errors:
+        logging.error(f"Cannot parse {path}: {error}")
+    for path in changed:
+        if check:
+            click.echo(f"❌ Would edit {path}")
+        else:
+            click.echo(f"✅ Edited {path}")
+
+    if errors or (check and changed):
+        sys.exit(1)
+
+    return 0
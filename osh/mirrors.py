@@ -0,0 +1,104 @@
+"""
+Bare mirrors of submodule repositories, shared by every project of the machine.
+
+Mirrors live in `<MIRRORS_DIR>/<host>/<path>.git`. Submodules cloned from a
+mirror borrow its objects (git alternates) instead of downloading them again, and can
+be cloned offline as long as the mirror holds the commits they need. Mirrors are thus
+configured to never prune unreachable objects (gc.pruneExpire=never).
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from urllib.parse import urlparse
+
+from osh.compat import Optional
+from osh.gitutils import git_error
+from osh.settings import MIRRORS_DIR, MIRRORS_DIR_ENV
+from osh.utils import removesuffix, split_repository_url
+
+
+def mirrors_root() -> Path:
+    """Return the directory of the mirrors, `$OSH_MIRRORS_DIR` if set."""
+
+    return Path(os.environ.get(MIRRORS_DIR_ENV) or MIRRORS_DIR).expanduser()
+
+
+def mirror_path(url: str, root: Optional[Path] = None) -> Optional[Path]:
+    """Return the mirror location of a repository URL, None for local or malformed URLs.
+
+    The mirror is keyed on the whole repository path, as groups may nest (GitLab).
+    """
+
+    try:
+        host, path = split_repository_url(url)
+    except ValueError:
+        return None
+    hostname = urlparse(f"//{host}").hostname
+    parts = removesuffix(path.strip("/").lower(), ".git").split("/")
+    if not hostname or len(parts) < 2 or any(p in ("", ".", "..") for p in parts):  # noqa: PLR2004
+        return None
+    *groups, repo = parts
+    return (root or mirrors_root()).joinpath(hostname, *groups, f"{repo}.git")
+
+
+def _git(*args: str) -> None:
+    subprocess.run(["git", *args], check=True, capture_output=True, text=True)
+
+
+def update_mirror(url: str, root: Optional[Path] = None) -> Path:
+    """
+    Create or refresh the mirror of a repository, return its path.
+
+    Only branches and tags are mirrored (not pull request refs). A new mirror is cloned
+    in a private staging directory and moved in place once complete, so concurrent runs
+    do not step on each other. Raise ValueError for URLs without owner/repo and
+    CalledProcessError when git fails.
+    """
+
+    path = mirror_path(url, root)
+    if path is None:
+        raise ValueError(f"Cannot mirror {url}: missing owner/repo")
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp"))
+        try:
+            _git("clone", "--quiet", "--bare", "--", url, str(tmp))
+            _git("-C", str(tmp), "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+            _git("-C", str(tmp), "config", "gc.pruneExpire", "never")
+            os.replace(tmp, path)
+        except OSError:
+            # another run moved its own clone in place first
+            if not path.exists():
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return path
+
+    # submodules borrow the objects of the mirror: never prune unreachable ones
+    _git("-C", str(path), "config", "gc.pruneExpire", "never")
+    _git("-C", str(path), "fetch", "--quiet", "--prune", "--tags", "origin")
+    return path
+
+
+def find_mirror(url: str, refresh: bool = True, root: Optional[Path] = None) -> Optional[Path]:
+    """
+    Return the mirror to clone a repository from, None if there is none.
+
+    With `refresh`, the mirror is created or updated first. When this fails (e.g. offline)
+    an existing mirror is still returned, as is.
+    """
+
+    path = mirror_path(url, root)
+    if path is None:
+        return None
+    if refresh or not path.exists():
+        try:
+            update_mirror(url, root)
+        except subprocess.CalledProcessError as error:
+            logging.warning(f"Cannot update the mirror of {url}: {git_error(error)}")
+    return path if path.exists() else None
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from pathlib import Path
 
-from osh.compat import Optional
+from osh.compat import Callable, List, Optional
 from osh.utils import date_from_string, format_datetime, load_manifest
 
 
@@ -129,43 +129,96 @@ class WorfklowRunInfo:
         return f"{self.name} triggered by {self.event} on {self.branch} by {self.actor} ({self.status}/{self.conclusion})"  # noqa: E501
 
 
-@dataclass
 class AddonInfo:
-    path: str
-    rel_path: str
-    technical_name: str
-    symlink: bool
-    root: bool  # is it in the root of the repo?
-    author: str
-    version: str
-    installable: bool
+    """
+    Odoo addon found on disk.
+
+    Only the location is known upfront: the symlink is resolved and the manifest parsed
+    on first access to a field needing them, then kept on the instance. A `manifest` dict
+    given by the caller (e.g. from `osh.cache.AddonIndex`) is used as is, not copied.
+    """
+
+    __slots__ = ("_dirpath", "_loader", "_manifest", "_realpath", "_root_path", "_symlink", "root")
+
+    def __init__(
+        self,
+        path: Path,
+        root_path: Path,
+        manifest: Optional[dict] = None,
+        loader: Optional[Callable[[], dict]] = None,
+    ):
+        self._dirpath = Path(path)
+        self._root_path = Path(root_path)
+        self._manifest = manifest
+        self._loader = loader
+        self._symlink: Optional[bool] = None
+        self._realpath: Optional[Path] = None
+        self.root = self._dirpath.parent == self._root_path  # is it in the root of the repo?
+
+    def __repr__(self) -> str:
+        return f"AddonInfo({self.technical_name!r}, path={str(self._dirpath)!r})"
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Path,
+        root_path: Path,
+        manifest: Optional[dict] = None,
+        loader: Optional[Callable[[], dict]] = None,
+    ) -> "AddonInfo":
+        """Return the addon at `path`, its manifest is read by `loader` when first needed."""
+
+        return cls(path, root_path, manifest=manifest, loader=loader)
+
+    @property
+    def symlink(self) -> bool:
+        if self._symlink is None:
+            self._symlink = self._dirpath.is_symlink()
+        return self._symlink
 
     @property
     def symlinked(self) -> bool:
         return self.symlink and self.root
 
-    @classmethod
-    def from_path(cls, path: Path, root_path: Path) -> "AddonInfo":
-        manifest = load_manifest(path)
-        symlink = path.is_symlink()
-        root = path.parent == root_path
-
-        if symlink:
+    @property
+    def _real(self) -> Path:
+        if self._realpath is None:
             # resolve the symlink to get real path
-            path = path.resolve()
-            rel_path = str(path.relative_to(root_path).parent)
-        else:
-            rel_path = str(path.relative_to(root_path).parent)
+            self._realpath = self._dirpath.resolve() if self.symlink else self._dirpath
+        return self._realpath
 
-        rel_path = "" if rel_path == "." else rel_path
+    @property
+    def path(self) -> str:
+        return str(self._real)
 
-        return cls(
-            path=str(path),
-            technical_name=path.name,
-            symlink=symlink,
-            root=root,
-            rel_path=rel_path,
-            author=manifest.get("author", "unknown"),
-            version=manifest.get("version", "unknown"),
-            installable=manifest.get("installable", True),
-        )
+    @property
+    def technical_name(self) -> str:
+        return self._real.name
+
+    @property
+    def rel_path(self) -> str:
+        rel_path = str(self._real.relative_to(self._root_path).parent)
+        return "" if rel_path == "." else rel_path
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            self._manifest = self._loader() if self._loader else load_manifest(self._dirpath)
+            self._loader = None
+        return self._manifest
+
+    @property
+    def author(self) -> str:
+        return self.manifest.get("author", "unknown")
+
+    @property
+    def version(self) -> str:
+        return self.manifest.get("version", "unknown")
+
+    @property
+    def installable(self) -> bool:
+        return self.manifest.get("installable", True)
+
+    @property
+    def depends(self) -> List[str]:
+        return list(self.manifest.get("depends") or [])
@@ -1,7 +1,15 @@
+import ast
+import json
+
 import libcst as cst
 import libcst.matchers as m
 
-from osh.compat import Any, Optional
+from osh.compat import Any, List, Optional
+from osh.settings import DEFAULT_VALUES, FORCED_KEYS, HEADERS, REPLACEMENTS
+from osh.utils import clean_string
+
+MAINTAINERS_TYPOS = ("mainteners", "maintener", "maintainer")
+_UNKNOWN = object()
 
 
 def _decode_string(node: cst.SimpleString) -> str:
@@ -79,3 +87,232 @@ class TypingCollector(cst.CSTVisitor):
 
     def visit_SimpleString(self, node):
         print(f"coucou: {node.value}")
+
+
+def _literal_code(value: Any) -> str:
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_literal_code(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ", ".join(f"{_literal_code(k)}: {_literal_code(v)}" for k, v in value.items())
+            + "}"
+        )
+    return repr(value)
+
+
+def _literal(value: Any) -> cst.BaseExpression:
+    """Return the CST of a manifest literal, double-quoted like black does."""
+
+    return cst.parse_expression(_literal_code(value))
+
+
+def _evaluate(node: cst.CSTNode) -> Any:
+    """Return the Python value of a literal node, `_UNKNOWN` for anything else."""
+
+    try:
+        return ast.literal_eval(cst.Module(body=[]).code_for_node(node))
+    except (ValueError, SyntaxError):
+        return _UNKNOWN
+
+
+def _string(node: cst.CSTNode) -> Optional[str]:
+    if isinstance(node, cst.SimpleString):
+        value = node.evaluated_value
+        return value if isinstance(value, str) else None
+    return None
+
+
+def _with_string(node: cst.SimpleString, value: str) -> cst.BaseExpression:
+    """Return a string node holding `value`, keeping the quotes of `node` when possible."""
+
+    quote = node.quote
+    if "\\" in value or quote[0] in value or "\n" in value:
+        return _literal(value)
+    return cst.SimpleString(f"{node.prefix}{quote}{value}{quote}")
+
+
+def _key(element: cst.BaseDictElement) -> Optional[str]:
+    if isinstance(element, cst.DictElement):
+        return _string(element.key)
+    return None
+
+
+def _new_element(key: str, value: Any) -> cst.DictElement:
+    return cst.DictElement(key=_literal(key), value=_literal(value))
+
+
+def _sort_depends(node: cst.List) -> cst.List:
+    """Sort a list of strings ("base" first), trailing comments moving with their item."""
+
+    names = [_string(el.value) for el in node.elements]
+    if None in names or not names:
+        return node
+    order = sorted(range(len(names)), key=lambda i: (names[i] != "base", names[i]))
+    elements = [node.elements[i] for i in order]
+    last = len(names) - 1
+    if order[-1] == last:
+        return node.with_changes(elements=elements)
+
+    # the last position keeps the closing layout of the list, the comment of the last
+    # item living in the whitespace before the closing bracket
+    moved = order.index(last)
+    moved_comma = elements[-1].comma
+    closing_comma = node.elements[last].comma
+    rbracket = node.rbracket
+    if isinstance(moved_comma, cst.Comma) and all(
+        isinstance(ws, cst.ParenthesizedWhitespace)
+        for ws in (moved_comma.whitespace_after, rbracket.whitespace_before)
+    ):
+        before = rbracket.whitespace_before
+        moved_comma = moved_comma.with_changes(
+            whitespace_after=moved_comma.whitespace_after.with_changes(first_line=before.first_line)
+        )
+        rbracket = rbracket.with_changes(
+            whitespace_before=before.with_changes(
+                first_line=elements[-1].comma.whitespace_after.first_line
+            )
+        )
+    elements[moved] = elements[moved].with_changes(comma=moved_comma)
+    elements[-1] = elements[-1].with_changes(comma=closing_comma)
+    return node.with_changes(elements=elements, rbracket=rbracket)
+
+
+class ManifestTransformer(cst.CSTTransformer):
+    """
+    Normalize an Odoo manifest in a single pass over its CST.
+
+    Applies the rules of `osh.settings` (forced keys, maintainers replacements, default
+    values) and the maintainers key and `depends` order fixes to the top-level dict.
+    Only the elements needing a change are rebuilt, so comments and layout are kept.
+    """
+
+    def __init__(self, force_default: bool = True):
+        super().__init__()
+        self.force_default = force_default
+        self.found = False
+        self._depth = 0
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
+        header = list(updated_node.header)
+        comments = {line.comment.value for line in header if line.comment}
+        missing = [cst.EmptyLine(comment=cst.Comment(h)) for h in HEADERS if h not in comments]
+        if not missing:
+            return updated_node
+
+        # keep an encoding declaration first
+        pos = 1 if header and header[0].comment and "coding" in header[0].comment.value else 0
+        return updated_node.with_changes(header=header[:pos] + missing + header[pos:])
+
+    def visit_Dict(self, node: cst.Dict) -> None:
+        self._depth += 1
+
+    def leave_Dict(self, original_node: cst.Dict, updated_node: cst.Dict) -> cst.Dict:
+        self._depth -= 1
+        if self._depth or self.found:
+            return updated_node
+        self.found = True
+        return updated_node.with_changes(elements=self.fix_elements(list(updated_node.elements)))
+
+    def fix_elements(self, elements: List[cst.BaseDictElement]) -> List[cst.BaseDictElement]:  # noqa: C901, PLR0912
+        index = {}
+        for i, element in enumerate(elements):
+            key = _key(element)
+            if key is not None:
+                index.setdefault(key, i)
+
+        def value(key: str) -> Any:
+            return _evaluate(elements[index[key]].value) if key in index else None
+
+        def replace(key: str, node: cst.BaseExpression) -> None:
+            elements[index[key]] = elements[index[key]].with_changes(value=node)
+
+        added = []
+
+        for key in MAINTAINERS_TYPOS:
+            if key in index and "maintainers" not in index:
+                i = index.pop(key)
+                elements[i] = elements[i].with_changes(
+                    key=_with_string(elements[i].key, "maintainers")
+                )
+                index["maintainers"] = i
+
+        if "maintainers" in index:
+            node = elements[index["maintainers"]].value
+            current = _string(node)
+            if current in REPLACEMENTS:
+                replace("maintainers", _literal([REPLACEMENTS[current]]))
+            elif isinstance(node, cst.List):
+                items = [
+                    el.with_changes(value=_with_string(el.value, REPLACEMENTS[_string(el.value)]))
+                    if _string(el.value) in REPLACEMENTS
+                    else el
+                    for el in node.elements
+                ]
+                replace("maintainers", node.with_changes(elements=items))
+        elif "michel" in str(value("author") or "").lower():
+            added.append(_new_element("maintainers", [REPLACEMENTS["Michel GUIHENEUF"]]))
+
+        for key in FORCED_KEYS:
+            if key not in index:
+                added.append(_new_element(key, DEFAULT_VALUES[key]))
+            elif value(key) != DEFAULT_VALUES[key]:
+                replace(key, _literal(DEFAULT_VALUES[key]))
+
+        summary = value("summary")
+        if isinstance(summary, str) and clean_string(summary) != summary:
+            replace("summary", _literal(clean_string(summary)))
+
+        description = value("description")
+        if description and description is not _UNKNOWN:
+            if "summary" not in index:
+                added.append(_new_element("summary", clean_string(description)))
+            elements = _remove_element(elements, index["description"])
+            index = {
+                k: i - (i > index["description"]) for k, i in index.items() if k != "description"
+            }
+
+        if "depends" in index and isinstance(elements[index["depends"]].value, cst.List):
+            replace("depends", _sort_depends(elements[index["depends"]].value))
+
+        if self.force_default:
+            present = set(index) | {_key(el) for el in added}
+            added += [
+                _new_element(key, default)
+                for key, default in DEFAULT_VALUES.items()
+                if default is not None and key not in present
+            ]
+
+        return _append_elements(elements, added)
+
+
+def _remove_element(elements: list, i: int) -> list:
+    result = elements[:i] + elements[i + 1 :]
+    if i == len(elements) - 1 and result:
+        # the new last element takes the trailing comma and whitespace of the removed one
+        result[-1] = result[-1].with_changes(comma=elements[i].comma)
+    return result
+
+
+def _append_elements(elements: list, added: list) -> list:
+    """Append dict elements, laid out like the existing ones."""
+
+    if not added:
+        return elements
+    if not elements:
+        return added
+
+    last = elements[-1]
+    if len(elements) > 1:
+        sep = elements[-2].comma
+    else:
+        sep = cst.Comma(whitespace_after=cst.SimpleWhitespace(" "))
+    if sep is cst.MaybeSentinel.DEFAULT:
+        sep = cst.Comma(whitespace_after=cst.SimpleWhitespace(" "))
+
+    result = [*elements[:-1], last.with_changes(comma=sep)]
+    result += [el.with_changes(comma=sep) for el in added[:-1]]
+    result.append(added[-1].with_changes(comma=last.comma))
+    return result
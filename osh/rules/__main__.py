@@ -1,8 +1,106 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import fixit
+import libcst as cst
 
+from osh.cache import ContentCache
+from osh.compat import Dict, Iterable, List, Optional, Tuple
+from osh.helpers import parse_manifest
+from osh.rules import semantic
 
-def run_rules(paths: list):
-    for res in fixit.fixit_paths([Path(path) for path in paths]):
-        fixit.print_result(res)
+
+def rules_version() -> str:
+    """Return a version of the rule set, changing with the rules source or settings."""
+
+    digest = hashlib.sha1(Path(semantic.__file__).read_bytes())
+    settings = [semantic.FORCED_KEYS, semantic.DEFAULT_VALUES]
+    digest.update(json.dumps(settings, sort_keys=True, default=repr).encode())
+    return digest.hexdigest()
+
+
+def _diagnostic(rule: str, message: str, line: int = 0, column: int = 0) -> dict:
+    return {"rule": rule, "message": message, "line": line, "column": column}
+
+
+def lint_semantic(content: bytes) -> List[dict]:
+    """
+    Run the semantic rules (see `osh.rules.semantic`) on the evaluated manifest.
+
+    The source is only parsed with libcst when there are issues to locate.
+    """
+
+    source = content.decode("utf-8")
+    try:
+        manifest = parse_manifest(source)
+    except (SyntaxError, ValueError) as error:
+        lineno = getattr(error, "lineno", None) or 0
+        offset = getattr(error, "offset", None) or 0
+        return [_diagnostic(type(error).__name__, str(error).splitlines()[0], lineno, offset)]
+    if not isinstance(manifest, dict):
+        return [_diagnostic("ManifestNotADict", "Manifest must be a dict.", 1, 0)]
+
+    issues = semantic.check_manifest(manifest)
+    if not issues:
+        return []
+
+    try:
+        positions = semantic.locate_keys(source)
+    except cst.ParserSyntaxError:
+        positions = {}
+    return [
+        _diagnostic(rule, message, *positions.get(key, positions.get(None, (0, 0))))
+        for rule, key, message in issues
+    ]
+
+
+def lint_manifest(path: Path, content: bytes) -> List[dict]:
+    """Run the rules on a manifest, return its diagnostics (rule, message, line, column)."""
+
+    diagnostics = lint_semantic(content)
+    return sorted(diagnostics, key=lambda d: (d["line"], d["column"], d["rule"], d["message"]))
+
+
+def _lint(item: Tuple[str, bytes]) -> List[dict]:
+    """Process pool worker."""
+
+    path, content = item
+    return lint_manifest(Path(path), content)
+
+
+def run_rules(
+    paths: Iterable[str], cache: Optional[ContentCache] = None, jobs: Optional[int] = 1
+) -> Dict[str, List[dict]]:
+    """
+    Return the diagnostics of each manifest, in the order of `paths`.
+
+    Results are looked up in `cache` by content hash, the cache being salted with
+    `rules_version()` by the caller, so unchanged manifests are not linted again.
+    The others are linted in a pool of `jobs` processes (0 or None means one per CPU).
+    """
+
+    cache = cache if cache is not None else ContentCache()
+    results: Dict[str, List[dict]] = {}
+    misses = []
+    for path in paths:
+        content = Path(path).read_bytes()
+        key = ContentCache.key(content)
+        results[path] = cache.get(key)
+        if results[path] is None:
+            misses.append((path, content, key))
+
+    workers = min(jobs or os.cpu_count() or 1, len(misses))
+    items = [(path, content) for path, content, _ in misses]
+    if workers > 1:
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            linted = list(pool.map(_lint, items, chunksize=chunksize))
+    else:
+        linted = [_lint(item) for item in items]
+
+    for (path, _, key), diagnostics in zip(misses, linted):
+        cache.set(key, diagnostics)
+        results[path] = diagnostics
+    return results
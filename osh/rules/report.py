@@ -0,0 +1,86 @@
+"""Reports of manifest check results (JSON and SARIF)."""
+
+import os
+
+from osh.compat import Dict, List, importlib_metadata
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_VERSION = "2.1.0"
+TOOL_NAME = "osh"
+TOOL_URI = "https://github.com/apikcloud/osh"
+
+
+def _tool_version() -> str:
+    try:
+        return importlib_metadata.version("odoo-scripts-helpers")
+    except importlib_metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def flatten(results: Dict[str, List[dict]], root: str) -> List[dict]:
+    """
+    Return one entry per diagnostic, with paths relative to `root`.
+
+    Entries are sorted by path, position, rule and message, so that a report only
+    depends on the checked files and not on the order they were found or linted in.
+    """
+
+    entries = [
+        {"path": os.path.relpath(path, root).replace(os.sep, "/"), **diag}
+        for path, diagnostics in results.items()
+        for diag in diagnostics
+    ]
+    return sorted(
+        entries, key=lambda e: (e["path"], e["line"], e["column"], e["rule"], e["message"])
+    )
+
+
+def to_json(results: Dict[str, List[dict]], root: str) -> dict:
+    return {
+        "files": len(results),
+        "issues": flatten(results, root),
+    }
+
+
+def to_sarif(results: Dict[str, List[dict]], root: str) -> dict:
+    """Return a SARIF 2.1.0 log of the results, for code scanning dashboards."""
+
+    entries = flatten(results, root)
+    rules = sorted({e["rule"] for e in entries})
+    rule_index = {rule: i for i, rule in enumerate(rules)}
+    return {
+        "$schema": SARIF_SCHEMA,
+        "version": SARIF_VERSION,
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": TOOL_NAME,
+                        "version": _tool_version(),
+                        "informationUri": TOOL_URI,
+                        "rules": [{"id": rule} for rule in rules],
+                    }
+                },
+                "results": [
+                    {
+                        "ruleId": e["rule"],
+                        "ruleIndex": rule_index[e["rule"]],
+                        "level": "error",
+                        "message": {"text": e["message"]},
+                        "locations": [
+                            {
+                                "physicalLocation": {
+                                    "artifactLocation": {"uri": e["path"]},
+                                    "region": {
+                                        "startLine": max(e["line"], 1),
+                                        "startColumn": e["column"] + 1,
+                                    },
+                                }
+                            }
+                        ],
+                    }
+                    for e in entries
+                ],
+            }
+        ],
+    }
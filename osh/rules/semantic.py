@@ -0,0 +1,121 @@
+"""
+Manifest rules working on the evaluated manifest dict.
+
+Most manifest checks only look at literal values: evaluating the manifest once with
+`ast.literal_eval` and running every rule on the resulting dict is much cheaper than a
+libcst parse plus a visitor pass per rule. libcst is only used afterwards, to locate
+the keys reported by the rules in the source.
+"""
+
+import abc
+
+import libcst as cst
+from libcst.metadata import MetadataWrapper, PositionProvider
+
+from osh.compat import Dict, Iterator, List, Optional, Tuple
+from osh.settings import DEFAULT_VALUES, FORCED_KEYS
+
+# (key, message): key is the manifest key to point at, None for the whole manifest
+Issue = Tuple[Optional[str], str]
+
+
+class ManifestRule(abc.ABC):
+    """Base class of the rules checking an evaluated manifest dict."""
+
+    @abc.abstractmethod
+    def check(self, manifest: dict) -> Iterator[Issue]:
+        """Yield (key, message) for each issue found in `manifest`."""
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+
+class OdooManifestAuthorMaintainers(ManifestRule):
+    """
+    Ensure Odoo manifest dict contains:
+      - author == "Apik"
+      - maintainers: non-empty list
+    """
+
+    def check(self, manifest: dict) -> Iterator[Issue]:
+        if "author" not in manifest:
+            yield None, "Manifest is missing 'author' key."
+        elif manifest["author"] != DEFAULT_VALUES["author"]:
+            yield "author", "Manifest 'author' must be exactly 'Apik'."
+
+        maintainers = manifest.get("maintainers")
+        if maintainers is None:
+            yield None, "Manifest is missing 'maintainers' key."
+        elif not isinstance(maintainers, list):
+            yield "maintainers", "'maintainers' must be a list."
+        elif not maintainers:
+            yield "maintainers", "'maintainers' must not be empty."
+
+
+class OdooManifestForcedKeys(ManifestRule):
+    """Ensure the keys osh enforces (website, license...) hold their expected value."""
+
+    def check(self, manifest: dict) -> Iterator[Issue]:
+        for key in FORCED_KEYS:
+            if key == "author" or manifest.get(key) == DEFAULT_VALUES[key]:
+                continue
+            if key in manifest:
+                yield key, f"Manifest '{key}' must be {DEFAULT_VALUES[key]!r}."
+            else:
+                yield None, f"Manifest is missing '{key}' key."
+
+
+class OdooManifestDependsSorted(ManifestRule):
+    """Ensure `depends` is sorted, with base first (as `osh manifest fix` writes it)."""
+
+    def check(self, manifest: dict) -> Iterator[Issue]:
+        depends = manifest.get("depends")
+        if not isinstance(depends, list) or not all(isinstance(d, str) for d in depends):
+            return
+        if depends != sorted(depends, key=lambda d: (d != "base", d)):
+            yield "depends", "'depends' must be sorted, with 'base' first."
+
+
+RULES: List[ManifestRule] = [
+    OdooManifestAuthorMaintainers(),
+    OdooManifestForcedKeys(),
+    OdooManifestDependsSorted(),
+]
+
+
+def check_manifest(
+    manifest: dict, rules: Optional[List[ManifestRule]] = None
+) -> List[Tuple[str, Optional[str], str]]:
+    """Run the rules on a manifest dict, return (rule, key, message) for each issue."""
+
+    return [
+        (rule.name, key, message)
+        for rule in (RULES if rules is None else rules)
+        for key, message in rule.check(manifest)
+    ]
+
+
+def locate_keys(source: str) -> Dict[Optional[str], Tuple[int, int]]:
+    """Return the (line, column) of each top-level manifest key, None being the dict itself."""
+
+    wrapper = MetadataWrapper(cst.parse_module(source))
+    positions = wrapper.resolve(PositionProvider)
+
+    for statement in wrapper.module.body:
+        if not isinstance(statement, cst.SimpleStatementLine):
+            continue
+        expr = statement.body[0]
+        if isinstance(expr, cst.Expr) and isinstance(expr.value, cst.Dict):
+            break
+    else:
+        return {}
+
+    start = positions[expr.value].start
+    result: Dict[Optional[str], Tuple[int, int]] = {None: (start.line, start.column)}
+    for element in expr.value.elements:
+        if isinstance(element, cst.DictElement) and isinstance(element.key, cst.SimpleString):
+            key = element.key.evaluated_value
+            start = positions[element.key].start
+            result.setdefault(key, (start.line, start.column))
+    return result
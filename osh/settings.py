@@ -1,7 +1,5 @@
 import os
 
-import black
-
 NEW_SUBMODULES_PATH = ".third-party"
 OLD_SUBMODULES_PATH = "third-party"
 
@@ -9,7 +7,9 @@ GITHUB_API = "https://api.github.com"
 
 MANIFEST_NAMES = ("__manifest__.py", "__openerp__.py", "__terp__.py")
 
-BLACK_MODE = black.FileMode()
+# Directory names (fnmatch patterns) never entered while looking for addons
+ADDONS_PRUNE_PATTERNS = (".git", "setup", "node_modules", "__pycache__")
+
 REPLACEMENTS = {
     "Frederic Grall": "fredericgrall",
     "Michel GUIHENEUF": "apik-mgu",
@@ -71,8 +71,96 @@ PRE_COMMIT_EXCLUDE_FILE = ".pre-commit-exclusions"
 
 RELEASE_WARN_AGE_DAYS = 30
 
+# Network operations on submodules (fetch): total and per git host concurrency
+FETCH_JOBS = 8
+FETCH_JOBS_PER_HOST = 4
+
+# Bare mirrors of submodule repositories shared by every project of the machine
+MIRRORS_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or "~/.cache", "osh", "mirrors")
+MIRRORS_DIR_ENV = "OSH_MIRRORS_DIR"
+
 
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
+# Fallback list of Odoo (community) core addons, not expected in projects. It is not
+# exhaustive: give the Odoo addons path instead (`osh addons graph --core-addons`).
+ODOO_ADDONS_PATH_ENV = "OSH_ODOO_ADDONS_PATH"
+ODOO_CORE_ADDONS = frozenset(
+    {
+        "account",
+        "account_edi",
+        "account_payment",
+        "analytic",
+        "auth_signup",
+        "auth_totp",
+        "barcodes",
+        "base",
+        "base_automation",
+        "base_import",
+        "base_setup",
+        "base_vat",
+        "board",
+        "bus",
+        "calendar",
+        "contacts",
+        "crm",
+        "decimal_precision",
+        "delivery",
+        "digest",
+        "event",
+        "fleet",
+        "hr",
+        "hr_attendance",
+        "hr_contract",
+        "hr_expense",
+        "hr_holidays",
+        "hr_skills",
+        "hr_timesheet",
+        "http_routing",
+        "iap",
+        "l10n_fr",
+        "link_tracker",
+        "lunch",
+        "mail",
+        "mass_mailing",
+        "mrp",
+        "note",
+        "payment",
+        "phone_validation",
+        "point_of_sale",
+        "portal",
+        "product",
+        "project",
+        "purchase",
+        "purchase_stock",
+        "rating",
+        "resource",
+        "sale",
+        "sale_management",
+        "sale_stock",
+        "sales_team",
+        "sms",
+        "stock",
+        "stock_account",
+        "uom",
+        "utm",
+        "web",
+        "web_editor",
+        "web_tour",
+        "website",
+        "website_sale",
+    }
+)
+
+
 CHECK_SYMBOL = "✓" if os.environ.get("LANG", "").lower().endswith(".utf-8") else "[X]"
+
+
+# Persistent caches, stored under the git directory of the project (e.g. .git/osh/)
+CACHE_DIR = "osh"
+ADDONS_INDEX_FILE = "addons.json"
+ADDONS_INDEX_VERSION = 2
+ADDONS_GRAPH_FILE = "graph.json"
+MANIFEST_FIX_CACHE_FILE = "manifest-fix.json"
+MANIFEST_CHECK_CACHE_FILE = "manifest-check.json"
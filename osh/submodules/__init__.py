@@ -3,6 +3,7 @@ import click
 from osh.submodules.add import main as add
 from osh.submodules.check import main as check
 from osh.submodules.clean import main as clean
+from osh.submodules.mirror import main as mirror
 from osh.submodules.prune import main as prune
 from osh.submodules.rewrite import main as rewrite
 from osh.submodules.show import main as show
@@ -35,3 +36,4 @@ submodules.add_command(rewrite)
 submodules.add_command(flatten)
 submodules.add_command(update)
 submodules.add_command(show)
+submodules.add_command(mirror)
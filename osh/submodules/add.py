@@ -5,18 +5,20 @@ from pathlib import Path
 
 import click
 
+from osh.gitmodules import GitModules
 from osh.gitutils import (
     add_submodule,
     commit,
     git_add,
-    git_config_submodule,
     git_top,
     submodule_sync,
     submodule_update,
+    update_sparse_checkouts,
 )
 from osh.helpers import (
     desired_path,
     ensure_parent,
+    iter_addon_dirs,
     relpath,
 )
 from osh.messages import (
@@ -24,22 +26,11 @@ from osh.messages import (
     GIT_SUBMODULE_ADD,
     GIT_SUBMODULE_ADD_DESC,
 )
+from osh.mirrors import find_mirror
 from osh.settings import NEW_SUBMODULES_PATH
 from osh.utils import human_readable, parse_repository_url, str_to_list
 
 
-def find_addons(submodule_dir: Path):
-    """Return addon directories (contain __manifest__.py or __openerp__.py)."""
-    addons = []
-    for root, dirs, files in os.walk(submodule_dir):
-        # speed: ignore .git and typical junk
-        if ".git" in dirs:
-            dirs.remove(".git")
-        if "__manifest__.py" in files or "__openerp__.py" in files:
-            addons.append(Path(root))
-    return addons
-
-
 @click.argument(
     "url",
     # help="Remote URL of the submodule (e.g., https://github.com/OCA/server-ux.git)",
@@ -67,6 +58,32 @@ def find_addons(submodule_dir: Path):
     "--addons",
     help="List of addons for which to create symlinks (default: '')",
 )
+@click.option(
+    "--depth",
+    type=click.IntRange(min=1),
+    help="Shallow clone with the given number of commits, recorded as 'shallow = true'",
+)
+@click.option(
+    "--filter",
+    "clone_filter",
+    metavar="SPEC",
+    help="Partial clone filter (e.g. blob:none), blobs are fetched on demand",
+)
+@click.option(
+    "--single-branch",
+    is_flag=True,
+    help="Only fetch the history of the tracked branch",
+)
+@click.option(
+    "--mirror",
+    is_flag=True,
+    help="Clone from the shared local mirror of the repository (created or refreshed first)",
+)
+@click.option(
+    "--sparse",
+    is_flag=True,
+    help="Only check out the addons symlinked at the repo root (sparse checkout)",
+)
 @click.option(
     "--no-commit",
     is_flag=True,
@@ -78,7 +95,7 @@ def find_addons(submodule_dir: Path):
     help="Show planned actions only",
 )
 @click.command(name="add")
-def main(  # noqa: C901, PLR0915
+def main(  # noqa: C901, PLR0912, PLR0915
     url: str,
     branch: str,
     base_dir: str,
@@ -135,13 +152,30 @@ def main(  # noqa: C901, PLR0915
     # Add submodule
     click.echo("[add] git submodule add")
     # FIXME: checkout to the branch before commit
-    add_submodule(url, sub_name, sub_path_str, branch=branch)
+    mirror = find_mirror(url) if options["mirror"] else None
+    if options["mirror"] and not mirror:
+        click.echo("⚠️  No mirror available, cloning from the remote.")
+    add_submodule(
+        url,
+        sub_name,
+        sub_path_str,
+        branch=branch,
+        depth=options["depth"],
+        filter=options["clone_filter"],
+        single_branch=options["single_branch"],
+        reference=str(mirror) if mirror else None,
+    )
 
     # Pin branch in .gitmodules (redundant but explicit)
     click.echo("[config] record branch in .gitmodules")
 
+    modules = GitModules.load(repo / ".gitmodules")
     if branch:
-        git_config_submodule(str(repo / ".gitmodules"), sub_name, "branch", branch)
+        modules.set(sub_name, "branch", branch)
+    if options["depth"]:
+        # honored by `git submodule update` for the next clones
+        modules.set(sub_name, "shallow", "true")
+    modules.save()
 
     # Sync and fetch content
     submodule_sync()
@@ -164,7 +198,7 @@ def main(  # noqa: C901, PLR0915
 
     if auto_symlinks or addons:
         click.echo("[scan] detecting addon folders…")
-        addons_found = find_addons(sub_path)
+        addons_found = [Path(addon_dir) for addon_dir, _ in iter_addon_dirs(sub_path)]
         if not addons_found:
             click.echo("  no addon folders detected.")
         else:
@@ -186,6 +220,11 @@ def main(  # noqa: C901, PLR0915
             if diff:
                 click.echo(f"Addons not found: {human_readable(diff)}")
 
+    if options["sparse"]:
+        dirs = update_sparse_checkouts(repo, [sub_path_str], enable=True).get(sub_path_str)
+        if dirs is not None:
+            click.echo(f"[sparse] checked out: {human_readable(dirs)}")
+
     # Stage .gitmodules and submodule path
     git_add([".gitmodules", sub_path_str])
 
@@ -2,12 +2,19 @@
 
 import click
 
-from osh.gitutils import git_top, parse_submodules
-from osh.helpers import symlink_targets
+from osh.gitutils import git_top, parse_gitmodules
+from osh.helpers import links_by_submodule, symlink_index
 
 
 @click.command(name="check")
-def main():  # noqa: C901
+@click.option(
+    "--backend",
+    type=click.Choice(["fs", "git"]),
+    default="fs",
+    show_default=True,
+    help="Read the top-level symlinks from the file system, or every symlink from the git index",
+)
+def main(backend: str):  # noqa: C901
     """Check that all submodules are under .third-party and used by at least one symlink."""
 
     repo = git_top()
@@ -16,22 +23,20 @@ def main():  # noqa: C901
         click.echo("No .gitmodules found.")
         return 0
 
-    subs = parse_submodules(gm)
+    subs = {name: path for name, path, _, _, _ in parse_gitmodules(gm) if path}
 
     if not subs:
         click.echo("No submodules found.")
         return 0
 
-    targets = symlink_targets(repo)
+    used = links_by_submodule(symlink_index(repo, backend=backend), subs.values())
     bad_paths = []
     unused = []
 
-    for name, item in subs.items():
-        path = item["path"]
+    for name, path in subs.items():
         if not path.startswith(".third-party/"):
             bad_paths.append((name, path))
-        # Check if any symlink target mentions this path
-        if not any(path in t for t in targets):
+        if not used[path]:
             unused.append((name, path))
 
     ok = True
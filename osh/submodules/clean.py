@@ -1,40 +1,149 @@
 #!/usr/bin/env python3
-import logging
+import os
 import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import click
 
-from osh.gitutils import git_reset_hard, git_top, parse_submodules, submodule_update
-from osh.settings import NEW_SUBMODULES_PATH, OLD_SUBMODULES_PATH
+from osh.compat import Dict, Iterable, List, Optional
+from osh.gitindex import MODE_GITLINK, list_index
+from osh.gitutils import (
+    git_reset_hard,
+    git_top,
+    local_head,
+    parse_gitmodules,
+    submodule_restore,
+)
+from osh.settings import FETCH_JOBS, NEW_SUBMODULES_PATH, OLD_SUBMODULES_PATH
+
+
+def find_stale_dirs(root: Path, bases: Iterable[str], keep: Iterable[str]) -> List[str]:
+    """
+    Return the directories under `bases` (relative to `root`) holding none of the `keep` paths.
+
+    Kept paths (submodules, tracked files) are never entered. Directories leading to a
+    kept path are entered and only their stale subdirectories reported, files are left
+    alone. Empty directories are stale.
+    """
+
+    keep = {os.path.normpath(path) for path in keep}
+    ancestors = set()
+    for path in keep:
+        parent = os.path.dirname(path)
+        while parent:
+            ancestors.add(parent)
+            parent = os.path.dirname(parent)
+
+    stale = []
+
+    def visit(path: str) -> None:
+        if path in keep:
+            return
+        if path not in ancestors:
+            stale.append(path)
+            return
+        with os.scandir(root / path) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir(follow_symlinks=False):
+                    visit(os.path.join(path, entry.name))
+
+    for base in bases:
+        if (root / base).is_dir() and not (root / base).is_symlink():
+            visit(os.path.normpath(base))
+    return stale
+
+
+def submodule_state(path: str, recorded: Optional[str]) -> Optional[str]:
+    """Return why the submodule at path must be restored ("missing", "dirty"...) or None."""
+
+    if not os.path.exists(os.path.join(path, ".git")):
+        return "missing"
+    if recorded and local_head(path) != recorded:
+        return "not at the recorded commit"
+    status = subprocess.run(
+        ["git", "-C", path, "status", "--porcelain"],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    if status.returncode or status.stdout.strip():
+        return "dirty"
+    return None
+
+
+def _remove(path: Path) -> None:
+    if path.is_symlink():
+        path.unlink()
+    else:
+        shutil.rmtree(path)
 
 
 @click.command(name="clean")
 @click.option("--reset", is_flag=True, help="Do a hard reset before")
-def main(reset: bool):
-    """Clean old submodule paths and update submodules."""
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=FETCH_JOBS,
+    show_default=True,
+    help="Number of submodules checked and cloned at once",
+)
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed or restored")
+def main(reset: bool, jobs: int, dry_run: bool):  # noqa: C901
+    """
+    Remove stale submodule directories and restore missing or dirty submodules.
+
+    Only the directories of .third-party (and the legacy third-party) that no submodule
+    references are removed. Submodules that are up to date are left untouched.
+    """
 
     repo = git_top()
+    os.chdir(repo)
     gm = repo / ".gitmodules"
     if not gm.exists():
         click.echo("No .gitmodules found.")
         return 0
 
-    if reset:
+    if reset and not dry_run:
         git_reset_hard()
 
-    subs = parse_submodules(gm)
-    if not subs:
+    paths = [path for _, path, _, _, _ in parse_gitmodules(gm) if path]
+    if not paths:
         click.echo("No submodules found.")
         return 0
 
-    for path in [OLD_SUBMODULES_PATH, NEW_SUBMODULES_PATH]:
-        old_base_path = repo / path
+    bases = [OLD_SUBMODULES_PATH, NEW_SUBMODULES_PATH]
+    index = list_index(repo, [*bases, *paths])
+    recorded: Dict[str, str] = {path: obj for mode, obj, path in index if mode == MODE_GITLINK}
+    stale = find_stale_dirs(repo, bases, [*paths, *(path for _, _, path in index)])
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        states = list(pool.map(lambda path: submodule_state(path, recorded.get(path)), paths))
+    restore = [(path, state) for path, state in zip(paths, states) if state]
+
+    for path in stale:
+        click.echo(f"🗑️  {'Would remove' if dry_run else 'Removing'} stale directory {path}")
+    for path, state in restore:
+        click.echo(f"🔄 {'Would restore' if dry_run else 'Restoring'} {path} ({state})")
+    click.echo(f"✅ {len(paths) - len(restore)} submodule(s) up to date.")
+
+    if dry_run or not (stale or restore):
+        return 0
+
+    for path in stale:
+        _remove(repo / path)
 
-        if old_base_path.exists():
-            click.echo(f"[prune] removing empty dir: {old_base_path}")
-            try:
-                shutil.rmtree(old_base_path)
-            except OSError as error:
-                logging.error(error)
+    if restore:
+        try:
+            submodule_restore([path for path, _ in restore], jobs=jobs)
+        except subprocess.CalledProcessError:
+            click.echo("❌ Failed to restore submodules.")
+            sys.exit(1)
+        for path, state in restore:
+            if state == "dirty":
+                subprocess.run(["git", "-C", path, "clean", "-ffdq"], check=True)
 
-    submodule_update()
+    return 0
@@ -0,0 +1,65 @@
+import sys
+
+import click
+
+from osh.gitutils import load_repo, map_per_host, parse_gitmodules
+from osh.mirrors import mirror_path, mirrors_root, update_mirror
+from osh.settings import FETCH_JOBS, FETCH_JOBS_PER_HOST
+
+
+@click.command("mirror")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=FETCH_JOBS,
+    show_default=True,
+    help="Number of mirrors updated at once",
+)
+@click.option(
+    "--jobs-per-host",
+    type=click.IntRange(min=1),
+    default=FETCH_JOBS_PER_HOST,
+    show_default=True,
+    help="Number of mirrors updated at once from the same git host",
+)
+def main(jobs: int, jobs_per_host: int):
+    """
+    Create or refresh the shared local mirrors of the submodule repositories.
+
+    Mirrors are reused by `add --mirror` and `update --init --mirror`, in every project.
+    """
+
+    _, gitmodules = load_repo()
+
+    if not gitmodules:
+        click.echo("No .gitmodules found.")
+        raise click.Abort()
+
+    # one URL per mirror: ssh and https URLs of a repository share it
+    by_mirror = {}
+    for name, _, _, url, _ in parse_gitmodules(gitmodules):
+        path = mirror_path(url) if url else None
+        if not path:
+            click.echo(f"⏭️  No mirror for submodule {name} ({url or 'no url'}), skipping.")
+        else:
+            by_mirror.setdefault(path, url)
+    urls = list(by_mirror.values())
+
+    click.echo(f"🔄 Updating {len(urls)} mirror(s) in {mirrors_root()}...")
+    mirrors, failures = map_per_host(
+        lambda url, _: update_mirror(url),
+        [(url, "", url) for url in urls],
+        jobs=jobs,
+        per_host=jobs_per_host,
+    )
+
+    for url in urls:
+        if url in failures:
+            click.echo(f"❌ Failed to mirror {url}: {failures[url]}")
+        else:
+            click.echo(f"✅ {url} -> {mirrors[url]}")
+
+    if failures:
+        sys.exit(1)
+    return 0
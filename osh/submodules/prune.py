@@ -8,10 +8,10 @@ from osh.gitutils import (
     commit,
     git_add_all,
     git_top,
-    parse_submodules,
+    parse_gitmodules,
     submodule_deinit,
 )
-from osh.helpers import relpath, symlink_targets
+from osh.helpers import links_by_submodule, symlink_index, top_level_symlinks
 from osh.messages import GIT_SUBMODULES_PRUNE
 from osh.settings import NEW_SUBMODULES_PATH, OLD_SUBMODULES_PATH
 
@@ -22,7 +22,15 @@ from osh.settings import NEW_SUBMODULES_PATH, OLD_SUBMODULES_PATH
     is_flag=True,
     help="Do not commit automatically at the end",
 )
-def main(no_commit: bool):  # noqa: C901, PLR0912
+@click.option(
+    "--backend",
+    type=click.Choice(["fs", "git"]),
+    default="git",
+    show_default=True,
+    help="Read every symlink from the git index, or only the top-level ones from the file "
+    "system (untracked top-level symlinks are always taken into account)",
+)
+def main(no_commit: bool, backend: str):  # noqa: C901, PLR0912
     """Remove unused submodules (not referenced by any symlink) and clean old paths."""
 
     repo = git_top()
@@ -31,20 +39,16 @@ def main(no_commit: bool):  # noqa: C901, PLR0912
         click.echo("No .gitmodules found.")
         return 0
 
-    subs = parse_submodules(gm)
+    subs = {name: path for name, path, _, _, _ in parse_gitmodules(gm) if path}
     if not subs:
         click.echo("No submodules found.")
         return 0
 
-    targets = symlink_targets(repo)
+    # removing is destructive: a submodule used by an untracked link is kept as well
+    links = {**top_level_symlinks(repo), **symlink_index(repo, backend=backend)}
+    used = links_by_submodule(links, subs.values())
 
-    unused = []
-    for name, item in subs.items():
-        path = repo / item["path"]
-        rel = relpath(repo, path)
-        if any(rel in t for t in targets):
-            continue
-        unused.append((name, str(path)))
+    unused = [(name, str(repo / path)) for name, path in subs.items() if not used[path]]
 
     if not unused:
         click.echo("✅ No unused submodules detected.")
@@ -1,12 +1,13 @@
 import click
 
+from osh.gitmodules import GitModules
 from osh.gitutils import (
     commit,
     git_add,
     guess_submodule_name,
     load_repo,
-    parse_submodules,
     rename_submodule,
+    submodule_sync,
 )
 from osh.helpers import ask
 from osh.messages import GIT_SUBMODULES_RENAME
@@ -28,9 +29,9 @@ def main(dry_run: bool, no_commit: bool, prompt: bool):
         click.echo("No .gitmodules found.")
         raise click.Abort()
 
-    subs = parse_submodules(gitmodules)
+    modules = GitModules.load(gitmodules)
 
-    for name, values in subs.items():
+    for name, values in modules.to_dict().items():
         pull_request = is_pull_request_path(values["path"]) or is_pull_request_path(name)
         new_name = guess_submodule_name(values["url"], pull_request=pull_request)
         if name != new_name:
@@ -45,7 +46,11 @@ def main(dry_run: bool, no_commit: bool, prompt: bool):
                     if custom:
                         new_name = custom
 
-            rename_submodule(str(gitmodules), name, new_name, values, dry_run)
+            rename_submodule(modules, name, new_name, dry_run)
+
+    # write .gitmodules once, then sync .git/config once for all renamed submodules
+    if modules.save():
+        submodule_sync()
 
     if not no_commit and not dry_run:
         click.echo("Committing changes...")
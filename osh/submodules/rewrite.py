@@ -2,22 +2,20 @@
 import contextlib
 import os
 import subprocess
-from pathlib import Path
 
 import click
 
+from osh.gitindex import tracked_symlinks
+from osh.gitmodules import GitModules
 from osh.gitutils import (
     commit,
     git_add,
-    git_add_all,
-    git_config_submodule,
     git_top,
     move_with_git,
-    parse_submodules,
     submodule_sync,
     submodule_update,
 )
-from osh.helpers import ask, desired_path, is_dir_empty, rewrite_symlink
+from osh.helpers import ask, desired_path, is_dir_empty, retarget_symlinks
 from osh.messages import GIT_SUBMODULES_REWRITE
 from osh.settings import NEW_SUBMODULES_PATH, OLD_SUBMODULES_PATH
 from osh.utils import human_readable, is_pull_request_path
@@ -55,9 +53,9 @@ def main(base_dir: str, force: bool, dry_run: bool, no_commit: bool, old_base_di
         click.echo("No .gitmodules found.")
         return 0
 
-    subs = parse_submodules(gm)
+    modules = GitModules.load(gm)
     plan = []
-    for name, d in subs.items():
+    for name, d in modules.to_dict().items():
         url = d.get("url")
         path = d.get("path")
         if not url or not path:
@@ -98,10 +96,11 @@ def main(base_dir: str, force: bool, dry_run: bool, no_commit: bool, old_base_di
         click.echo("Nothing accepted. Exiting.")
         return 0
 
-    # Update .gitmodules
+    # Update .gitmodules, written once
     for name, _, _, newp in accepted:
-        git_config_submodule(str(gm), name, "path", newp)
+        modules.set(name, "path", newp)
 
+    modules.save()
     git_add([str(gm)])
 
     # Move folders
@@ -128,21 +127,10 @@ def main(base_dir: str, force: bool, dry_run: bool, no_commit: bool, old_base_di
     submodule_sync()
     submodule_update()
 
-    # Rewrite symlinks
-    rewrites = 0
-    # Build a quick lookup for old->new prefixes
-    renames = [(oldp, newp) for (_, _, oldp, newp) in accepted]
-    for root, dirs, files in os.walk(repo):
-        if ".git" in dirs:
-            dirs.remove(".git")
-        for name in dirs + files:
-            p = Path(root) / name
-            if p.is_symlink():
-                for oldp, newp in renames:
-                    if rewrite_symlink(p, oldp, newp):
-                        rewrites += 1
-                        break
-    click.echo(f"Symlinks rewritten: {rewrites}")
+    # Rewrite the tracked symlinks pointing into a moved submodule
+    renames = {oldp: newp for (_, _, oldp, newp) in accepted}
+    rewritten = retarget_symlinks(repo, tracked_symlinks(repo, top_level=False), renames)
+    click.echo(f"Symlinks rewritten: {len(rewritten)}")
 
     # Prune old base dir if empty (auto-detect or --old-base-dir)
     old_base = old_base_dir
@@ -158,8 +146,8 @@ def main(base_dir: str, force: bool, dry_run: bool, no_commit: bool, old_base_di
         with contextlib.suppress(OSError):
             old_base_path.rmdir()
 
-    # Stage everything just in case (symlinks/renames)
-    git_add_all()
+    # Renames are staged by git mv, stage .gitmodules and the rewritten links at once
+    git_add([str(gm), *rewritten])
 
     # Auto commit with detailed message
     if not no_commit:
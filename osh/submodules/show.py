@@ -1,6 +1,6 @@
 import click
 
-from osh.gitutils import get_last_commit, load_repo, parse_gitmodules
+from osh.gitutils import get_last_commits, load_repo, parse_gitmodules
 from osh.utils import (
     format_datetime,
     human_readable,
@@ -13,7 +13,15 @@ from osh.utils import (
 @click.command("show")
 @click.option("--dry-run", is_flag=True, help="Show planned changes only")
 @click.option("--no-commit", is_flag=True, help="Do not commit changes")
-def main(dry_run: bool, no_commit: bool):
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Read the last commit of N submodules at once (0: automatic)",
+)
+def main(dry_run: bool, no_commit: bool, jobs: int):
     """
     Update git submodules to their latest upstream versions.
     """
@@ -24,8 +32,11 @@ def main(dry_run: bool, no_commit: bool):
         click.echo("No .gitmodules found.")
         raise click.Abort()
 
+    submodules = list(parse_gitmodules(gitmodules))
+    last_commits = get_last_commits([path for _, path, _, _, _ in submodules], jobs=jobs)
+
     rows = []
-    for name, path, branch, url, pull_request in parse_gitmodules(gitmodules):
+    for (name, _, branch, url, pull_request), last_commit in zip(submodules, last_commits):
         canonical_url, _, _ = parse_repository_url(url) if url else ("", None, None)
         row = [
             human_readable(name, width=50),
@@ -33,7 +44,6 @@ def main(dry_run: bool, no_commit: bool):
             branch,
             render_boolean(pull_request) or "",
         ]
-        last_commit = get_last_commit(path)
         if last_commit:
             row += [
                 format_datetime(last_commit.date),
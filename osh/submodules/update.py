@@ -1,16 +1,182 @@
+import os
 import subprocess
+import sys
 
 import click
 
-from osh.gitutils import commit, git_add, load_repo, parse_gitmodules, update_from
+from osh.compat import Dict, List, Optional, Tuple
+from osh.gitutils import (
+    commit,
+    fast_forward,
+    fetch_branch,
+    fetch_submodules,
+    git_add,
+    git_error,
+    has_staged_changes,
+    load_repo,
+    local_head,
+    mirror_head,
+    parse_gitmodules,
+    resolve_remote_heads,
+    submodule_update,
+    submodule_update_from,
+    update_sparse_checkouts,
+)
 from osh.helpers import ask
 from osh.messages import GIT_SUBMODULES_UPDATE
+from osh.mirrors import find_mirror
+from osh.settings import FETCH_JOBS, FETCH_JOBS_PER_HOST
+from osh.utils import human_readable
+
+
+def init_submodules(
+    todo: List[Tuple[str, str, str]], names: Dict[str, str], mirror: bool = False, **clone_options
+) -> Dict[str, str]:
+    """
+    Clone the uninitialized (path, branch, url) submodules with the given clone options.
+
+    With `mirror`, submodules are cloned from the shared local mirror of their repository
+    when there is one. `names` maps submodule paths to names. Return {path: mirror} for
+    the submodules cloned from a mirror.
+    """
+
+    mirrors = {}
+    for path, _, url in todo:
+        if os.path.exists(os.path.join(path, ".git")):
+            continue
+        click.echo(f"📥 Initializing {path}...")
+        reference = find_mirror(url) if mirror and url else None
+        try:
+            if reference:
+                submodule_update_from(names[path], path, str(reference))
+                mirrors[path] = str(reference)
+            else:
+                submodule_update(path, **clone_options)
+        except subprocess.CalledProcessError:
+            click.echo(f"⚠️  Failed to initialize {path}.")
+    return mirrors
+
+
+def preflight(
+    todo: List[Tuple[str, str, str]],
+    jobs: int,
+    per_host: int,
+    mirrors: Optional[Dict[str, str]] = None,
+) -> Tuple[list, dict]:
+    """
+    Compare the upstream head of each (path, branch, url) submodule to its HEAD.
+
+    Heads are resolved with parallel ls-remote calls, nothing is fetched. Submodules
+    just cloned from a mirror ({path: mirror}) are compared to the mirror instead, which
+    `find_mirror` refreshed when online, so they need no network access. Return the
+    (path, branch, url) of the submodules whose branch moved and {path: error}.
+    """
+
+    mirrors = mirrors or {}
+    failures = {}
+    heads = {}
+    remote = []
+    for path, branch, url in todo:
+        if not os.path.exists(os.path.join(path, ".git")):
+            failures[path] = "submodule not initialized"
+        elif path in mirrors:
+            try:
+                heads[path] = mirror_head(mirrors[path], branch)
+            except subprocess.CalledProcessError:
+                failures[path] = f"branch '{branch}' not found in {mirrors[path]}"
+        else:
+            remote.append((path, branch, url))
+
+    remote_heads, errors = resolve_remote_heads(remote, jobs=jobs, per_host=per_host)
+    heads.update(remote_heads)
+    failures.update(errors)
+    initialized = [item for item in todo if item[0] in heads]
+
+    moved = [
+        (path, branch, url)
+        for path, branch, url in initialized
+        if path in heads and heads[path] != local_head(path)
+    ]
+    return moved, failures
+
+
+def fetch_moved(
+    moved: List[Tuple[str, str, str]], jobs: int, per_host: int, mirrors: Dict[str, str]
+) -> Dict[str, str]:
+    """Fetch the moved submodules, from their mirror ({path: mirror}) if cloned from one.
+
+    Return {path: error} for the fetches that failed.
+    """
+
+    failures = fetch_submodules(
+        [item for item in moved if item[0] not in mirrors], jobs=jobs, per_host=per_host
+    )
+    for path, branch, _ in moved:
+        if path in mirrors:
+            try:
+                fetch_branch(path, branch, remote=mirrors[path])
+            except subprocess.CalledProcessError as error:
+                failures[path] = git_error(error)
+    return failures
 
 
 @click.command("update")
 @click.option("--dry-run", is_flag=True, help="Show planned changes only")
 @click.option("--no-commit", is_flag=True, help="Do not commit changes")
-def main(dry_run: bool, no_commit: bool):
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=FETCH_JOBS,
+    show_default=True,
+    help="Number of submodules fetched at once",
+)
+@click.option(
+    "--jobs-per-host",
+    type=click.IntRange(min=1),
+    default=FETCH_JOBS_PER_HOST,
+    show_default=True,
+    help="Number of submodules fetched at once from the same git host",
+)
+@click.option("--init", is_flag=True, help="Clone the submodules not initialized yet")
+@click.option(
+    "--depth",
+    type=click.IntRange(min=1),
+    help="Shallow clone with the given number of commits (with --init)",
+)
+@click.option(
+    "--filter",
+    "clone_filter",
+    metavar="SPEC",
+    help="Partial clone filter, e.g. blob:none (with --init)",
+)
+@click.option(
+    "--single-branch",
+    is_flag=True,
+    help="Only fetch the history of the tracked branch (with --init)",
+)
+@click.option(
+    "--mirror",
+    is_flag=True,
+    help="Clone from the shared local mirrors of the repositories (with --init)",
+)
+@click.option(
+    "--sparse",
+    is_flag=True,
+    help="Only check out the addons symlinked at the repo root (sparse checkout)",
+)
+def main(  # noqa: C901, PLR0912, PLR0913, PLR0915, PLR0917
+    dry_run: bool,
+    no_commit: bool,
+    jobs: int,
+    jobs_per_host: int,
+    init: bool,
+    depth: Optional[int],
+    clone_filter: Optional[str],
+    single_branch: bool,
+    mirror: bool,
+    sparse: bool,
+):
     """
     Update git submodules to their latest upstream versions.
     """
@@ -21,8 +187,8 @@ def main(dry_run: bool, no_commit: bool):
         click.echo("No .gitmodules found.")
         raise click.Abort()
 
-    changes = []
-    for name, path, branch, _, pull_request in parse_gitmodules(gitmodules):
+    todo, names = [], {}
+    for name, path, branch, url, pull_request in parse_gitmodules(gitmodules):
         if not path:
             click.echo(f"⚠️  Missing path for {name}, skipping.")
             continue
@@ -38,22 +204,61 @@ def main(dry_run: bool, no_commit: bool):
                 click.echo(f"⏭️  Skipping pull request submodule {path}.")
                 continue
 
-        click.echo(f"🔄 Updating {name} to latest of '{branch}'...")
+        todo.append((path, branch, url))
+        names[path] = name
 
-        if dry_run:
-            continue
+    mirrors = {}
+    if init and not dry_run:
+        mirrors = init_submodules(
+            todo,
+            names,
+            mirror=mirror,
+            depth=depth,
+            filter=clone_filter,
+            single_branch=single_branch,
+        )
 
-        try:
-            # fetch and checkout the branch
-            update_from(path, branch)
-            changes.append(path)
-        except subprocess.CalledProcessError as e:
-            click.echo(f"❌ Failed to update {path}: {e}")
-            continue
+    if not dry_run:
+        # sparse submodules follow the symlinks, --sparse turns it on for the others
+        for path, dirs in update_sparse_checkouts(repo, names, enable=sparse).items():
+            checkout = "all" if dirs is None else human_readable(dirs)
+            click.echo(f"✂️  Sparse checkout of {path}: {checkout}")
+
+    moved, failures = preflight(todo, jobs=jobs, per_host=jobs_per_host, mirrors=mirrors)
+    for path, branch, _ in moved:
+        click.echo(f"🔄 Updating {path} to latest of '{branch}'...")
+
+    if not moved and not failures:
+        click.echo("✅ Submodules already up to date.")
+        return 0
+
+    changes = []
+    if not dry_run:
+        # network: fetch the moved submodules once, concurrently (locally from mirrors)
+        failures.update(fetch_moved(moved, jobs=jobs, per_host=jobs_per_host, mirrors=mirrors))
+
+        # local: fast-forward in .gitmodules order
+        for path, branch, _ in moved:
+            if path in failures:
+                continue
+            try:
+                fast_forward(path, branch)
+                changes.append(path)
+            except subprocess.CalledProcessError as e:
+                failures[path] = git_error(e)
 
-    if not no_commit and not dry_run:
-        click.echo("Committing changes...")
+    if changes and not no_commit:
         git_add([str(gitmodules)] + changes)
-        commit(GIT_SUBMODULES_UPDATE, skip_hook=True)
+        if has_staged_changes():
+            click.echo("Committing changes...")
+            commit(GIT_SUBMODULES_UPDATE, skip_hook=True)
+
+    if failures:
+        for path, _, _ in todo:
+            if path in failures:
+                click.echo(f"❌ Failed to update {path}: {failures[path]}")
+        sys.exit(1)
 
-    click.echo("✅ Submodules updated to their upstream branches.")
+    if not dry_run:
+        click.echo("✅ Submodules updated to their upstream branches.")
+    return 0
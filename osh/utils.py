@@ -5,6 +5,7 @@ import os
 import re
 import shutil
 import subprocess
+import tempfile
 import textwrap
 from datetime import date, datetime
 from pathlib import Path
@@ -63,53 +64,59 @@ def parse_repository_url(url: str) -> Tuple[str, str, str]:
     Raises:
       ValueError if the URL cannot be parsed into owner/repo.
     """
-    url = url.strip()
+    host, path = split_repository_url(url)
+    parts = path.split("/")
 
-    def extract_data(parts: list) -> tuple:
-        owner, repo = parts[0], parts[1]
-        repo = removesuffix(repo, ".git")
-        canonical = f"https://{host}/{owner}/{repo}"
+    if len(parts) < 2:  # noqa: PLR2004
+        raise ValueError(f"Malformed url (missing owner/repo): {url}")
 
-        if owner == "oca":
-            owner = owner.upper()
+    owner, repo = parts[0], parts[1]
+    repo = removesuffix(repo, ".git")
+    canonical = f"https://{host}/{owner}/{repo}"
 
-        return canonical, owner, repo
+    if owner == "oca":
+        owner = owner.upper()
 
-    def get_host_and_path(url):
-        # 1) SCP-like SSH form: git@host:owner/repo(.git)?
-        m = re.match(r"^(?P<user>[^@]+)@(?P<host>[^:]+):(?P<path>.+)$", url)
-        if m:
-            host = m.group("host")
-            path = m.group("path").lstrip("/")
+    return canonical, owner, repo
 
-            return host, path
 
-        # 2) URL-like forms (https, http, ssh, git+ssh)
-        parsed = urlparse(url)
-        scheme = (parsed.scheme or "").lower()
+def split_repository_url(url: str) -> Tuple[str, str]:
+    """Return the (host, path) of a repository URL (HTTPS or SSH), host is "" for local paths.
 
-        if scheme in ("ssh", "git+ssh"):
-            host = parsed.hostname or ""
-            path = (parsed.path or "").lstrip("/")
+    Raises ValueError for unsupported URL schemes.
+    """
 
-            return host, path
+    url = url.strip()
 
-        if scheme in ("http", "https", ""):
-            # Strip possible credentials from netloc (user:pass@host)
-            netloc = parsed.netloc or ""
-            host = netloc.split("@")[-1] if netloc else ""
-            path = (parsed.path or "").lstrip("/")
+    # 1) SCP-like SSH form: git@host:owner/repo(.git)?
+    m = re.match(r"^(?P<user>[^@]+)@(?P<host>[^:]+):(?P<path>.+)$", url)
+    if m:
+        return m.group("host"), m.group("path").lstrip("/")
 
-            return host, path
+    # 2) URL-like forms (https, http, ssh, git+ssh)
+    parsed = urlparse(url)
+    scheme = (parsed.scheme or "").lower()
 
-        raise ValueError(f"Unsupported URL scheme in: {url}")
+    if scheme in ("ssh", "git+ssh"):
+        return parsed.hostname or "", (parsed.path or "").lstrip("/")
 
-    host, path = get_host_and_path(url)
-    parts = path.split("/")
+    if scheme in ("http", "https", ""):
+        # Strip possible credentials from netloc (user:pass@host)
+        netloc = parsed.netloc or ""
+        host = netloc.split("@")[-1] if netloc else ""
+        return host, (parsed.path or "").lstrip("/")
 
-    if len(parts) < 2:  # noqa: PLR2004
-        raise ValueError(f"Malformed url (missing owner/repo): {url}")
-    return extract_data(parts)
+    raise ValueError(f"Unsupported URL scheme in: {url}")
+
+
+def repository_host(url: str) -> str:
+    """Return the host of a repository URL, "" for local paths and relative URLs."""
+
+    try:
+        canonical, _, _ = parse_repository_url(url)
+    except ValueError:
+        return ""
+    return urlparse(canonical).hostname or ""
 
 
 def human_readable(raw: Any, sep: str = ", ", width: Optional[int] = None) -> str:
@@ -341,6 +348,54 @@ def load_manifest(addon_dir: Path) -> dict:
     return {}
 
 
+def find_git_dir(root: Path) -> Optional[Path]:
+    """Return the git directory of the repository containing `root`, or None.
+
+    Parents are searched up to the top of the working tree. Handles plain repositories
+    (`.git/` directory) as well as submodules and worktrees, where `.git` is a file
+    containing a `gitdir: <path>` pointer.
+    """
+
+    root = Path(os.path.abspath(root))
+    for top in (root, *root.parents):
+        dotgit = top / ".git"
+        if dotgit.is_dir():
+            return dotgit
+        if dotgit.is_file():
+            content = dotgit.read_text(encoding="utf-8").strip()
+            if content.startswith("gitdir:"):
+                return (top / content[len("gitdir:") :].strip()).resolve()
+            return None
+    return None
+
+
+def file_stamp(path: str) -> List[int]:
+    """Return a cheap fingerprint (mtime, size, inode) of a file, following symlinks."""
+
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def write_atomic(path: Path, content: str) -> None:
+    """Write `content` to `path` atomically (temporary file + rename in the same directory)."""
+
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
 def render_boolean(raw: bool) -> str:
     """
     Render a check mark if the terminal supports UTF-8, otherwise an 'OK'.
@@ -0,0 +1,71 @@
+"""Helpers and fixtures shared by the tests."""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+
+def git(*args: str, cwd: Path) -> str:
+    """Run git in `cwd` with a committer identity, return its stripped output."""
+
+    return subprocess.run(
+        [
+            "git",
+            "-c",
+            "user.name=CI",
+            "-c",
+            "user.email=ci@example.com",
+            "-c",
+            "protocol.file.allow=always",
+            *args,
+        ],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def init_repo(path: Path, message: str) -> Path:
+    """Create a repository on `main` with a single commit of README.md."""
+
+    path.mkdir(parents=True)
+    git("init", "-q", "-b", "main", cwd=path)
+    (path / "README.md").write_text(f"{message}\n")
+    git("add", ".", cwd=path)
+    git("commit", "-qm", message, cwd=path)
+    return path
+
+
+def write_manifest(addon: Path, content: str = "{}\n", name: str = "__manifest__.py") -> Path:
+    """Write a manifest in the `addon` directory (created if needed), return its path."""
+
+    addon.mkdir(parents=True, exist_ok=True)
+    path = addon / name
+    path.write_text(content)
+    return path
+
+
+def make_addon(root: Path, name: str, **values) -> Path:
+    """Create the addon `name` under `root`, its manifest holding `values`."""
+
+    addon = root / name
+    write_manifest(addon, repr({"name": name, **values}) + "\n")
+    return addon
+
+
+@pytest.fixture
+def git_env(monkeypatch):
+    """Commit identity and local (file://) submodules for the git commands of osh."""
+
+    for key, value in {
+        "GIT_AUTHOR_NAME": "CI",
+        "GIT_AUTHOR_EMAIL": "ci@example.com",
+        "GIT_COMMITTER_NAME": "CI",
+        "GIT_COMMITTER_EMAIL": "ci@example.com",
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": "protocol.file.allow",
+        "GIT_CONFIG_VALUE_0": "always",
+    }.items():
+        monkeypatch.setenv(key, value)
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+import os
+from pathlib import Path
+
+from osh.addons.list import FIELDS, iter_rows, write_csv, write_ndjson
+from osh.cache import AddonIndex
+from osh.helpers import find_addons
+from tests.conftest import make_addon
+
+
+def _rows(root: Path) -> list:
+    subs = {"third-party/sub": {"name": "sub", "branch": "17.0", "url": "https://x/sub"}}
+    return list(iter_rows(find_addons(root, index=AddonIndex()), subs))
+
+
+def test_iter_rows_skips_duplicates(tmp_path):
+    make_addon(tmp_path / "third-party" / "sub", "addon_s", version="17.0.1.0.0")
+    make_addon(tmp_path, "local", version="17.0.1.0.0")
+    os.symlink("third-party/sub/addon_s", tmp_path / "addon_s")
+
+    rows = sorted(_rows(tmp_path), key=lambda r: r["name"])
+    assert [r["name"] for r in rows] == ["addon_s", "local"]
+    assert rows[0]["submodule"] == "sub"
+    assert rows[0]["version"] == "17.0.1.0.0"
+    assert rows[1]["submodule"] == ""
+
+
+def test_write_ndjson(tmp_path):
+    make_addon(tmp_path, "local", version="17.0.1.0.0")
+    stream = io.StringIO()
+    write_ndjson(iter(_rows(tmp_path)), stream)
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["local"]
+
+
+def test_write_csv(tmp_path):
+    make_addon(tmp_path, "local", version="17.0.1.0.0")
+    stream = io.StringIO()
+    write_csv(iter(_rows(tmp_path)), stream)
+
+    stream.seek(0)
+    reader = csv.DictReader(stream)
+    assert reader.fieldnames == FIELDS
+    assert [row["name"] for row in reader] == ["local"]
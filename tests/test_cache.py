@@ -0,0 +1,171 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from osh import cache
+from osh.cache import AddonIndex
+from osh.helpers import find_addons
+from tests.conftest import make_addon
+
+MANIFEST = {"version": "17.0.1.0.0", "author": "Apik", "depends": ["base"]}
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    (tmp_path / ".git").mkdir()
+    make_addon(tmp_path, "addon_a", **MANIFEST)
+    make_addon(tmp_path, "addon_b", **MANIFEST)
+    return tmp_path
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    calls = []
+    original = cache.parse_manifest
+
+    def counting_parse(path):
+        calls.append(str(path))
+        return original(path)
+
+    monkeypatch.setattr(cache, "parse_manifest", counting_parse)
+    return calls
+
+
+def test_index_location(repo):
+    index = AddonIndex.from_root(repo)
+    assert index.filepath == repo / ".git" / "osh" / "addons.json"
+
+
+def test_index_outside_git_is_memory_only(tmp_path):
+    index = AddonIndex.from_root(tmp_path)
+    assert index.filepath is None
+    index.save()  # no-op
+
+
+def test_index_submodule_gitdir(tmp_path):
+    gitdir = tmp_path / "super" / ".git" / "modules" / "sub"
+    gitdir.mkdir(parents=True)
+    sub = tmp_path / "super" / "sub"
+    sub.mkdir()
+    (sub / ".git").write_text("gitdir: ../.git/modules/sub\n")
+
+    index = AddonIndex.from_root(sub)
+    assert index.filepath == gitdir.resolve() / "osh" / "addons.json"
+
+
+def test_index_from_subdir_uses_top_git_dir(repo):
+    index = AddonIndex.from_root(repo / "addon_a")
+    assert index.filepath == repo / ".git" / "osh" / "addons.json"
+
+
+def test_index_round_trip_keeps_types(repo):
+    manifest = repo / "addon_a" / "__manifest__.py"
+    manifest.write_text(
+        '{"name": "addon_a", "version": "17.0.1.0.0", "depends": ("base",),'
+        ' "tags": {"x", "y"}, "map": {1: b"raw"}, "data": ["a.xml"]}\n'
+    )
+    cold = AddonIndex.from_root(repo).manifest(str(manifest))
+    index = AddonIndex.from_root(repo)
+    index.store(str(manifest), [0], cold)
+    index.save()
+
+    warm = AddonIndex.from_root(repo).entries[str(manifest)]["manifest"]
+    assert warm == cold
+    assert isinstance(warm["depends"], tuple)
+    assert isinstance(warm["tags"], set)
+    assert warm["map"] == {1: b"raw"}
+
+
+def test_find_addons_names_only_does_not_parse(repo, parse_calls):
+    addons = list(find_addons(repo))
+    assert sorted(a.technical_name for a in addons) == ["addon_a", "addon_b"]
+    assert parse_calls == []
+
+    # the manifest is parsed on first access only, then shared
+    addon = addons[0]
+    assert addon.version == "17.0.1.0.0"
+    assert addon.author == "Apik"
+    assert addon.depends == ["base"]
+    assert len(parse_calls) == 1
+
+
+def test_find_addons_warm_run_does_not_parse(repo, parse_calls):
+    names = sorted((a.technical_name, a.version) for a in find_addons(repo))
+    assert [name for name, _ in names] == ["addon_a", "addon_b"]
+    assert sorted(Path(c).parent.name for c in parse_calls) == ["addon_a", "addon_b"]
+    assert (repo / ".git" / "osh" / "addons.json").is_file()
+
+    parse_calls.clear()
+    warm = sorted((a.technical_name, a.version) for a in find_addons(repo))
+    assert warm == [("addon_a", "17.0.1.0.0"), ("addon_b", "17.0.1.0.0")]
+    assert parse_calls == []
+
+
+def test_find_addons_saves_manifests_read_after_the_scan(repo, parse_calls):
+    addons = list(find_addons(repo))
+    assert parse_calls == []
+
+    assert [a.version for a in addons] == ["17.0.1.0.0", "17.0.1.0.0"]
+    assert len(parse_calls) == len(addons)
+    del addons
+    entries = AddonIndex.from_root(repo).entries
+    assert sorted(Path(p).parent.name for p in entries) == ["addon_a", "addon_b"]
+
+    parse_calls.clear()
+    assert [a.author for a in find_addons(repo)] == ["Apik", "Apik"]
+    assert parse_calls == []
+
+
+def test_index_invalidated_per_file(repo, parse_calls):
+    [a.version for a in find_addons(repo)]
+    parse_calls.clear()
+
+    manifest = repo / "addon_b" / "__manifest__.py"
+    manifest.write_text('{"name": "addon_b", "version": "17.0.2.0.0", "author": "Apik"}\n')
+    st = manifest.stat()
+    os.utime(manifest, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    versions = {a.technical_name: a.version for a in find_addons(repo)}
+    assert versions["addon_b"] == "17.0.2.0.0"
+    assert parse_calls == [str(manifest)]
+
+
+def test_index_discards_removed_manifests(repo):
+    index = AddonIndex.from_root(repo)
+    manifest = str(repo / "addon_a" / "__manifest__.py")
+    index.manifest(manifest)
+    os.unlink(manifest)
+
+    assert index.lookup(manifest) == (None, None)
+    assert os.path.abspath(manifest) not in index.entries
+
+
+def test_index_ignores_other_versions(repo):
+    filepath = repo / ".git" / "osh" / "addons.json"
+    filepath.parent.mkdir(parents=True)
+    filepath.write_text('{"version": -1, "entries": {"x": {}}}')
+
+    assert AddonIndex(filepath).entries == {}
+
+
+def test_find_addons_parallel_keeps_discovery_order(repo):
+    for name in ("addon_c", "addon_d", "addon_e"):
+        make_addon(repo, name, **MANIFEST)
+
+    serial = [a.technical_name for a in find_addons(repo, index=AddonIndex())]
+    parallel = [a.technical_name for a in find_addons(repo, index=AddonIndex(), jobs=2)]
+    assert parallel == serial
+
+
+def test_index_manifests_batch(repo, parse_calls):
+    paths = [str(repo / name / "__manifest__.py") for name in ("addon_b", "addon_a")]
+    index = AddonIndex.from_root(repo)
+
+    manifests = index.manifests(paths, jobs=1)
+    assert [m["name"] for m in manifests] == ["addon_b", "addon_a"]
+    assert len(parse_calls) == len(paths)
+
+    parse_calls.clear()
+    assert index.manifests(paths, jobs=4) == manifests
+    assert parse_calls == []
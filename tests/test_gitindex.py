@@ -0,0 +1,210 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from osh.addons.diff import (
+    build_addon_trie,
+    filter_submodule_addons,
+    find_modified_addons,
+    get_changed_files,
+)
+from osh.addons.diff import main as diff_main
+from osh.gitindex import (
+    MODE_SYMLINK,
+    list_changed,
+    list_index,
+    manifest_pathspecs,
+    read_blobs,
+    tracked_addon_paths,
+    tracked_symlinks,
+)
+from osh.helpers import iter_addon_dirs, retarget_symlinks
+from osh.manifest.check import collect_manifests
+from osh.manifest.check import main as check_main
+from tests.conftest import git, write_manifest
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    upstream = tmp_path / "server-ux"
+    upstream.mkdir()
+    git("init", "-q", cwd=upstream)
+    write_manifest(upstream / "base_tier")
+    write_manifest(upstream / "base_tier" / "static" / "lib" / "nested")
+    write_manifest(upstream / "unused_addon")
+    git("add", ".", cwd=upstream)
+    git("commit", "-qm", "init", cwd=upstream)
+
+    repo = tmp_path / "project"
+    repo.mkdir()
+    git("init", "-q", cwd=repo)
+    git("submodule", "add", "-q", str(upstream), ".third-party/OCA/server-ux", cwd=repo)
+    os.symlink(".third-party/OCA/server-ux/base_tier", repo / "base_tier")
+    write_manifest(repo / "local_addon")
+    git("add", ".", cwd=repo)
+    git("commit", "-qm", "init", cwd=repo)
+    write_manifest(repo / "untracked_addon")
+    return repo
+
+
+def test_list_index_reports_symlinks(project):
+    entries = {path: mode for mode, _, path in list_index(project)}
+    assert entries["base_tier"] == MODE_SYMLINK
+
+
+def test_read_blobs(project):
+    (project / "local_addon" / "__manifest__.py").write_text('{"name": "Local"}\n')
+    objects = {path: obj for _, obj, path in list_index(project, manifest_pathspecs())}
+
+    blobs = read_blobs(project, [objects["local_addon/__manifest__.py"], "0" * 40])
+
+    assert blobs == {objects["local_addon/__manifest__.py"]: "{}\n"}
+
+
+def test_list_changed(project):
+    (project / "local_addon" / "__manifest__.py").write_text('{"name": "Local"}\n')
+    assert list_changed(project, "HEAD", manifest_pathspecs()) == [
+        "local_addon/__manifest__.py",
+        "untracked_addon/__manifest__.py",
+    ]
+
+
+def test_list_changed_in_submodules(project):
+    sub = project / ".third-party" / "OCA" / "server-ux"
+    (sub / "unused_addon" / "__manifest__.py").write_text('{"name": "Unused"}\n')
+
+    assert list_changed(project, "HEAD", manifest_pathspecs()) == [
+        "untracked_addon/__manifest__.py"
+    ]
+    assert list_changed(project, "HEAD", manifest_pathspecs(), recurse_submodules=True) == [
+        ".third-party/OCA/server-ux/unused_addon/__manifest__.py",
+        "untracked_addon/__manifest__.py",
+    ]
+
+    args = [str(project), "--no-cache", "--changed-since", "HEAD"]
+    result = CliRunner().invoke(check_main, [*args, "--submodules"])
+    assert "unused_addon/__manifest__.py" in result.output
+    result = CliRunner().invoke(check_main, args)
+    assert "unused_addon" not in result.output
+
+
+def test_tracked_addon_paths(project):
+    assert [d for d, _ in tracked_addon_paths(project)] == [
+        ".third-party/OCA/server-ux/base_tier",
+        ".third-party/OCA/server-ux/unused_addon",
+        "base_tier",
+        "local_addon",
+        "untracked_addon",
+    ]
+    assert [d for d, _ in tracked_addon_paths(project, shallow=True)] == [
+        "base_tier",
+        "local_addon",
+        "untracked_addon",
+    ]
+
+
+@pytest.mark.parametrize("shallow", [True, False])
+def test_tracked_addon_paths_matches_walk(project, shallow):
+    walked = sorted(
+        os.path.relpath(d, project) for d, _ in iter_addon_dirs(project, shallow=shallow)
+    )
+    assert [d for d, _ in tracked_addon_paths(project, shallow=shallow)] == walked
+
+
+def test_collect_manifests_skips_submodules(project):
+    manifests = [os.path.relpath(p, project.resolve()) for p in collect_manifests(str(project))]
+    assert manifests == ["local_addon/__manifest__.py", "untracked_addon/__manifest__.py"]
+    assert collect_manifests(str(project), names=["base_tier"]) == []
+
+    result = CliRunner().invoke(check_main, [str(project), "--no-cache"])
+    assert "local_addon/__manifest__.py" in result.output
+    assert ".third-party" not in result.output
+
+
+def test_collect_manifests_covers_submodules(project):
+    manifests = [
+        os.path.relpath(p, project.resolve())
+        for p in collect_manifests(str(project), submodules=True)
+    ]
+    assert manifests == [
+        ".third-party/OCA/server-ux/base_tier/__manifest__.py",
+        ".third-party/OCA/server-ux/unused_addon/__manifest__.py",
+        "local_addon/__manifest__.py",
+        "untracked_addon/__manifest__.py",
+    ]
+    assert len(collect_manifests(str(project), names=["base_tier"], submodules=True)) == 1
+
+
+def test_tracked_symlinks(project):
+    assert tracked_symlinks(project) == {"base_tier": ".third-party/OCA/server-ux/base_tier"}
+
+
+def test_tracked_symlinks_absolute_target(project):
+    os.symlink(project / ".third-party" / "OCA" / "server-ux" / "unused_addon", project / "unused")
+    git("add", "unused", cwd=project)
+
+    links = tracked_symlinks(project)
+    assert links["unused"] == ".third-party/OCA/server-ux/unused_addon"
+
+    renames = {".third-party/OCA/server-ux": ".third-party/oca/server-ux"}
+    assert retarget_symlinks(project, links, renames) == ["base_tier", "unused"]
+    assert os.readlink(project / "unused") == str(
+        project / ".third-party" / "oca" / "server-ux" / "unused_addon"
+    )
+
+
+def test_find_modified_addons_from_index(project):
+    addon_dirs = [d for d, _ in tracked_addon_paths(project)]
+    trie = build_addon_trie(addon_dirs, links=tracked_symlinks(project))
+    files = [
+        "local_addon/models/foo.py",
+        "README.md",
+        "base_tier",
+        ".third-party/OCA/server-ux/base_tier/views/bar.xml",
+        ".third-party/OCA/server-ux/unused_addon/__init__.py",
+        ".third-party/OCA/server-ux/README.md",
+    ]
+    expected = [".third-party/OCA/server-ux/unused_addon", "base_tier", "local_addon"]
+    assert find_modified_addons(files, trie=trie) == expected
+    assert find_modified_addons(files, root=project, links=tracked_symlinks(project)) == expected
+
+
+def test_diff_expands_submodule_bumps(project, monkeypatch):
+    upstream = project.parent / "server-ux"
+    git("tag", "v1.0.0", cwd=project)
+    (upstream / "base_tier" / "models.py").write_text("# change\n")
+    (upstream / "unused_addon" / "models.py").write_text("# change\n")
+    git("add", ".", cwd=upstream)
+    git("commit", "-qm", "upstream change", cwd=upstream)
+
+    sub = project / ".third-party" / "OCA" / "server-ux"
+    git("pull", "-q", "origin", "HEAD", cwd=sub)
+    git("commit", "-qam", "bump server-ux", cwd=project)
+
+    monkeypatch.chdir(project.parent)
+    files, submodules, unresolved = get_changed_files("tag", root=project)
+    assert submodules == [".third-party/OCA/server-ux"]
+    assert unresolved == []
+    assert sorted(files) == [
+        ".third-party/OCA/server-ux/base_tier/models.py",
+        ".third-party/OCA/server-ux/unused_addon/models.py",
+    ]
+
+    monkeypatch.chdir(project)
+    for backend in ("git", "walk"):
+        result = CliRunner().invoke(diff_main, ["tag", "--format", "json", "--backend", backend])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output) == [{"name": "base_tier", "path": "base_tier"}]
+
+
+def test_filter_submodule_addons_unresolved():
+    links = {"base_tier": ".third-party/OCA/server-ux/base_tier", "other": ".third-party/x/y/z"}
+    addons = ["local_addon"]
+    submodules = [".third-party/OCA/server-ux"]
+    assert filter_submodule_addons(addons, submodules, submodules, links) == [
+        "base_tier",
+        "local_addon",
+    ]
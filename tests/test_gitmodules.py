@@ -0,0 +1,98 @@
+import subprocess
+import textwrap
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from osh.gitmodules import GitModules
+from osh.submodules import rename as rename_mod
+
+CONTENT = textwrap.dedent(
+    """\
+    # managed by osh
+    [submodule "OCA/server-ux"]
+    \tpath = .third-party/OCA/server-ux
+    \turl = https://github.com/OCA/server-ux.git
+    \tbranch = 17.0
+    [submodule "web"]
+        path = third-party/web  ; old layout
+        url = "https://github.com/OCA/web.git"
+    """
+)
+
+
+@pytest.fixture
+def gitmodules(tmp_path: Path) -> Path:
+    path = tmp_path / ".gitmodules"
+    path.write_text(CONTENT)
+    return path
+
+
+def _git_config(path: Path, key: str) -> str:
+    cmd = ["git", "config", "-f", str(path), key]
+    return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_parse(gitmodules):
+    modules = GitModules.load(gitmodules)
+    assert modules.names() == ["OCA/server-ux", "web"]
+    assert modules.get("web", "path") == "third-party/web"
+    assert modules.get("web", "url") == "https://github.com/OCA/web.git"
+    assert modules.get("web", "branch") is None
+    assert modules.to_dict()["OCA/server-ux"]["branch"] == "17.0"
+    assert modules.text == CONTENT
+
+
+def test_edits_keep_formatting(gitmodules):
+    modules = GitModules.load(gitmodules)
+    modules.set("web", "path", ".third-party/OCA/web")
+    modules.set("web", "branch", "17.0")
+    modules.rename("web", "OCA/web")
+    modules.set("OCA/server-ux", "branch", "17.0")  # unchanged
+    modules.add("odoo/odoo", path=".third-party/odoo/odoo", url="git@github.com:odoo/odoo.git")
+    assert modules.save()
+    assert not modules.save()
+
+    text = gitmodules.read_text()
+    assert text.startswith("# managed by osh\n")
+    assert '[submodule "OCA/web"]\n    path = .third-party/OCA/web\n' in text
+    assert '    url = "https://github.com/OCA/web.git"\n    branch = 17.0\n' in text
+
+    # git reads the file like we do
+    assert _git_config(gitmodules, "submodule.OCA/web.path") == ".third-party/OCA/web"
+    assert _git_config(gitmodules, "submodule.OCA/web.branch") == "17.0"
+    assert _git_config(gitmodules, "submodule.odoo/odoo.url") == "git@github.com:odoo/odoo.git"
+
+
+def test_remove_and_unset(gitmodules):
+    modules = GitModules.load(gitmodules)
+    modules.unset("OCA/server-ux", "branch")
+    modules.remove("web")
+
+    assert modules.names() == ["OCA/server-ux"]
+    assert modules.get("OCA/server-ux", "branch") is None
+    with pytest.raises(ValueError):
+        modules.rename("OCA/server-ux", "OCA/server-ux")
+
+
+def test_special_values_are_quoted(tmp_path):
+    path = tmp_path / ".gitmodules"
+    modules = GitModules(path)
+    modules.add("x", path="a dir # tmp", url='quote"d')
+    modules.save()
+
+    assert GitModules.load(path).to_dict() == {"x": {"path": "a dir # tmp", "url": 'quote"d'}}
+    assert _git_config(path, "submodule.x.path") == "a dir # tmp"
+
+
+def test_rename_command_writes_and_syncs_once(gitmodules, monkeypatch):
+    syncs = []
+    monkeypatch.setattr(rename_mod, "load_repo", lambda: (gitmodules.parent, gitmodules))
+    monkeypatch.setattr(rename_mod, "submodule_sync", lambda: syncs.append(True))
+
+    result = CliRunner().invoke(rename_mod.main, ["--no-prompt", "--no-commit"])
+    assert result.exit_code == 0, result.output
+
+    assert GitModules.load(gitmodules).names() == ["OCA/server-ux", "OCA/web"]
+    assert syncs == [True]
@@ -0,0 +1,116 @@
+import pytest
+from click.testing import CliRunner
+
+from osh import graph as graph_mod
+from osh.addons.graph import main as graph_main
+from osh.exceptions import DependencyCycle
+from osh.graph import AddonGraph, core_addons, load_graph
+from tests.conftest import git, make_addon
+
+
+@pytest.fixture
+def graph() -> AddonGraph:
+    return AddonGraph(
+        {
+            "sale_custom": ["sale", "base_tier"],
+            "base_tier": ["mail"],
+            "sale_report": ["sale_custom"],
+            "mail": ["base"],
+            "sale": ["mail", "base"],
+            "stock_custom": ["stock"],
+            "web_custom": ["web_widget_x2many"],
+        }
+    )
+
+
+def test_dependencies(graph):
+    assert graph.dependencies(["sale_report"]) == {
+        "sale_custom",
+        "sale",
+        "base_tier",
+        "mail",
+        "base",
+    }
+    assert graph.dependencies(["mail"]) == {"base"}
+
+
+def test_dependents(graph):
+    assert graph.dependents(["mail"]) == {"base_tier", "sale", "sale_custom", "sale_report"}
+    assert graph.dependents(["base"]) == {"mail", "sale", "base_tier", "sale_custom", "sale_report"}
+    assert graph.dependents(["sale_report"]) == set()
+
+
+def test_missing(graph):
+    assert graph.missing() == {"web_widget_x2many": ["web_custom"]}
+    assert graph.core() == {"base": ["mail", "sale"], "stock": ["stock_custom"]}
+
+
+def test_missing_with_core_addons_path(graph, tmp_path):
+    odoo = tmp_path / "odoo" / "addons"
+    for name in ("base", "mail", "sale", "stock", "web_widget_x2many"):
+        make_addon(odoo, name)
+    (odoo / "not_an_addon").mkdir()
+
+    core = core_addons([str(odoo)])
+    assert core == {"base", "mail", "sale", "stock", "web_widget_x2many"}
+    assert graph.missing(core) == {}
+    assert graph.core(core)["web_widget_x2many"] == ["web_custom"]
+    assert "sale_crm" in AddonGraph({"x": ["sale_crm"]}).missing()
+    assert AddonGraph({"x": ["sale_crm"]}).missing({"sale_crm"}) == {}
+
+
+def test_install_order(graph):
+    assert graph.install_order() == [
+        "mail",
+        "base_tier",
+        "sale",
+        "sale_custom",
+        "sale_report",
+        "stock_custom",
+        "web_custom",
+    ]
+    assert graph.install_order(["base_tier"]) == ["mail", "base_tier"]
+
+
+def test_cycles():
+    graph = AddonGraph({"a": ["b"], "b": ["c"], "c": ["a"], "d": ["d"], "e": ["a"]})
+    assert graph.cycles() == [["a", "b", "c"], ["d"]]
+
+    with pytest.raises(DependencyCycle, match="a, b, c, d$"):
+        graph.install_order()
+
+
+def test_no_cycles(graph):
+    assert graph.cycles() == []
+
+
+def test_load_graph_is_stored_with_the_index(tmp_path, monkeypatch):
+    (tmp_path / ".git").mkdir()
+    make_addon(tmp_path, "a", depends=["base"])
+    make_addon(tmp_path, "b", depends=["a"])
+
+    assert load_graph(tmp_path).depends == {"a": ["base"], "b": ["a"]}
+    assert (tmp_path / ".git" / "osh" / "graph.json").is_file()
+
+    built = []
+    monkeypatch.setattr(graph_mod, "_write_graph", lambda *args: built.append(args))
+    assert load_graph(tmp_path).dependents(["a"]) == {"b"}
+    assert built == []
+
+    make_addon(tmp_path, "c", depends=["b"])
+    assert load_graph(tmp_path).dependents(["a"]) == {"b", "c"}
+    assert len(built) == 1
+
+
+def test_graph_cli_cycles(tmp_path, monkeypatch):
+    git("init", "-q", cwd=tmp_path)
+    make_addon(tmp_path, "a", depends=["b"])
+    make_addon(tmp_path, "b", depends=["a"])
+    monkeypatch.chdir(tmp_path)
+
+    result = CliRunner().invoke(graph_main, ["cycles"])
+    assert result.exit_code == 0, result.output
+    assert result.output == "a, b\n"
+
+    result = CliRunner().invoke(graph_main, ["order"])
+    assert result.exit_code == 1
@@ -0,0 +1,161 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from osh.helpers import (
+    PathTrie,
+    iter_addon_dirs,
+    links_by_submodule,
+    retarget_symlinks,
+    scan_tree,
+    sparse_dirs,
+    symlink_targets,
+    top_level_symlinks,
+)
+from tests.conftest import write_manifest
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """
+    tmp_path/
+        local_addon/                        (addon, with a nested manifest in static/)
+        legacy_addon/                       (addon, __terp__.py)
+        .third-party/OCA/server-ux/base_tier/
+        linked_addon -> .third-party/OCA/server-ux/base_tier
+        setup/ignored_addon/
+    """
+
+    write_manifest(tmp_path / "local_addon")
+    write_manifest(tmp_path / "local_addon" / "static" / "lib" / "vendored")
+    write_manifest(tmp_path / "legacy_addon", name="__terp__.py")
+    write_manifest(tmp_path / ".third-party" / "OCA" / "server-ux" / "base_tier")
+    write_manifest(tmp_path / "setup" / "ignored_addon")
+    (tmp_path / "linked_addon").symlink_to(".third-party/OCA/server-ux/base_tier")
+    return tmp_path
+
+
+def _names(root: Path, **kwargs) -> list:
+    return sorted(Path(d).relative_to(root).as_posix() for d, _ in iter_addon_dirs(root, **kwargs))
+
+
+def test_iter_addon_dirs_stops_at_addon_boundary(tree):
+    assert _names(tree) == [
+        ".third-party/OCA/server-ux/base_tier",
+        "legacy_addon",
+        "linked_addon",
+        "local_addon",
+    ]
+
+
+def test_iter_addon_dirs_shallow(tree):
+    assert _names(tree, shallow=True) == ["legacy_addon", "linked_addon", "local_addon"]
+
+
+def test_iter_addon_dirs_prune_patterns(tree):
+    assert _names(tree, prune=(".git", ".*", "setup", "*_addon")) == []
+    assert "setup/ignored_addon" in _names(tree, prune=())
+
+
+def test_scan_tree_does_not_loop_on_symlink_cycles(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "loop").symlink_to("..")
+
+    dirpaths = [Path(d) for d, _, _, _ in scan_tree(tmp_path, followlinks=True)]
+    assert dirpaths == [tmp_path, tmp_path / "a"]
+
+
+def test_scan_tree_depth(tree):
+    depths = {Path(d).relative_to(tree).as_posix(): depth for d, depth, _, _ in scan_tree(tree)}
+    assert depths["."] == 0
+    assert depths[".third-party/OCA/server-ux/base_tier"] == len(Path(".third-party/OCA/x/y").parts)
+
+
+def test_symlink_targets(tree):
+    assert symlink_targets(tree) == [".third-party/OCA/server-ux/base_tier"]
+
+
+def test_top_level_symlinks(tree):
+    (tree / "local_addon" / "nested_link").symlink_to("../legacy_addon")
+    (tree / "absolute_link").symlink_to(tree / "legacy_addon")
+
+    assert top_level_symlinks(tree) == {
+        "absolute_link": "legacy_addon",
+        "linked_addon": ".third-party/OCA/server-ux/base_tier",
+    }
+
+
+def test_links_by_submodule_matches_path_components():
+    links = {
+        "web_tree": ".third-party/OCA/web-extra/web_tree",
+        "base_tier": ".third-party/OCA/server-ux/base_tier",
+        "local": "addons/local",
+    }
+    submodules = [
+        ".third-party/OCA/web",
+        ".third-party/OCA/web-extra",
+        ".third-party/OCA/server-ux",
+    ]
+
+    assert links_by_submodule(links, submodules) == {
+        ".third-party/OCA/web": [],
+        ".third-party/OCA/web-extra": ["web_tree"],
+        ".third-party/OCA/server-ux": ["base_tier"],
+    }
+
+
+def test_sparse_dirs():
+    links = {
+        "web_tree": "tp/OCA/web/web_tree",
+        "web_nested": "tp/OCA/web/addons/web_nested",
+        "server": "tp/OCA/server-ux",
+    }
+
+    assert sparse_dirs(links, ["tp/OCA/web", "tp/OCA/server-ux", "tp/OCA/unused"]) == {
+        "tp/OCA/web": ["addons/web_nested", "web_tree"],
+        "tp/OCA/server-ux": None,
+        "tp/OCA/unused": None,
+    }
+
+
+def test_retarget_symlinks(tmp_path):
+    for path in ("new/OCA/web/web_tree", "third-party/OCA/web-extra/web_x", "docs"):
+        (tmp_path / path).mkdir(parents=True)
+    (tmp_path / "web_tree").symlink_to("third-party/OCA/web/web_tree")
+    (tmp_path / "web_x").symlink_to("third-party/OCA/web-extra/web_x")
+    (tmp_path / "docs" / "web").symlink_to("../third-party/OCA/web")
+    links = {
+        "web_tree": "third-party/OCA/web/web_tree",
+        "web_x": "third-party/OCA/web-extra/web_x",
+        "docs/web": "third-party/OCA/web",
+    }
+
+    rewritten = retarget_symlinks(tmp_path, links, {"third-party/OCA/web": "new/OCA/web"})
+
+    assert rewritten == ["docs/web", "web_tree"]
+    assert os.readlink(tmp_path / "web_tree") == "new/OCA/web/web_tree"
+    assert os.readlink(tmp_path / "docs" / "web") == "../new/OCA/web"
+    assert os.readlink(tmp_path / "web_x") == "third-party/OCA/web-extra/web_x"
+
+
+def test_path_trie_longest_prefix():
+    trie = PathTrie()
+    trie.insert(".third-party/OCA/server-ux", "submodule")
+    trie.insert(".third-party/OCA/server-ux/base_tier", "addon")
+
+    assert trie.longest_prefix(".third-party/OCA/server-ux/base_tier/models/x.py") == (
+        ".third-party/OCA/server-ux/base_tier",
+        "addon",
+    )
+    assert trie.longest_prefix(".third-party/OCA/server-ux/README.md") == (
+        ".third-party/OCA/server-ux",
+        "submodule",
+    )
+    # components are matched whole, not as substrings
+    assert trie.longest_prefix(".third-party/OCA/server-ux-extra/a") is None
+    assert trie.longest_prefix("./.third-party//OCA/server-ux") == (
+        ".third-party/OCA/server-ux",
+        "submodule",
+    )
+    assert len(trie) == 2  # noqa: PLR2004
@@ -0,0 +1,131 @@
+import importlib
+from pathlib import Path
+
+import pytest
+
+from osh import parser
+from osh.cache import ContentCache
+from osh.manifest.fix import fix_manifests, fix_version, normalize_manifest
+
+# osh.manifest exposes the `fix` command under the module name
+fix = importlib.import_module("osh.manifest.fix")
+
+
+@pytest.fixture
+def manifest(tmp_path: Path) -> Path:
+    path = tmp_path / "addon" / "__manifest__.py"
+    path.parent.mkdir()
+    path.write_text('{"name": "Addon", "depends": ["web", "base"], "post_init_hook": "hook"}\n')
+    return path
+
+
+@pytest.fixture
+def normalize_calls(monkeypatch):
+    calls = []
+    original = fix._normalize
+
+    def counting_normalize(source):
+        calls.append(source)
+        return original(source)
+
+    monkeypatch.setattr(fix, "_normalize", counting_normalize)
+    return calls
+
+
+def test_normalize_manifest_keeps_unknown_keys(manifest):
+    output = normalize_manifest(manifest.read_text())
+    assert output.startswith("# pylint: disable=W0104\n")
+    assert '"depends": ["base", "web"]' in output
+    assert '"post_init_hook": "hook"' in output
+    assert normalize_manifest(output) == output
+
+
+def test_normalize_manifest_keeps_comments():
+    source = """# -*- coding: utf-8 -*-
+{
+    "name": "Addon",
+    "author": "Someone",  # original author
+    "maintainer": ["Aurelien ROY"],
+    "depends": [
+        "web",  # backend
+        "base",
+        "account",
+    ],
+}
+"""
+    expected = """# -*- coding: utf-8 -*-
+# pylint: disable=W0104
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+{
+    "name": "Addon",
+    "author": "Apik",  # original author
+    "maintainers": ["royaurelien"],
+    "depends": [
+        "base",
+        "account",
+        "web",  # backend
+    ],
+    "website": "https://apik.cloud",
+    "license": "LGPL-3",
+}
+"""
+    assert normalize_manifest(source, force_default=False) == expected
+
+
+def test_normalize_manifest_rejects_non_dict():
+    with pytest.raises(ValueError):
+        normalize_manifest("x = 1\n")
+
+
+def test_fix_manifests_check_does_not_write(manifest):
+    source = manifest.read_text()
+    changed, errors = fix_manifests([str(manifest)], ContentCache(), check=True, jobs=1)
+
+    assert changed == [str(manifest)]
+    assert errors == []
+    assert manifest.read_text() == source
+
+
+def test_fix_manifests_skips_normalized_content(manifest, normalize_calls):
+    cache = ContentCache()
+    changed, _ = fix_manifests([str(manifest)], cache, jobs=1)
+    assert changed == [str(manifest)]
+    assert len(normalize_calls) == 1
+
+    mtime = manifest.stat().st_mtime_ns
+    changed, _ = fix_manifests([str(manifest)], cache, jobs=1)
+    assert changed == []
+    assert len(normalize_calls) == 1
+    assert manifest.stat().st_mtime_ns == mtime
+
+
+def test_fix_manifests_refixes_when_settings_change(manifest, normalize_calls, monkeypatch):
+    filepath = manifest.parent / "cache.json"
+    cache = ContentCache(filepath, salt=fix_version())
+    fix_manifests([str(manifest)], cache, jobs=1)
+    cache.save()
+
+    monkeypatch.setitem(parser.DEFAULT_VALUES, "website", "https://example.com")
+    changed, _ = fix_manifests([str(manifest)], ContentCache(filepath, salt=fix_version()), jobs=1)
+    assert changed == [str(manifest)]
+    assert len(normalize_calls) == 2  # noqa: PLR2004
+    assert '"website": "https://example.com"' in manifest.read_text()
+
+
+def test_fix_manifests_reports_errors(tmp_path):
+    path = tmp_path / "__manifest__.py"
+    path.write_text("{'name': \n")
+
+    changed, errors = fix_manifests([str(path)], ContentCache(), jobs=1)
+    assert changed == []
+    assert [p for p, _ in errors] == [str(path)]
+
+
+def test_content_cache_salt(tmp_path):
+    filepath = tmp_path / "cache.json"
+    cache = ContentCache(filepath, salt="1")
+    cache.set(ContentCache.key("content"), True)
+    cache.save()
+
+    assert ContentCache.key("content") in ContentCache(filepath, salt="1")
+    assert ContentCache.key("content") not in ContentCache(filepath, salt="2")
@@ -0,0 +1,174 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from osh.gitutils import add_submodule, submodule_update_from
+from osh.mirrors import find_mirror, mirror_path, update_mirror
+from osh.submodules.mirror import main as mirror
+from osh.submodules.update import main as update
+from tests.conftest import git, init_repo
+
+URL = "https://example.com/acme/{}.git"
+
+
+def _serve(monkeypatch, base: Path) -> None:
+    """Resolve https://example.com/acme/<repo> to the repositories of `base`."""
+
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "2")
+    monkeypatch.setenv("GIT_CONFIG_KEY_1", f"url.{base}/.insteadOf")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_1", "https://example.com/acme/")
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch, git_env):
+    """A bare repository `one.git` served as https://example.com/acme/one.git."""
+
+    monkeypatch.setenv("OSH_MIRRORS_DIR", str(tmp_path / "mirrors"))
+
+    work = init_repo(tmp_path / "work", "one")
+    git("clone", "-q", "--bare", str(work), str(tmp_path / "upstream" / "one.git"), cwd=tmp_path)
+    git("remote", "add", "origin", str(tmp_path / "upstream" / "one.git"), cwd=work)
+
+    _serve(monkeypatch, tmp_path / "upstream")
+    return work
+
+
+def _offline(monkeypatch, tmp_path):
+    _serve(monkeypatch, tmp_path / "offline")
+
+
+def test_mirror_path(tmp_path):
+    assert mirror_path("git@github.com:OCA/Server-UX.git", root=tmp_path) == (
+        tmp_path / "github.com" / "oca" / "server-ux.git"
+    )
+    assert mirror_path("../relative", root=tmp_path) is None
+    # nested groups do not share a mirror
+    assert mirror_path("https://gitlab.com/a/b/c.git", root=tmp_path) == (
+        tmp_path / "gitlab.com" / "a" / "b" / "c.git"
+    )
+    assert mirror_path("https://gitlab.com/a/b.git", root=tmp_path) == (
+        tmp_path / "gitlab.com" / "a" / "b.git"
+    )
+
+
+def test_update_mirror_creates_then_refreshes(upstream, tmp_path):
+    path = update_mirror(URL.format("one"))
+
+    assert path == tmp_path / "mirrors" / "example.com" / "acme" / "one.git"
+    assert git("rev-parse", "main", cwd=path) == git("rev-parse", "HEAD", cwd=upstream)
+
+    (upstream / "README.md").write_text("two\n")
+    git("commit", "-qam", "two", cwd=upstream)
+    git("push", "-q", "origin", "main", cwd=upstream)
+
+    assert update_mirror(URL.format("one")) == path
+    assert git("rev-parse", "main", cwd=path) == git("rev-parse", "HEAD", cwd=upstream)
+    assert git("config", "gc.pruneExpire", cwd=path) == "never"
+
+
+def test_update_mirror_stages_in_a_private_directory(upstream, tmp_path):
+    # the staging directory of a concurrent run is left alone
+    other = tmp_path / "mirrors" / "example.com" / "acme" / "one.git.tmp"
+    other.mkdir(parents=True)
+
+    path = update_mirror(URL.format("one"))
+
+    assert other.is_dir()
+    assert sorted(p.name for p in path.parent.iterdir()) == ["one.git", "one.git.tmp"]
+
+
+def test_find_mirror_offline(upstream, tmp_path, monkeypatch):
+    _offline(monkeypatch, tmp_path)
+    assert find_mirror(URL.format("one")) is None
+
+    _serve(monkeypatch, tmp_path / "upstream")
+    path = update_mirror(URL.format("one"))
+
+    _offline(monkeypatch, tmp_path)
+    assert find_mirror(URL.format("one")) == path
+
+
+@pytest.fixture
+def project(upstream, tmp_path, monkeypatch):
+    root = tmp_path / "main"
+    root.mkdir()
+    git("init", "-q", "-b", "main", cwd=root)
+    git("commit", "-q", "--allow-empty", "-m", "init", cwd=root)
+    monkeypatch.chdir(root)
+    return root
+
+
+def test_add_submodule_from_mirror_offline(project, tmp_path, monkeypatch):
+    mirror = update_mirror(URL.format("one"))
+    _offline(monkeypatch, tmp_path)
+
+    add_submodule(URL.format("one"), "one", "subs/one", branch="main", reference=str(mirror))
+
+    git_dir = project / ".git" / "modules" / "one"
+    alternates = (git_dir / "objects" / "info" / "alternates").read_text().strip()
+    assert Path(alternates) == mirror / "objects"
+    assert git("config", "remote.origin.url", cwd=project / "subs" / "one") == URL.format("one")
+    assert git("rev-parse", "HEAD", cwd=project / "subs" / "one") == git(
+        "rev-parse", "main", cwd=mirror
+    )
+
+
+def test_update_init_from_mirror_offline(project, upstream, tmp_path, monkeypatch):
+    add_submodule(URL.format("one"), "one", "subs/one", branch="main")
+    git("commit", "-qm", "add one", cwd=project)
+    git("submodule", "deinit", "-q", "-f", "subs/one", cwd=project)
+    shutil.rmtree(project / ".git" / "modules" / "one")
+
+    (upstream / "README.md").write_text("two\n")
+    git("commit", "-qam", "two", cwd=upstream)
+    git("push", "-q", "origin", "main", cwd=upstream)
+    update_mirror(URL.format("one"))
+    _offline(monkeypatch, tmp_path)
+
+    result = CliRunner().invoke(update, ["--init", "--mirror"])
+
+    assert result.exit_code == 0, result.output
+    assert "Initializing subs/one" in result.output
+    alternates = project / ".git" / "modules" / "one" / "objects" / "info" / "alternates"
+    assert alternates.is_file()
+    sub = project / "subs" / "one"
+    # resolved and fetched from the mirror, without network access
+    assert git("rev-parse", "HEAD", cwd=sub) == git("rev-parse", "HEAD", cwd=upstream)
+    assert git("rev-parse", "HEAD:subs/one", cwd=project) == git("rev-parse", "HEAD", cwd=sub)
+    assert git("config", "remote.origin.url", cwd=sub) == URL.format("one")
+    assert git("config", "submodule.one.url", cwd=project) == URL.format("one")
+
+
+def test_submodule_update_from_restores_url(project, tmp_path):
+    add_submodule(URL.format("one"), "one", "subs/one", branch="main")
+    git("commit", "-qm", "add one", cwd=project)
+    git("submodule", "deinit", "-q", "-f", "subs/one", cwd=project)
+    shutil.rmtree(project / ".git" / "modules" / "one")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        submodule_update_from("one", "subs/one", str(tmp_path / "no-mirror.git"))
+    assert git("config", "submodule.one.url", cwd=project) == URL.format("one")
+
+
+def test_mirror_command(project, tmp_path):
+    add_submodule(URL.format("one"), "one", "subs/one", branch="main")
+
+    result = CliRunner().invoke(mirror, [])
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "mirrors" / "example.com" / "acme" / "one.git").is_dir()
+
+
+def test_mirror_command_one_update_per_mirror(project, upstream):
+    (project / ".gitmodules").write_text(
+        '[submodule "one"]\n\tpath = subs/one\n\turl = https://example.com/acme/one.git\n'
+        '[submodule "One"]\n\tpath = subs/One\n\turl = https://example.com/ACME/One\n'
+    )
+
+    result = CliRunner().invoke(mirror, [])
+
+    assert result.exit_code == 0, result.output
+    assert "Updating 1 mirror(s)" in result.output
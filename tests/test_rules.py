@@ -0,0 +1,139 @@
+import importlib
+from pathlib import Path
+
+import pytest
+
+from osh.cache import ContentCache
+from osh.rules import semantic
+from osh.rules.__main__ import rules_version, run_rules
+from osh.rules.report import flatten, to_sarif
+from tests.conftest import write_manifest
+
+rules_main = importlib.import_module("osh.rules.__main__")
+
+
+@pytest.fixture
+def lint_calls(monkeypatch):
+    calls = []
+    original = rules_main.lint_manifest
+
+    def counting_lint(path, content):
+        calls.append(str(path))
+        return original(path, content)
+
+    monkeypatch.setattr(rules_main, "lint_manifest", counting_lint)
+    return calls
+
+
+GOOD = (
+    '{"author": "Apik", "maintainers": ["apikcloud"], '
+    '"website": "https://apik.cloud", "license": "LGPL-3"}\n'
+)
+
+
+def test_run_rules_reports_violations(tmp_path):
+    bad = str(write_manifest(tmp_path / "bad", '{"name": "Bad", "author": "Someone"}\n'))
+    good = str(write_manifest(tmp_path / "good", GOOD))
+
+    results = run_rules([bad, good])
+    assert sorted(d["message"] for d in results[bad]) == [
+        "Manifest 'author' must be exactly 'Apik'.",
+        "Manifest is missing 'license' key.",
+        "Manifest is missing 'maintainers' key.",
+        "Manifest is missing 'website' key.",
+    ]
+    assert results[good] == []
+
+
+def test_run_rules_reports_syntax_errors(tmp_path):
+    path = str(write_manifest(tmp_path / "broken", "{'name': \n"))
+    [diagnostic] = run_rules([path])[path]
+    assert diagnostic["rule"] == "SyntaxError"
+    assert diagnostic["line"] == 1
+
+
+def test_run_rules_cache(tmp_path, lint_calls):
+    path = str(write_manifest(tmp_path / "addon", '{"name": "Addon", "author": "Someone"}\n'))
+    filepath = tmp_path / "cache.json"
+
+    cache = ContentCache(filepath, salt=rules_version())
+    first = run_rules([path], cache=cache)
+    cache.save()
+    assert lint_calls == [path]
+
+    cache = ContentCache(filepath, salt=rules_version())
+    assert run_rules([path], cache=cache) == first
+    assert lint_calls == [path]
+
+    Path(path).write_text(GOOD)
+    assert run_rules([path], cache=cache) == {path: []}
+    assert lint_calls == [path, path]
+
+
+def test_rules_version_follows_settings(monkeypatch):
+    version = rules_version()
+    monkeypatch.setitem(semantic.DEFAULT_VALUES, "website", "https://example.com")
+    assert rules_version() != version
+
+
+def test_manifest_rule_is_abstract():
+    with pytest.raises(TypeError):
+        semantic.ManifestRule()
+
+
+def test_semantic_rules_locate_keys(tmp_path):
+    source = """{
+    "name": "Addon",
+    "author": "Someone",
+    "maintainers": [],
+    "website": "https://apik.cloud",
+    "license": "LGPL-3",
+    "depends": ["web", "base"],
+}
+"""
+    path = str(write_manifest(tmp_path / "addon", source))
+    assert [(d["rule"], d["line"], d["column"]) for d in run_rules([path])[path]] == [
+        ("OdooManifestAuthorMaintainers", 3, 4),
+        ("OdooManifestAuthorMaintainers", 4, 4),
+        ("OdooManifestDependsSorted", 7, 4),
+    ]
+
+
+def test_semantic_rules_skip_libcst_when_clean(tmp_path, monkeypatch):
+    def fail(source):
+        raise AssertionError("libcst should not be needed")
+
+    monkeypatch.setattr(semantic, "locate_keys", fail)
+    path = str(write_manifest(tmp_path / "addon", GOOD))
+    assert run_rules([path]) == {path: []}
+
+
+def test_run_rules_parallel_keeps_order(tmp_path):
+    paths = [
+        str(write_manifest(tmp_path / f"addon_{i}", GOOD if i % 2 else "{}\n")) for i in range(4)
+    ]
+
+    serial = run_rules(paths, jobs=1)
+    parallel = run_rules(paths, jobs=2)
+    assert list(parallel) == paths
+    assert parallel == serial
+
+
+def test_reports_are_sorted(tmp_path):
+    first = str(write_manifest(tmp_path / "b_addon", "{}\n"))
+    second = str(write_manifest(tmp_path / "a_addon", '{"author": "Someone"}\n'))
+    results = run_rules([first, second])
+
+    issues = flatten(results, str(tmp_path))
+    assert issues == flatten(dict(reversed(list(results.items()))), str(tmp_path))
+    assert [i["path"] for i in issues][:1] == ["a_addon/__manifest__.py"]
+
+    sarif = to_sarif(results, str(tmp_path))
+    [run] = sarif["runs"]
+    assert sarif["version"] == "2.1.0"
+    assert len(run["results"]) == len(issues)
+    rules = [rule["id"] for rule in run["tool"]["driver"]["rules"]]
+    assert all(rules[r["ruleIndex"]] == r["ruleId"] for r in run["results"])
+    location = run["results"][0]["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "a_addon/__manifest__.py"
+    assert location["region"]["startLine"] >= 1
@@ -0,0 +1,318 @@
+import importlib
+import shutil
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from osh.addons.add import main as add_addons
+from osh.gitutils import (
+    add_submodule,
+    fetch_submodules,
+    get_last_commits,
+    resolve_remote_heads,
+    sparse_checkout_list,
+    update_sparse_checkouts,
+)
+from osh.submodules.check import main as check
+from osh.submodules.clean import find_stale_dirs
+from osh.submodules.clean import main as clean
+from osh.submodules.prune import main as prune
+from osh.submodules.update import main as update
+from osh.utils import repository_host
+from tests.conftest import git, init_repo
+
+
+@pytest.mark.parametrize("jobs", [1, 0, 3])
+def test_get_last_commits_keeps_order(tmp_path, jobs):
+    paths = [str(init_repo(tmp_path / f"repo_{i}", f"commit {i}")) for i in range(5)]
+    paths.insert(2, str(tmp_path))  # not a repository
+
+    commits = get_last_commits(paths, jobs=jobs)
+    assert [c.message if c else None for c in commits] == [
+        "commit 0",
+        "commit 1",
+        None,
+        "commit 2",
+        "commit 3",
+        "commit 4",
+    ]
+
+
+def _head(path: Path) -> str:
+    return git("rev-parse", "HEAD", cwd=path)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch, git_env):
+    """A superproject with two submodules tracking `main` of local bare repositories."""
+
+    root = init_repo(tmp_path / "main", "init")
+    for name in ("one", "two"):
+        work = init_repo(tmp_path / "work" / name, f"{name} 1")
+        upstream = tmp_path / "upstream" / f"{name}.git"
+        git("clone", "-q", "--bare", str(work), str(upstream), cwd=tmp_path)
+        git("remote", "add", "origin", str(upstream), cwd=work)
+        git("submodule", "add", "-q", "-b", "main", str(upstream), f"subs/{name}", cwd=root)
+    git("commit", "-qm", "add submodules", cwd=root)
+    monkeypatch.chdir(root)
+    return root
+
+
+def _bump(tmp_path: Path, name: str, message: str) -> str:
+    """Push a new commit to the upstream of submodule `name`, return its sha."""
+
+    work = tmp_path / "work" / name
+    (work / "README.md").write_text(f"{message}\n")
+    git("commit", "-qam", message, cwd=work)
+    git("push", "-q", "origin", "main", cwd=work)
+    return _head(work)
+
+
+@pytest.mark.parametrize(
+    "url, host",
+    [
+        ("https://github.com/OCA/server-ux.git", "github.com"),
+        ("git@gitlab.com:apik/addons.git", "gitlab.com"),
+        ("../local/repo", ""),
+    ],
+)
+def test_repository_host(url, host):
+    assert repository_host(url) == host
+
+
+def test_fetch_submodules_collects_failures(project, tmp_path):
+    head = _bump(tmp_path, "one", "one 2")
+    fetches = [
+        ("subs/one", "main", str(tmp_path / "upstream" / "one.git")),
+        ("subs/two", "missing", str(tmp_path / "upstream" / "two.git")),
+    ]
+
+    failures = fetch_submodules(fetches, jobs=2, per_host=1)
+
+    assert list(failures) == ["subs/two"]
+    assert "missing" in failures["subs/two"]
+    assert git("rev-parse", "origin/main", cwd=project / "subs" / "one") == head
+
+
+def test_update_fast_forwards_and_commits_once(project, tmp_path):
+    heads = {name: _bump(tmp_path, name, f"{name} 2") for name in ("one", "two")}
+    before = _head(project)
+
+    result = CliRunner().invoke(update, ["-j", "2"])
+
+    assert result.exit_code == 0, result.output
+    for name, head in heads.items():
+        assert _head(project / "subs" / name) == head
+    assert git("rev-list", "--count", f"{before}..HEAD", cwd=project) == "1"
+    assert git("status", "--porcelain", cwd=project) == ""
+
+
+def test_update_reports_failures_after_updating_the_others(project, tmp_path):
+    head = _bump(tmp_path, "one", "one 2")
+    git("config", "-f", ".gitmodules", "submodule.subs/two.branch", "missing", cwd=project)
+    git("commit", "-qam", "track a missing branch", cwd=project)
+
+    result = CliRunner().invoke(update, [])
+
+    assert result.exit_code == 1
+    assert "Failed to update subs/two" in result.output
+    assert _head(project / "subs" / "one") == head
+    assert "subs/one" in git("show", "--name-only", "HEAD", cwd=project)
+
+
+def test_update_without_upstream_changes_does_not_commit(project):
+    before = _head(project)
+
+    result = CliRunner().invoke(update, [])
+
+    assert result.exit_code == 0, result.output
+    assert "already up to date" in result.output
+    assert _head(project) == before
+
+
+def test_resolve_remote_heads(project, tmp_path):
+    head = _bump(tmp_path, "one", "one 2")
+    items = [
+        ("subs/one", "main", str(tmp_path / "upstream" / "one.git")),
+        ("subs/two", "missing", str(tmp_path / "upstream" / "two.git")),
+    ]
+
+    heads, errors = resolve_remote_heads(items, jobs=2)
+
+    assert heads == {"subs/one": head}
+    assert list(errors) == ["subs/two"]
+    # nothing was fetched
+    assert git("rev-parse", "origin/main", cwd=project / "subs" / "one") != head
+
+
+def test_update_only_fetches_moved_submodules(project, tmp_path, monkeypatch):
+    head = _bump(tmp_path, "two", "two 2")
+    fetched = []
+
+    def fetch(items, **kwargs):
+        fetched.extend(path for path, _, _ in items)
+        return fetch_submodules(items, **kwargs)
+
+    module = importlib.import_module("osh.submodules.update")
+    monkeypatch.setattr(module, "fetch_submodules", fetch)
+
+    result = CliRunner().invoke(update, [])
+
+    assert result.exit_code == 0, result.output
+    assert fetched == ["subs/two"]
+    assert _head(project / "subs" / "two") == head
+
+
+def test_update_dry_run_reports_moved_submodules(project, tmp_path):
+    _bump(tmp_path, "one", "one 2")
+    before = _head(project / "subs" / "one")
+
+    result = CliRunner().invoke(update, ["--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert "Updating subs/one" in result.output
+    assert "subs/two" not in result.output
+    assert _head(project / "subs" / "one") == before
+
+
+def test_add_submodule_partial_clone(project, tmp_path):
+    url = (tmp_path / "upstream" / "one.git").as_uri()
+
+    add_submodule(url, "partial", "subs/partial", branch="main", depth=1, filter="blob:none")
+
+    sub = project / "subs" / "partial"
+    assert (project / ".git" / "modules" / "partial").is_dir()
+    assert (sub / ".git").is_file()
+    assert git("rev-parse", "--is-shallow-repository", cwd=sub) == "true"
+    assert git("config", "remote.origin.partialclonefilter", cwd=sub) == "blob:none"
+    assert "subs/partial" in git("diff", "--cached", "--name-only", cwd=project)
+
+
+def test_update_init_clones_missing_submodules(project, tmp_path):
+    url = (tmp_path / "upstream" / "two.git").as_uri()
+    git("submodule", "deinit", "-q", "-f", "subs/two", cwd=project)
+    shutil.rmtree(project / ".git" / "modules" / "subs" / "two")
+    git("config", "-f", ".gitmodules", "submodule.subs/two.url", url, cwd=project)
+    git("commit", "-qam", "use a file url", cwd=project)
+    git("submodule", "sync", "-q", cwd=project)
+
+    result = CliRunner().invoke(update, ["--init", "--depth", "1", "--filter", "blob:none"])
+
+    assert result.exit_code == 0, result.output
+    sub = project / "subs" / "two"
+    assert git("rev-parse", "--is-shallow-repository", cwd=sub) == "true"
+    assert git("config", "remote.origin.partialclonefilter", cwd=sub) == "blob:none"
+
+
+def test_check_reports_unused_submodules_without_substring_matches(tmp_path, monkeypatch):
+    root = init_repo(tmp_path / "main", "init")
+    (root / ".gitmodules").write_text(
+        '[submodule "web"]\n\tpath = .third-party/OCA/web\n\turl = https://github.com/OCA/web.git\n'
+        '[submodule "web-extra"]\n\tpath = .third-party/OCA/web-extra\n'
+        "\turl = https://github.com/OCA/web-extra.git\n"
+    )
+    (root / ".third-party" / "OCA" / "web-extra" / "web_tree").mkdir(parents=True)
+    (root / "web_tree").symlink_to(".third-party/OCA/web-extra/web_tree")
+    git("add", ".", cwd=root)
+    monkeypatch.chdir(root)
+
+    for backend in ("fs", "git"):
+        result = CliRunner().invoke(check, ["--backend", backend])
+
+        assert result.exit_code == 0, result.output
+        assert "Unused submodules" in result.output
+        assert "- web: .third-party/OCA/web\n" in result.output
+        assert "- web-extra:" not in result.output
+
+
+def test_prune_keeps_submodules_used_by_nested_links(project):
+    (project / "addons").mkdir()
+    (project / "addons" / "one").symlink_to("../subs/one")
+    git("add", "addons", cwd=project)
+
+    result = CliRunner().invoke(prune, [], input="n\n")
+
+    assert "- subs/two:" in result.output
+    assert "- subs/one:" not in result.output
+    assert (project / "subs" / "one" / "README.md").is_file()
+
+    # an untracked top-level link counts as well
+    (project / "two").symlink_to("subs/two")
+    result = CliRunner().invoke(prune, [], input="n\n")
+    assert "No unused submodules" in result.output
+
+
+def test_find_stale_dirs(tmp_path):
+    for path in ("tp/OCA/web", "tp/OCA/old/sub", "tp/empty", "tp/docs", "other/dir"):
+        (tmp_path / path).mkdir(parents=True)
+    (tmp_path / "tp" / "OCA" / "notes.txt").write_text("kept\n")
+    (tmp_path / "tp" / "docs" / "README.md").write_text("tracked\n")
+
+    stale = find_stale_dirs(tmp_path, ["tp", "missing"], ["tp/OCA/web", "tp/docs/README.md"])
+
+    assert stale == ["tp/OCA/old", "tp/empty"]
+    assert find_stale_dirs(tmp_path, ["other"], ["tp/OCA/web"]) == ["other"]
+
+
+def test_clean_removes_stale_dirs_and_restores_submodules(project, tmp_path):
+    (project / ".third-party" / "OCA" / "old").mkdir(parents=True)
+    (project / ".third-party" / "OCA" / "old" / "file.py").write_text("\n")
+    (project / "subs" / "one" / "README.md").write_text("changed\n")
+    (project / "subs" / "one" / "untracked.txt").write_text("\n")
+    shutil.rmtree(project / "subs" / "two")
+    # restoring must not need the network
+    (tmp_path / "upstream").rename(tmp_path / "offline")
+
+    result = CliRunner().invoke(clean, ["--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert "Would remove stale directory .third-party\n" in result.output
+    assert "Would restore subs/one (dirty)" in result.output
+    assert "Would restore subs/two (missing)" in result.output
+    assert (project / ".third-party").is_dir()
+
+    result = CliRunner().invoke(clean, ["-j", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert not (project / ".third-party").exists()
+    assert git("status", "--porcelain", cwd=project / "subs" / "one") == ""
+    assert (project / "subs" / "two" / "README.md").read_text() == "two 1\n"
+    assert git("status", "--porcelain", cwd=project) == ""
+
+    result = CliRunner().invoke(clean, [])
+    assert "2 submodule(s) up to date" in result.output
+
+
+def test_sparse_checkout_follows_symlinks(project, tmp_path):
+    work = tmp_path / "work" / "one"
+    for name in ("addon_a", "addon_b", "addon_c"):
+        (work / name).mkdir()
+        (work / name / "__manifest__.py").write_text(f"{{'name': '{name}'}}\n")
+    git("add", ".", cwd=work)
+    git("commit", "-qm", "addons", cwd=work)
+    git("push", "-q", "origin", "main", cwd=work)
+    sub = project / "subs" / "one"
+    git("pull", "-q", "origin", "main", cwd=sub)
+    (project / "addon_a").symlink_to("subs/one/addon_a")
+    git("add", ".", cwd=project)
+    git("commit", "-qm", "link addon_a", cwd=project)
+
+    assert update_sparse_checkouts(project, enable=True) == {"subs/one": ["addon_a"]}
+    assert sorted(p.name for p in sub.iterdir() if p.name != ".git") == ["README.md", "addon_a"]
+    assert update_sparse_checkouts(project, enable=True) == {}
+    # a submodule without any link is left whole, not narrowed to its top-level files
+    assert sparse_checkout_list(str(project / "subs" / "two")) is None
+
+    # addons outside of the sparse checkout can still be linked
+    result = CliRunner().invoke(add_addons, ["addon_b"])
+
+    assert result.exit_code == 0, result.output
+    assert (project / "addon_b" / "__manifest__.py").is_file()
+    assert not (sub / "addon_c").exists()
+    assert git("sparse-checkout", "list", cwd=sub).split() == ["addon_a", "addon_b"]
+
+    # a link to the submodule root needs the whole checkout
+    (project / "one").symlink_to("subs/one")
+    assert update_sparse_checkouts(project, ["subs/one"]) == {"subs/one": None}
+    assert (sub / "addon_c").is_dir()
@@ -0,0 +1,64 @@
+import importlib
+import json
+import os
+
+from click.testing import CliRunner
+
+from osh.addons.test_plan import main as plan_main
+from osh.addons.test_plan import select_addons, shard_addons
+from osh.cache import AddonIndex
+from osh.graph import load_graph
+from osh.helpers import find_addons
+from tests.conftest import git, make_addon
+
+# osh.addons exposes the `test-plan` command under the module name
+plan_mod = importlib.import_module("osh.addons.test_plan")
+
+
+def test_select_addons_adds_installed_dependents(tmp_path):
+    make_addon(tmp_path, "base_tier", depends=["mail"])
+    make_addon(tmp_path, "sale_custom", depends=["sale", "base_tier"])
+    make_addon(tmp_path, "sale_report", depends=["sale_custom"])
+    make_addon(tmp_path, "sale_legacy", depends=["sale_custom"], installable=False)
+    make_addon(tmp_path, "stock_custom", depends=["stock"])
+    index = AddonIndex()
+    graph = load_graph(tmp_path, index=index)
+    installable = [a.technical_name for a in find_addons(tmp_path, index=index) if a.installable]
+
+    expected = ["base_tier", "sale_custom", "sale_report"]
+    assert select_addons(["base_tier"], graph, installable) == expected
+    assert select_addons(["sale_legacy"], graph, installable) == []
+    # changes to addons which are not installed only select their installed dependents
+    assert select_addons(["mail"], graph, installable) == expected
+
+
+def test_shard_addons_balances_timings():
+    timings = {"a": 10.0, "b": 7.0, "c": 5.0, "d": 4.0, "e": 2.0}
+    shards = shard_addons(timings, 2, timings)
+
+    assert shards == [["a", "d"], ["b", "c", "e"]]
+    assert sorted(sum(shards, [])) == sorted(timings)
+
+
+def test_shard_addons_defaults():
+    assert shard_addons(["c", "a", "b"], 2) == [["a", "c"], ["b"]]
+    assert shard_addons(["a"], 3) == [["a"], [], []]
+    # unknown addons weigh the median of the known ones
+    assert shard_addons(["x", "y", "z"], 2, {"x": 1.0, "y": 9.0}) == [["y"], ["x", "z"]]
+
+
+def test_plan_matches_symlinked_addons_on_technical_name(tmp_path, monkeypatch):
+    git("init", "-q", cwd=tmp_path)
+    make_addon(tmp_path / ".third-party" / "OCA", "base_tier", depends=["mail"])
+    os.symlink(".third-party/OCA/base_tier", tmp_path / "tier")
+    make_addon(tmp_path, "sale_custom", depends=["base_tier"])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(plan_mod, "get_changed_addons", lambda repo, mode: ["tier"])
+
+    result = CliRunner().invoke(plan_main, ["branch", "--format", "json"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["addons"] == ["base_tier", "sale_custom"]
+
+    result = CliRunner().invoke(plan_main, ["branch", "--shard", "1", "--format", "json"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == ["base_tier", "sale_custom"]